@@ -0,0 +1,176 @@
+import asyncio
+from collections import defaultdict
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from sqlalchemy import exc
+
+from app.config import (
+    ADMISSION_CONTROL, ADMISSION_LIMITS, ADMISSION_POOL_WAIT_THRESHOLD, ADMISSION_QUEUE_TIMEOUT, ADMISSION_RETRY_AFTER,
+)
+from app.database import pool_stats
+
+
+# Служебные пути не ограничиваются: метрики и статистика нужны именно под перегрузкой
+EXEMPT_PATHS = ("/metrics", "/stats/", "/docs", "/redoc", "/openapi.json")
+READ_METHODS = ("GET", "HEAD")
+
+
+class AdmissionClass:
+    """
+    Ограничение одновременных запросов одного класса с ограниченной очередью ожидания
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self._slots = asyncio.Semaphore(concurrency)
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.admitted = 0
+        self.shed: defaultdict[str, int] = defaultdict(int)
+
+    async def acquire(self, timeout: float, pool_saturated: bool) -> str | None:
+        """
+        Занимает слот. Возвращает причину отказа или None, если запрос допущен
+        """
+        if not self._slots.locked():
+            # Свободный слот занимается без переключения задач, поэтому проверка и захват атомарны
+            await self._slots.acquire()
+        else:
+            # Пока пул соединений перегружен, ожидание в очереди только удлинит хвост — отказываем сразу
+            if pool_saturated:
+                return "pool_saturated"
+            if self.queued >= self.queue_size:
+                return "queue_full"
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout)
+            except asyncio.TimeoutError:
+                return "queue_timeout"
+            finally:
+                self.queued -= 1
+        self.in_flight += 1
+        self.admitted += 1
+        return None
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+        }
+
+
+class AdmissionController:
+    """
+    Раскладывает запросы по классам auth / read / write и решает, допускать ли их
+    """
+
+    def __init__(self, limits: dict[str, tuple[int, int]], queue_timeout: float, pool_wait_threshold: float):
+        self.classes = {name: AdmissionClass(name, *limit) for name, limit in limits.items()}
+        self.queue_timeout = queue_timeout
+        self.pool_wait_threshold = pool_wait_threshold
+
+    def classify(self, method: str, path: str) -> AdmissionClass | None:
+        if path == "/" or path.startswith(EXEMPT_PATHS):
+            return None
+        if path.startswith("/users"):
+            return self.classes["auth"]
+        if method in READ_METHODS:
+            return self.classes["read"]
+        return self.classes["write"]
+
+    def pool_saturated(self) -> bool:
+        return pool_stats.recent() > self.pool_wait_threshold
+
+    def stats(self) -> dict:
+        return {
+            "pool_saturated": self.pool_saturated(),
+            "classes": {name: limiter.stats() for name, limiter in self.classes.items()},
+        }
+
+    def render_metrics(self) -> list[str]:
+        """
+        Gauge и counter в текстовом формате Prometheus
+        """
+        lines = [
+            "# HELP admission_in_flight Выполняющиеся запросы класса",
+            "# TYPE admission_in_flight gauge",
+            *(f'admission_in_flight{{class="{name}"}} {c.in_flight}' for name, c in self.classes.items()),
+            "# HELP admission_queued Запросы класса в очереди на допуск",
+            "# TYPE admission_queued gauge",
+            *(f'admission_queued{{class="{name}"}} {c.queued}' for name, c in self.classes.items()),
+            "# HELP admission_shed_total Запросы, отклонённые с 503",
+            "# TYPE admission_shed_total counter",
+        ]
+        for name, limiter in self.classes.items():
+            for reason, count in sorted(limiter.shed.items()):
+                lines.append(f'admission_shed_total{{class="{name}",reason="{reason}"}} {count}')
+        return lines
+
+
+admission = AdmissionController(ADMISSION_LIMITS, ADMISSION_QUEUE_TIMEOUT, ADMISSION_POOL_WAIT_THRESHOLD)
+
+
+def overloaded_response() -> JSONResponse:
+    return JSONResponse(
+        {"detail": "Service overloaded, retry later"},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(ADMISSION_RETRY_AFTER)},
+    )
+
+
+class AdmissionMiddleware:
+    """
+    Чистый ASGI-middleware: допускает запрос, если у его класса есть свободный слот,
+    иначе ставит в ограниченную очередь или сразу отвечает 503 с Retry-After.
+    Таймаут выдачи соединения из пула тоже превращается в 503, а не в 500
+    """
+
+    def __init__(self, app, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        limiter = None
+        if scope["type"] == "http" and ADMISSION_CONTROL:
+            limiter = self.controller.classify(scope["method"], scope["path"])
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        reason = await limiter.acquire(self.controller.queue_timeout, self.controller.pool_saturated())
+        if reason is not None:
+            limiter.shed[reason] += 1
+            await overloaded_response()(scope, receive, send)
+            return
+
+        started = False
+
+        async def send_tracking(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_tracking)
+        except exc.TimeoutError:
+            if started:
+                raise
+            limiter.shed["pool_timeout"] += 1
+            await overloaded_response()(scope, receive, send)
+        finally:
+            limiter.release()
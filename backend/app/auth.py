@@ -1,3 +1,6 @@
+import asyncio
+import time
+from dataclasses import dataclass
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta, timezone
@@ -7,16 +10,24 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.models.users import User as UserModel
-from app.config import SECRET_KEY, ALGORITHM
+from app.config import (
+    SECRET_KEY, ALGORITHM, AUTH_MODE, REVOKED_USERS_REFRESH_SECONDS,
+    ARGON2_SETTINGS, PASSWORD_HASH_WORKERS,
+)
 from app.db_depends import get_async_db
+from app.hashing import HashingPool
 
 
 # Создаём контекст для хеширования
 pwd_context = CryptContext(
     schemes=["argon2"],
-    deprecated="auto"
+    deprecated="auto",
+    **{f"argon2__{name}": value for name, value in ARGON2_SETTINGS.items()}
 )
 
+# Пул потоков, в котором считаются хэши, чтобы не блокировать event loop
+hashing_pool = HashingPool(workers=PASSWORD_HASH_WORKERS)
+
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/token")
@@ -36,6 +47,20 @@ def verify_password(plain_password: str, hashed_password: str):
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def hash_password_async(password: str) -> str:
+    """
+    Считает хэш пароля в пуле потоков
+    """
+    return await hashing_pool.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Проверяет пароль в пуле потоков
+    """
+    return await hashing_pool.run(verify_password, plain_password, hashed_password)
+
+
 def create_access_token(data: dict):
     """
     Создает JWT с нагрузкой
@@ -56,9 +81,57 @@ def create_refresh_token(data: dict):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+@dataclass(frozen=True)
+class Principal:
+    """
+    Пользователь, восстановленный из claims токена без обращения к БД
+    """
+    id: int
+    email: str
+    role: str
+
+
+class RevokedUsers:
+    """
+    Множество id отозванных и деактивированных пользователей в памяти процесса.
+    Перечитывается из БД не чаще раза в refresh_interval секунд.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._ids: frozenset[int] = frozenset()
+        self._revoked_locally: set[int] = set()
+        self._loaded_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    def revoke(self, user_id: int) -> None:
+        """
+        Отзывает пользователя в этом процессе сразу, не дожидаясь обновления.
+        Остальные воркеры увидят деактивацию при своём обновлении
+        """
+        self._revoked_locally.add(user_id)
+
+    async def contains(self, user_id: int, db: AsyncSession) -> bool:
+        if time.monotonic() - self._loaded_at > self.refresh_interval:
+            async with self._lock:
+                if time.monotonic() - self._loaded_at > self.refresh_interval:
+                    await self._refresh(db)
+        return user_id in self._ids or user_id in self._revoked_locally
+
+    async def _refresh(self, db: AsyncSession) -> None:
+        result = await db.scalars(select(UserModel.id).where(UserModel.is_active == False))
+        self._ids = frozenset(result.all())
+        # Кто уже есть в выборке из БД, отозван и без локальной отметки
+        self._revoked_locally -= self._ids
+        self._loaded_at = time.monotonic()
+
+
+revoked_users = RevokedUsers(refresh_interval=REVOKED_USERS_REFRESH_SECONDS)
+
+
+def decode_access_token(token: str) -> dict:
     """
-    Проверяет пользователя и возвращает его
+    Проверяет подпись и срок действия токена и возвращает его нагрузку
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -68,31 +141,61 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
 
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token has expired",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    except jwt.PyJWKSetError:
+    except jwt.PyJWTError:
         raise credentials_exception
-    
-    stmt_user = select(UserModel).where(
+
+    if payload.get("sub") is None:
+        raise credentials_exception
+    return payload
+
+
+def active_user_statement(email: str):
+    return select(UserModel).where(
         UserModel.email == email,
         UserModel.is_active == True
         )
-    result_user = await db.execute(stmt_user)
+
+
+async def load_active_user(db: AsyncSession, email: str) -> UserModel:
+    result_user = await db.execute(active_user_statement(email))
     user = result_user.scalar()
     if user is None:
-        raise credentials_exception
-    
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
     return user
 
 
-async def get_current_seller(current_user: UserModel = Depends(get_current_user)):
+async def get_current_principal(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> Principal:
+    """
+    Возвращает пользователя из claims токена.
+    В режиме AUTH_MODE=db или для токенов без id/role пользователь читается из БД.
+    """
+    payload = decode_access_token(token)
+    user_id, role = payload.get("id"), payload.get("role")
+
+    if AUTH_MODE == "db" or not isinstance(user_id, int) or role is None:
+        user = await load_active_user(db, payload["sub"])
+        return Principal(id=user.id, email=user.email, role=user.role)
+
+    if await revoked_users.contains(user_id, db):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return Principal(id=user_id, email=payload["sub"], role=role)
+
+
+async def get_current_seller(current_user: Principal = Depends(get_current_principal)) -> Principal:
     """
     Проверяет что пользователь имеет роль seller
     """
@@ -104,7 +207,7 @@ async def get_current_seller(current_user: UserModel = Depends(get_current_user)
     
     return current_user
 
-async def get_current_buyer(current_user: UserModel = Depends(get_current_user)):
+async def get_current_buyer(current_user: Principal = Depends(get_current_principal)) -> Principal:
     """
     Проверяет что пользователь покупатель
     """
@@ -116,7 +219,7 @@ async def get_current_buyer(current_user: UserModel = Depends(get_current_user))
 
     return current_user
     
-async def get_current_admin(current_user: UserModel = Depends(get_current_user)):
+async def get_current_admin(current_user: Principal = Depends(get_current_principal)) -> Principal:
     """
     Проверяет что пользователь админ
     """
@@ -124,4 +227,6 @@ async def get_current_admin(current_user: UserModel = Depends(get_current_user))
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can perform this action"
-        )
\ No newline at end of file
+        )
+
+    return current_user
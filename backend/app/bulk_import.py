@@ -0,0 +1,168 @@
+import codecs
+import csv
+from typing import AsyncIterator
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.events import PRODUCTS_CHANGED, publish
+from app.models.categories import Category as CategoryModel
+from app.models.products import Product as ProductModel
+from app.schemas import ProductCreate
+
+
+# Сколько строк валидируется и вставляется за один раз
+IMPORT_BATCH_SIZE = 1000
+# Сколько ошибок по строкам попадает в отчёт; считаются все
+IMPORT_MAX_REPORTED_ERRORS = 1000
+
+CSV_MEDIA_TYPE = "text/csv"
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Режет поток байтов на строки, не собирая тело запроса в памяти
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail = ""
+    async for chunk in chunks:
+        tail += decoder.decode(chunk)
+        *lines, tail = tail.split("\n")
+        for line in lines:
+            yield line.removesuffix("\r")
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail.removesuffix("\r")
+
+
+async def iter_ndjson_rows(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, dict | str]]:
+    """
+    Отдаёт (номер строки, объект) либо (номер строки, текст ошибки)
+    """
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            value = orjson.loads(line)
+        except orjson.JSONDecodeError as exc:
+            yield row, f"Invalid JSON: {exc}"
+            continue
+        yield row, value if isinstance(value, dict) else "Row must be a JSON object"
+
+
+async def iter_csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, dict | str]]:
+    """
+    Первая строка — заголовок. Поле в кавычках может занимать несколько физических строк:
+    запись копится, пока число кавычек в ней нечётное
+    """
+    header = None
+    row = 0
+    record = ""
+    async for line in lines:
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue
+        values, record = next(csv.reader([record]), []), ""
+        if not values:
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # Пустая ячейка означает отсутствие значения
+        yield row, {name: value for name, value in zip(header, values) if value != ""}
+    if record:
+        yield row + 1, "Unterminated quoted field"
+
+
+class ProductImporter:
+    """
+    Проверяет и вставляет товары продавца пачками по IMPORT_BATCH_SIZE.
+    Ошибочные строки попадают в отчёт и не мешают вставке остальных.
+    """
+
+    def __init__(self, db: AsyncSession, seller_id: int):
+        self.db = db
+        self.seller_id = seller_id
+        self.known_categories: set[int] = set()
+        self.missing_categories: set[int] = set()
+        self.total = 0
+        self.inserted = 0
+        self.rejected = 0
+        self.errors: list[dict] = []
+
+    def reject(self, row: int, errors: list[str]) -> None:
+        self.rejected += 1
+        if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "errors": errors})
+
+    async def run(self, rows: AsyncIterator[tuple[int, dict | str]]) -> dict:
+        batch: list[tuple[int, ProductCreate]] = []
+        async for row, value in rows:
+            self.total += 1
+            if isinstance(value, str):
+                self.reject(row, [value])
+                continue
+            try:
+                batch.append((row, ProductCreate.model_validate(value)))
+            except ValidationError as exc:
+                self.reject(row, [
+                    f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in exc.errors()
+                ])
+                continue
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await self.flush(batch)
+                batch = []
+        if batch:
+            await self.flush(batch)
+        return {
+            "total": self.total,
+            "inserted": self.inserted,
+            "rejected": self.rejected,
+            # Ошибки категорий находятся позже ошибок валидации той же пачки
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+        }
+
+    async def check_categories(self, category_ids: set[int]) -> None:
+        """
+        Один запрос на пачку, и только по id, которых ещё не видели
+        """
+        unknown = category_ids - self.known_categories - self.missing_categories
+        if not unknown:
+            return
+        stmt = select(CategoryModel.id).where(
+            CategoryModel.id.in_(unknown),
+            CategoryModel.is_active == True,
+        )
+        found = set((await self.db.scalars(stmt)).all())
+        self.known_categories |= found
+        self.missing_categories |= unknown - found
+
+    async def flush(self, batch: list[tuple[int, ProductCreate]]) -> None:
+        await self.check_categories({product.category_id for _, product in batch})
+        values = []
+        for row, product in batch:
+            if product.category_id in self.missing_categories:
+                self.reject(row, ["category_id: Category not found"])
+                continue
+            values.append({**product.model_dump(), "seller_id": self.seller_id, "is_active": True})
+        if not values:
+            return
+
+        # Список параметров уходит многострочными INSERT ... VALUES (insertmanyvalues)
+        stmt = insert(ProductModel).returning(ProductModel.id)
+        product_ids = (await self.db.scalars(stmt, values)).all()
+        await self.db.commit()
+        self.inserted += len(product_ids)
+        publish(
+            PRODUCTS_CHANGED,
+            product_ids=product_ids,
+            category_ids={value["category_id"] for value in values},
+        )
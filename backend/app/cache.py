@@ -0,0 +1,116 @@
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Iterable
+
+from app.config import CATALOG_CACHE_MAXSIZE, CATALOG_CACHE_TTL
+from app.events import CATEGORY_CHANGED, PRODUCT_CHANGED, PRODUCTS_CHANGED, subscribe
+
+
+class TTLCache:
+    """
+    Ограниченный по размеру кэш в памяти процесса с TTL и вытеснением LRU
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        # Растёт при каждой инвалидации: загрузка, начатая до неё, не попадёт в кэш
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Read-through: при промахе вызывает loader и кладёт результат в кэш
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        generation = self._generation
+        value = await loader()
+        if generation == self._generation:
+            self.set(key, value)
+        return value
+
+    def invalidate(self, keys: Iterable[Hashable]) -> None:
+        self._generation += 1
+        for key in keys:
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        self.invalidate([key for key in self._data if predicate(key)])
+
+    def clear(self) -> None:
+        self._generation += 1
+        self.invalidations += len(self._data)
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+_MISSING = object()
+
+# Кэш чтений каталога. Ключи:
+#   ("product", product_id)
+#   ("categories",)
+#   ("category_products", category_id, sort, limit, after)
+#   ("subtree_products", category_id, sort, limit, after)
+catalog_cache = TTLCache(maxsize=CATALOG_CACHE_MAXSIZE, ttl=CATALOG_CACHE_TTL)
+
+
+@subscribe(PRODUCT_CHANGED)
+def _on_product_changed(product_id: int, category_ids: Iterable[int]) -> None:
+    _on_products_changed([product_id], category_ids)
+
+
+@subscribe(PRODUCTS_CHANGED)
+def _on_products_changed(product_ids: Iterable[int], category_ids: Iterable[int]) -> None:
+    category_ids = set(category_ids)
+    catalog_cache.invalidate([("product", product_id) for product_id in product_ids])
+    catalog_cache.invalidate_where(
+        lambda key: (key[0] == "category_products" and key[1] in category_ids)
+        or key[0] == "subtree_products"
+    )
+
+
+@subscribe(CATEGORY_CHANGED)
+def _on_category_changed(category_id: int) -> None:
+    # Активность категории влияет и на карточки, и на списки товаров
+    catalog_cache.clear()
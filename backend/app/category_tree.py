@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import CATALOG_CACHE_TTL
+from app.events import CATEGORY_CHANGED, subscribe
+from app.models.categories import Category as CategoryModel
+
+
+def subtree_ids(category_id: int, active_only: bool = True):
+    """
+    Рекурсивный CTE с id категории и всех её потомков.
+    UNION вместо UNION ALL защищает от зацикливания, если дерево испорчено.
+    """
+    root = select(CategoryModel.id).where(CategoryModel.id == category_id)
+    if active_only:
+        root = root.where(CategoryModel.is_active == True)
+    subtree = root.cte("category_subtree", recursive=True)
+
+    children = select(CategoryModel.id).join(subtree, CategoryModel.parent_id == subtree.c.id)
+    if active_only:
+        children = children.where(CategoryModel.is_active == True)
+    return subtree.union(children)
+
+
+def tree_rows_statement():
+    """
+    Все активные категории, из которых собирается дерево
+    """
+    return (
+        select(CategoryModel.id, CategoryModel.name, CategoryModel.parent_id)
+        .where(CategoryModel.is_active == True)
+        .order_by(CategoryModel.id)
+    )
+
+
+class CategoryTree:
+    """
+    Вложенное дерево активных категорий, закодированное в JSON.
+    Собирается одним запросом и перестраивается после изменения категорий или через ttl секунд:
+    другой воркер мог изменить категории, не уведомив этот, как и в случае с кэшем каталога.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._payload: bytes | None = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._payload = None
+
+    def _fresh(self) -> bytes | None:
+        if self._payload is not None and self._expires_at > time.monotonic():
+            return self._payload
+        return None
+
+    async def get(self, db: AsyncSession) -> bytes:
+        payload = self._fresh()
+        if payload is not None:
+            return payload
+        async with self._lock:
+            payload = self._fresh()
+            if payload is not None:
+                return payload
+            generation = self._generation
+            payload = await self._build(db)
+            # Категории изменились во время сборки — отдаём результат, но не запоминаем
+            if generation == self._generation:
+                self._payload = payload
+                self._expires_at = time.monotonic() + self.ttl
+            return payload
+
+    async def _build(self, db: AsyncSession) -> bytes:
+        rows = (await db.execute(tree_rows_statement())).all()
+        nodes = {
+            row.id: {"id": row.id, "name": row.name, "parent_id": row.parent_id, "children": []}
+            for row in rows
+        }
+        roots = []
+        for node in nodes.values():
+            if node["parent_id"] is None:
+                roots.append(node)
+            elif node["parent_id"] in nodes:
+                nodes[node["parent_id"]]["children"].append(node)
+            # Потомки неактивной категории в дерево не попадают
+        return orjson.dumps(roots)
+
+
+category_tree = CategoryTree(ttl=CATALOG_CACHE_TTL)
+
+
+@subscribe(CATEGORY_CHANGED)
+def _on_category_changed(category_id: int) -> None:
+    category_tree.invalidate()
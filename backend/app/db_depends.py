@@ -1,26 +1,32 @@
-from sqlalchemy.orm import Session
-
-from app.database import SessionLocal
-
-
-async def get_db():
-    db: Session = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-# --------------- Асинхронная сессия -------------------------
-
 from typing import AsyncGenerator
+from fastapi import Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import async_session_maker
+from app.database import async_session_maker, open_read_session
 
 
-async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+# Методы, которые не меняют данные и могут читать с реплики
+READ_ONLY_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+async def get_async_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
     """
     Предоставляет асинхронную сессию SQLAlchemy для работы с базой данных PostgreSQL.
     """
+    # Запрос уже работает с основной БД — остальные чтения в нём тоже идут туда
+    request.state.db_primary = True
     async with async_session_maker() as session:
+        yield session
+
+
+async def get_async_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия для чтения: на реплике, если она есть и запрос ничего не меняет.
+    Изменяющие запросы и запросы с request.state.db_primary = True читают из основной БД,
+    чтобы видеть собственные записи.
+    """
+    if request.method not in READ_ONLY_METHODS or getattr(request.state, "db_primary", False):
+        session = async_session_maker()
+    else:
+        session = await open_read_session()
+    async with session:
         yield session
\ No newline at end of file
@@ -0,0 +1,86 @@
+import secrets
+import time
+from collections import defaultdict
+from typing import Hashable, Iterable
+
+from fastapi import Request, Response, status
+
+from app.config import CATALOG_CACHE_TTL
+from app.events import CATEGORY_CHANGED, PRODUCT_CHANGED, PRODUCTS_CHANGED, REVIEW_CHANGED, subscribe
+
+
+# Счётчики живут в памяти процесса: после рестарта или в другом воркере
+# ETag обязан отличаться, поэтому в него входит случайный идентификатор запуска
+_BOOT_ID = secrets.token_hex(4)
+
+
+class VersionRegistry:
+    """
+    Номера версий ресурсов и коллекций, растущие при каждой записи
+    """
+
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self._versions: defaultdict[Hashable, int] = defaultdict(int)
+
+    def bump(self, keys: Iterable[Hashable]) -> None:
+        for key in keys:
+            self._versions[key] += 1
+
+    def etag(self, *keys: Hashable) -> str:
+        """
+        Сильный ETag из версий ключей. Другой воркер мог изменить данные, не задев
+        наши счётчики, поэтому ETag также меняется раз в max_age секунд — как и кэш каталога
+        """
+        epoch = int(time.time() // self.max_age) if self.max_age > 0 else 0
+        versions = ".".join(str(self._versions.get(key, 0)) for key in keys)
+        return f'"{_BOOT_ID}-{epoch}-{versions}"'
+
+
+catalog_versions = VersionRegistry(max_age=CATALOG_CACHE_TTL)
+
+
+def not_modified(request: Request, etag: str, exists: bool = False) -> Response | None:
+    """
+    Возвращает 304, если клиент прислал совпадающий If-None-Match.
+    exists=True — ресурс точно есть (коллекция или уже загруженный ресурс); пока отдельный ресурс
+    не загружен, "*" не учитывается, и обработчик проверяет его ещё раз после загрузки
+    """
+    if etag_matches(request.headers.get("if-none-match"), etag, exists):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
+
+
+def etag_matches(header: str | None, etag: str, exists: bool = False) -> bool:
+    """
+    Совпадает ли ETag с одним из перечисленных в If-None-Match.
+    "*" совпадает только с текущим представлением (RFC 9110, 13.1.2), поэтому учитывается лишь при exists
+    """
+    if header is None:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates or (exists and "*" in candidates)
+
+
+@subscribe(PRODUCT_CHANGED)
+def _on_product_changed(product_id: int, category_ids: Iterable[int]) -> None:
+    _on_products_changed([product_id], category_ids)
+
+
+@subscribe(PRODUCTS_CHANGED)
+def _on_products_changed(product_ids: Iterable[int], category_ids: Iterable[int]) -> None:
+    catalog_versions.bump(
+        [("products",)]
+        + [("product", product_id) for product_id in product_ids]
+        + [("category_products", category_id) for category_id in set(category_ids)]
+    )
+
+
+@subscribe(CATEGORY_CHANGED)
+def _on_category_changed(category_id: int) -> None:
+    catalog_versions.bump([("categories",)])
+
+
+@subscribe(REVIEW_CHANGED)
+def _on_review_changed(product_id: int) -> None:
+    catalog_versions.bump([("reviews",), ("product_reviews", product_id)])
@@ -0,0 +1,29 @@
+from collections import defaultdict
+from typing import Any, Callable
+
+
+# Темы изменений каталога. Публикуются роутерами после успешного commit
+PRODUCT_CHANGED = "product_changed"      # product_id, category_ids
+PRODUCTS_CHANGED = "products_changed"    # product_ids, category_ids — массовые операции
+CATEGORY_CHANGED = "category_changed"    # category_id
+REVIEW_CHANGED = "review_changed"        # product_id
+
+_listeners: dict[str, list[Callable[..., Any]]] = defaultdict(list)
+
+
+def subscribe(topic: str):
+    """
+    Регистрирует обработчик изменений, используется как декоратор
+    """
+    def decorator(listener: Callable[..., Any]):
+        _listeners[topic].append(listener)
+        return listener
+    return decorator
+
+
+def publish(topic: str, **payload: Any) -> None:
+    """
+    Синхронно уведомляет всех подписчиков темы
+    """
+    for listener in _listeners[topic]:
+        listener(**payload)
@@ -0,0 +1,124 @@
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import case, func, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.products import Product as ProductModel
+
+
+# Границы диапазонов для счётчиков: [0, 500), [500, 1000), ..., [50000, +inf)
+PRICE_BUCKETS = [0, 500, 1000, 2500, 5000, 10000, 50000]
+RATING_BUCKETS = [0, 1, 2, 3, 4]
+
+
+@dataclass(frozen=True)
+class ProductFilters:
+    """
+    Фильтры списка товаров из параметров запроса
+    """
+    min_price: float | None = None
+    max_price: float | None = None
+    min_rating: float | None = None
+    in_stock: bool = False
+    seller_id: int | None = None
+    category_id: int | None = None
+
+    def clauses(self) -> list:
+        where = [ProductModel.is_active == True]
+        if self.min_price is not None:
+            where.append(ProductModel.price >= self.min_price)
+        if self.max_price is not None:
+            where.append(ProductModel.price <= self.max_price)
+        if self.min_rating is not None:
+            where.append(ProductModel.rating >= self.min_rating)
+        if self.in_stock:
+            where.append(ProductModel.stock > 0)
+        if self.seller_id is not None:
+            where.append(ProductModel.seller_id == self.seller_id)
+        if self.category_id is not None:
+            where.append(ProductModel.category_id == self.category_id)
+        return where
+
+
+def product_filters(
+    min_price: float | None = Query(None, ge=0, description="Минимальная цена"),
+    max_price: float | None = Query(None, ge=0, description="Максимальная цена"),
+    min_rating: float | None = Query(None, ge=0, le=5, description="Минимальный рейтинг"),
+    in_stock: bool = Query(False, description="Только товары в наличии"),
+    seller_id: int | None = Query(None, description="ID продавца"),
+    category_id: int | None = Query(None, description="ID категории"),
+) -> ProductFilters:
+    """
+    Зависимость FastAPI: собирает фильтры списка товаров
+    """
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="min_price must not exceed max_price"
+        )
+    return ProductFilters(min_price, max_price, min_rating, in_stock, seller_id, category_id)
+
+
+def _bucket(column, bounds: list[float]):
+    """
+    Номер диапазона, в который попадает значение колонки
+    """
+    return case(
+        *((column < upper, index) for index, upper in enumerate(bounds[1:])),
+        else_=len(bounds) - 1,
+    )
+
+
+def _ranges(bounds: list[float], counts: dict[int, int]) -> list[dict]:
+    return [
+        {
+            "min": lower,
+            "max": bounds[index + 1] if index + 1 < len(bounds) else None,
+            "count": counts.get(index, 0),
+        }
+        for index, lower in enumerate(bounds)
+    ]
+
+
+# Фасеты в порядке группируемых колонок CTE filtered
+FACET_COLUMNS = ("category", "price", "rating")
+
+
+def facets_statement(filters: ProductFilters):
+    """
+    Все счётчики одним запросом: CTE с отфильтрованными товарами
+    и UNION ALL трёх группировок по нему
+    """
+    filtered = (
+        select(
+            ProductModel.category_id,
+            _bucket(ProductModel.price, PRICE_BUCKETS).label("price_bucket"),
+            _bucket(ProductModel.rating, RATING_BUCKETS).label("rating_bucket"),
+        )
+        .where(*filters.clauses())
+        .cte("filtered")
+    )
+    groups = zip(FACET_COLUMNS, (filtered.c.category_id, filtered.c.price_bucket, filtered.c.rating_bucket))
+    return union_all(*(
+        select(literal(facet).label("facet"), column.label("value"), func.count().label("count"))
+        .group_by(column)
+        for facet, column in groups
+    ))
+
+
+async def product_facets(db: AsyncSession, filters: ProductFilters) -> dict:
+    """
+    Счётчики по категориям, диапазонам цены и рейтинга для товаров, подходящих под фильтры
+    """
+    counts: dict[str, dict[int, int]] = {facet: {} for facet in FACET_COLUMNS}
+    for row in (await db.execute(facets_statement(filters))).all():
+        counts[row.facet][row.value] = row.count
+    return {
+        "categories": [
+            {"category_id": category_id, "count": count}
+            for category_id, count in sorted(counts["category"].items())
+        ],
+        "price": _ranges(PRICE_BUCKETS, counts["price"]),
+        "rating": _ranges(RATING_BUCKETS, counts["rating"]),
+    }
@@ -0,0 +1,54 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class HashingPool:
+    """
+    Выносит хеширование паролей из event loop в отдельный пул потоков.
+    argon2-cffi отпускает GIL, поэтому потоков достаточно.
+    Очередь ожидающих вызовов ведётся в event loop, её глубина доступна в stats().
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = asyncio.Semaphore(workers)
+        self.queued = 0
+        self.in_flight = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        enqueued_at = time.perf_counter()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+
+        started_at = time.perf_counter()
+        self.total_wait += started_at - enqueued_at
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.total_run += time.perf_counter() - started_at
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "avg_wait_ms": self.total_wait / self.completed * 1000 if self.completed else 0.0,
+            "avg_run_ms": self.total_run / self.completed * 1000 if self.completed else 0.0,
+        }
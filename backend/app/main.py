@@ -1,15 +1,44 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware import Middleware
 
-from app.routers import categories, products, users, reviews
+from app.admission import AdmissionMiddleware, admission
+from app.config import DB_POOL_PREWARM
+from app.database import dispose_engine, init_engine, prewarm_engine
+from app.metrics import MetricsMiddleware, render_metrics
+from app.serialization import TimedORJSONResponse
+from app.snapshots import SnapshotMiddleware, catalog_snapshots
+from app.singleflight import catalog_flights
+from app.routers import categories, products, users, reviews, stats
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Поднимает пул соединений при старте и закрывает его при остановке
+    """
+    engine = init_engine()
+    await prewarm_engine(engine, DB_POOL_PREWARM)
+    catalog_snapshots.warm()
+    yield
+    await catalog_snapshots.close()
+    await dispose_engine()
 
 
 app = FastAPI(
     title="FastAPI Интернет-магазин",
     version="0.1.0",
+    default_response_class=TimedORJSONResponse,
+    lifespan=lifespan,
 )
 
+# Добавлен первым, поэтому внутренний: ответы 503 проходят через CORS, preflight-запросы не ограничиваются
+app.add_middleware(AdmissionMiddleware)
+# Снимки снаружи контроля допуска: готовые ответы из памяти отдаются и под перегрузкой
+app.add_middleware(SnapshotMiddleware)
 app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],           # Разрешенные домены
@@ -19,6 +48,8 @@ app.add_middleware(
         expose_headers=["*"],                    # Какие заголовки доступны клиенту
         max_age=600,                            # Кэшировать preflight запросы на 10 минут
 )
+# Добавлен последним, поэтому внешний: меряет весь запрос, включая CORS
+app.add_middleware(MetricsMiddleware)
 
 # Создаём приложение FastAPI
 
@@ -28,6 +59,16 @@ app.include_router(categories.router)
 app.include_router(products.router)
 app.include_router(users.router)
 app.include_router(reviews.router)
+app.include_router(stats.router)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Гистограммы по маршрутам, состояние контроля допуска и объединения чтений в текстовом формате Prometheus
+    """
+    body = render_metrics() + "\n".join(admission.render_metrics() + catalog_flights.render_metrics()) + "\n"
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
 
 # Корневой эндпоинт для проверки
 @app.get("/")
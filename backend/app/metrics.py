@@ -0,0 +1,155 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import SERVER_TIMING
+
+
+@dataclass
+class RequestStats:
+    """
+    Счётчики одного HTTP-запроса, копятся в contextvar
+    """
+    queries: int = 0
+    db_time: float = 0.0
+    pool_wait: float = 0.0
+    serialization: float = 0.0
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> RequestStats | None:
+    return _request_stats.get()
+
+
+def record_pool_wait(wait: float) -> None:
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.pool_wait += wait
+
+
+def record_serialization(duration: float) -> None:
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.serialization += duration
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - context._query_started
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Подписывает Engine на события выполнения запросов.
+    Для AsyncEngine передаётся его sync_engine
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class Histogram:
+    """
+    Гистограмма Prometheus с метками route и method
+    """
+
+    def __init__(self, name: str, help: str, buckets: list[float]):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # метки -> [счётчики по корзинам (последняя — +Inf), сумма]
+        self._series: defaultdict[tuple[str, str], list] = defaultdict(lambda: [[0] * (len(buckets) + 1), 0.0])
+
+    def observe(self, labels: tuple[str, str], value: float) -> None:
+        series = self._series[labels]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for (route, method), (counts, total) in sorted(self._series.items()):
+            labels = f'route="{route}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip([*self.buckets, "+Inf"], counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+_SECONDS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+REQUEST_DURATION = Histogram("http_request_duration_seconds", "Время обработки запроса до начала ответа", _SECONDS)
+REQUEST_QUERIES = Histogram("db_queries_per_request", "Количество SQL-запросов на HTTP-запрос", [0, 1, 2, 3, 5, 8, 13, 21, 50])
+REQUEST_DB_TIME = Histogram("db_time_seconds", "Суммарное время SQL-запросов на HTTP-запрос", _SECONDS)
+REQUEST_POOL_WAIT = Histogram("db_pool_wait_seconds", "Ожидание соединения из пула на HTTP-запрос", _SECONDS)
+REQUEST_SERIALIZATION = Histogram("serialization_seconds", "Время сериализации ответа", _SECONDS)
+
+HISTOGRAMS = [REQUEST_DURATION, REQUEST_QUERIES, REQUEST_DB_TIME, REQUEST_POOL_WAIT, REQUEST_SERIALIZATION]
+
+
+def render_metrics() -> str:
+    return "\n".join(line for histogram in HISTOGRAMS for line in histogram.render()) + "\n"
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.2f}"
+
+
+class MetricsMiddleware:
+    """
+    Чистый ASGI-middleware: заводит счётчики запроса, добавляет заголовок Server-Timing
+    и после ответа пишет значения в гистограммы по шаблону маршрута
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        elapsed = 0.0
+
+        async def send_with_timing(message):
+            nonlocal elapsed
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - started
+                if SERVER_TIMING:
+                    timing = (
+                        f'db;dur={_ms(stats.db_time)};desc="{stats.queries} queries", '
+                        f"pool;dur={_ms(stats.pool_wait)}, ser;dur={_ms(stats.serialization)}, "
+                        f"total;dur={_ms(elapsed)}"
+                    )
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
+            # Шаблон пути, а не сам путь, чтобы число рядов не росло с числом id
+            route = scope.get("route")
+            labels = (getattr(route, "path", "unmatched"), scope["method"])
+            REQUEST_DURATION.observe(labels, elapsed or time.perf_counter() - started)
+            REQUEST_QUERIES.observe(labels, stats.queries)
+            REQUEST_DB_TIME.observe(labels, stats.db_time)
+            REQUEST_POOL_WAIT.observe(labels, stats.pool_wait)
+            REQUEST_SERIALIZATION.observe(labels, stats.serialization)
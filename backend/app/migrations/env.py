@@ -7,7 +7,9 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 
 from alembic import context
 
+from app.config import DATABASE_URL, MIGRATION_LOCK_TIMEOUT, MIGRATION_STATEMENT_TIMEOUT
 from app.database import Base
+from app.migrations.helpers import apply_session_timeouts
 from app import models
 
 # this is the Alembic Config object, which provides
@@ -19,6 +21,9 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# Строка подключения та же, что у приложения (DATABASE_URL), а не из alembic.ini
+config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
@@ -49,6 +54,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        transaction_per_migration=True,
     )
 
     with context.begin_transaction():
@@ -56,7 +62,15 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    apply_session_timeouts(connection, MIGRATION_LOCK_TIMEOUT, MIGRATION_STATEMENT_TIMEOUT)
+
+    # Каждая ревизия в своей транзакции: долгая миграция не держит блокировки предыдущих,
+    # а сбой откатывает только её
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        transaction_per_migration=True,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
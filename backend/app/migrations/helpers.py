@@ -0,0 +1,199 @@
+"""
+Помощники для миграций больших таблиц без долгих блокировок.
+
+Каждая ревизия выполняется в своей транзакции (transaction_per_migration в env.py),
+а помощники, которым нужна работа вне транзакции, сами открывают autocommit_block.
+На SQLite (локальная разработка) они вырождаются в обычные операции Alembic.
+"""
+import logging
+import re
+import time
+from contextlib import contextmanager
+
+import sqlalchemy as sa
+from alembic import op
+
+
+log = logging.getLogger("alembic.runtime.migration")
+
+BACKFILL_BATCH_SIZE = 10000
+
+# Единицы таймаутов в формате PostgreSQL; без единицы — миллисекунды
+_TIMEOUT_UNITS = {"ms": 1, "s": 1000, "min": 60_000, "h": 3_600_000, "d": 86_400_000}
+
+
+def timeout_ms(value: str) -> int:
+    """
+    Таймаут вида "5s", "500ms", "2min" или "0" в миллисекундах
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*(ms|s|min|h|d)?\s*", value)
+    if match is None:
+        raise ValueError(f"Invalid timeout: {value!r}")
+    return int(match[1]) * _TIMEOUT_UNITS[match[2] or "ms"]
+
+
+def apply_session_timeouts(connection: sa.Connection, lock_timeout: str, statement_timeout: str) -> None:
+    """
+    Ограничивает ожидание блокировок на всё время миграций: лучше упасть и повторить,
+    чем копить очередь запросов за DDL. На PostgreSQL — lock_timeout и statement_timeout сессии,
+    они переживают и транзакции ревизий, и autocommit_block помощников. На SQLite — busy_timeout:
+    сколько ждать, пока другое соединение держит запись; statement_timeout там нет.
+    "0" — без ограничения (на SQLite остаётся таймаут драйвера)
+    """
+    lock_ms, statement_ms = timeout_ms(lock_timeout), timeout_ms(statement_timeout)
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET lock_timeout = {lock_ms}")
+        connection.exec_driver_sql(f"SET statement_timeout = {statement_ms}")
+        connection.commit()
+    elif connection.dialect.name == "sqlite" and lock_ms:
+        connection.exec_driver_sql(f"PRAGMA busy_timeout = {lock_ms}")
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+@contextmanager
+def _sqlite_batch(table: str):
+    """
+    batch_alter_table на SQLite пересоздаёт таблицу и теряет её триггеры (например, FTS5) — восстанавливаем их
+    """
+    triggers = op.get_bind().execute(
+        sa.text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = :table"),
+        {"table": table},
+    ).scalars().all()
+    with op.batch_alter_table(table) as batch:
+        yield batch
+    for trigger in triggers:
+        op.execute(sa.text(trigger))
+
+
+def _drop_invalid_index(name: str) -> None:
+    """
+    Прерванный CREATE INDEX CONCURRENTLY оставляет INVALID-индекс, который нужно удалить перед повтором
+    """
+    invalid = op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    ).first()
+    if invalid is not None:
+        log.warning("Dropping invalid index %s left by an interrupted build", name)
+        op.execute(sa.text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+
+
+def create_index_concurrently(name: str, table: str, columns: list, **kw) -> None:
+    """
+    CREATE INDEX CONCURRENTLY вне транзакции: таблица доступна на запись всё время построения.
+    Повторный запуск после сбоя безопасен
+    """
+    with op.get_context().autocommit_block():
+        if _is_postgresql():
+            _drop_invalid_index(name)
+        op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
+
+
+def drop_index_concurrently(name: str, table: str) -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def backfill(
+    table: str,
+    assignments: str,
+    where: str | None = None,
+    batch_size: int = BACKFILL_BATCH_SIZE,
+    pause: float = 0.0,
+    key: str = "id",
+) -> int:
+    """
+    UPDATE table SET <assignments> пачками по диапазонам ключа, каждая пачка — отдельная транзакция.
+    Блокировки строк держатся недолго, реплики успевают догонять, между пачками можно сделать паузу.
+    where ограничивает строки (например, "col IS NULL"), чтобы прерванный backfill можно было продолжить
+    """
+    bind = op.get_bind()
+    total = 0
+    with op.get_context().autocommit_block():
+        low, high = bind.execute(sa.text(f"SELECT min({key}), max({key}) FROM {table}")).one()
+        if low is None:
+            return 0
+        condition = f"{key} >= :start AND {key} < :stop" + (f" AND ({where})" if where else "")
+        statement = sa.text(f"UPDATE {table} SET {assignments} WHERE {condition}")
+        started = time.monotonic()
+        for start in range(low, high + 1, batch_size):
+            total += bind.execute(statement, {"start": start, "stop": start + batch_size}).rowcount
+            done = min(start + batch_size - low, high - low + 1) / (high - low + 1)
+            log.info("Backfill %s: %.0f%%, %d rows, %.1f s", table, done * 100, total, time.monotonic() - started)
+            if pause:
+                time.sleep(pause)
+    return total
+
+
+def add_check_constraint(name: str, table: str, condition: str) -> None:
+    """
+    CHECK в два шага: NOT VALID берёт блокировку лишь на мгновение,
+    VALIDATE проверяет существующие строки, не блокируя запись
+    """
+    if not _is_postgresql():
+        with _sqlite_batch(table) as batch:
+            batch.create_check_constraint(name, sa.text(condition))
+        return
+    op.execute(sa.text(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" CHECK ({condition}) NOT VALID'))
+    _validate_constraint(name, table)
+
+
+def add_foreign_key(name: str, source: str, referent: str, local_cols: list[str], remote_cols: list[str], **kw) -> None:
+    """
+    Внешний ключ через NOT VALID + VALIDATE, по той же схеме, что и add_check_constraint
+    """
+    if not _is_postgresql():
+        with _sqlite_batch(source) as batch:
+            batch.create_foreign_key(name, referent, local_cols, remote_cols, **kw)
+        return
+    op.create_foreign_key(name, source, referent, local_cols, remote_cols, postgresql_not_valid=True, **kw)
+    _validate_constraint(name, source)
+
+
+def _validate_constraint(name: str, table: str) -> None:
+    # VALIDATE в отдельной транзакции, чтобы не держать блокировку от ADD CONSTRAINT всё время проверки
+    with op.get_context().autocommit_block():
+        op.execute(sa.text(f'ALTER TABLE {table} VALIDATE CONSTRAINT "{name}"'))
+
+
+def set_not_null(table: str, column: str) -> None:
+    """
+    SET NOT NULL без полного сканирования под ACCESS EXCLUSIVE: PostgreSQL 12+ пропускает проверку,
+    если есть проверенный CHECK (column IS NOT NULL)
+    """
+    if not _is_postgresql():
+        with _sqlite_batch(table) as batch:
+            batch.alter_column(column, nullable=False)
+        return
+    check = f"{table}_{column}_not_null"
+    add_check_constraint(check, table, f"{column} IS NOT NULL")
+    op.alter_column(table, column, nullable=False)
+    op.drop_constraint(check, table, type_="check")
+
+
+def add_column_with_backfill(
+    table: str,
+    column: sa.Column,
+    value: str,
+    nullable: bool = True,
+    batch_size: int = BACKFILL_BATCH_SIZE,
+    pause: float = 0.0,
+) -> int:
+    """
+    Добавляет колонку без перезаписи таблицы: сначала nullable, затем backfill пачками
+    выражением value, затем при nullable=False — NOT NULL через проверенный CHECK
+    """
+    column.nullable = True
+    op.add_column(table, column)
+    updated = backfill(
+        table, f"{column.name} = {value}", where=f"{column.name} IS NULL", batch_size=batch_size, pause=pause,
+    )
+    if not nullable:
+        set_not_null(table, column.name)
+    return updated
@@ -0,0 +1,46 @@
+"""add_product_rating_aggregates
+
+Revision ID: 35d7c509462d
+Revises: 7299cbfe5509
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '35d7c509462d'
+down_revision: Union[str, Sequence[str], None] = '7299cbfe5509'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Константный server_default: на PostgreSQL 11+ колонка добавляется без перезаписи таблицы
+    op.add_column('products', sa.Column('rating_sum', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('products', sa.Column('rating_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Заполняем агрегаты одним UPDATE по сгруппированным отзывам
+    op.execute("""
+        UPDATE products
+        SET rating_sum = agg.grade_sum,
+            rating_count = agg.grade_count,
+            rating = CAST(agg.grade_sum AS FLOAT) / agg.grade_count
+        FROM (
+            SELECT product_id, SUM(grade) AS grade_sum, COUNT(*) AS grade_count
+            FROM reviews
+            WHERE is_active = true
+            GROUP BY product_id
+        ) AS agg
+        WHERE products.id = agg.product_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('products', 'rating_count')
+    op.drop_column('products', 'rating_sum')
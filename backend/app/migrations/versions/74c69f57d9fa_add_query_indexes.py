@@ -0,0 +1,51 @@
+"""add_query_indexes
+
+Revision ID: 74c69f57d9fa
+Revises: 35d7c509462d
+Create Date: 2026-10-18 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '74c69f57d9fa'
+down_revision: Union[str, Sequence[str], None] = '35d7c509462d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (имя, таблица, колонки, только активные строки)
+INDEXES = [
+    ('ix_products_active_id', 'products', ['id'], True),
+    ('ix_products_active_price_id', 'products', ['price', 'id'], True),
+    ('ix_products_active_rating_id', 'products', ['rating', 'id'], True),
+    ('ix_products_category_id_active', 'products', ['category_id', 'id'], True),
+    ('ix_reviews_product_id_active', 'reviews', ['product_id', 'id'], True),
+    ('ix_reviews_product_id_user_id_active', 'reviews', ['product_id', 'user_id'], True),
+    ('ix_categories_parent_id', 'categories', ['parent_id'], False),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns, active_only in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_where=sa.text('is_active') if active_only else None,
+                # SQLite применяет частичный индекс, только если условие совпадает с запросом дословно
+                sqlite_where=sa.text('is_active = 1') if active_only else None,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,69 @@
+"""add_product_search
+
+Revision ID: b3f1c2d4e5a6
+Revises: 74c69f57d9fa
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f1c2d4e5a6'
+down_revision: Union[str, Sequence[str], None] = '74c69f57d9fa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# DDL продублирован из app/models/products.py, чтобы миграция не зависела от текущих моделей
+SQLITE_STATEMENTS = [
+    """CREATE VIRTUAL TABLE products_fts USING fts5(
+        name, description, content='products', content_rowid='id'
+    )""",
+    """CREATE TRIGGER products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    """CREATE TRIGGER products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    """CREATE TRIGGER products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    # Индексируем уже существующие товары
+    "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # Добавление STORED-колонки переписывает таблицу под ACCESS EXCLUSIVE блокировкой
+        op.execute(
+            """ALTER TABLE products ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+                to_tsvector('russian', coalesce(name, '') || ' ' || coalesce(description, ''))
+            ) STORED"""
+        )
+        with op.get_context().autocommit_block():
+            op.execute('CREATE INDEX CONCURRENTLY ix_products_search_vector ON products USING gin (search_vector)')
+    elif dialect == 'sqlite':
+        for statement in SQLITE_STATEMENTS:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_products_search_vector')
+        op.execute('ALTER TABLE products DROP COLUMN search_vector')
+    elif dialect == 'sqlite':
+        for trigger in ('products_fts_au', 'products_fts_ad', 'products_fts_ai'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS products_fts')
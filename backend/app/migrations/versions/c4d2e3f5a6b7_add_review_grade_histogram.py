@@ -0,0 +1,67 @@
+"""add_review_grade_histogram
+
+Revision ID: c4d2e3f5a6b7
+Revises: b3f1c2d4e5a6
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migrations.helpers import backfill, create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d2e3f5a6b7'
+down_revision: Union[str, Sequence[str], None] = 'b3f1c2d4e5a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+GRADES = range(1, 6)
+
+# (имя, колонки) — частичные индексы по активным отзывам для пагинации по comment_date
+REVIEW_INDEXES = [
+    ('ix_reviews_product_id_comment_date_active', ['product_id', 'comment_date', 'id']),
+    ('ix_reviews_active_comment_date_id', ['comment_date', 'id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Константный server_default: на PostgreSQL 11+ колонки добавляются без перезаписи таблицы
+    for grade in GRADES:
+        op.add_column('products', sa.Column(f'grade_{grade}_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Пересчитываем только товары с отзывами, пачками по id
+    backfill(
+        'products',
+        ', '.join(
+            f'grade_{grade}_count = (SELECT count(*) FROM reviews '
+            f'WHERE reviews.product_id = products.id AND reviews.is_active = true AND reviews.grade = {grade})'
+            for grade in GRADES
+        ),
+        where='EXISTS (SELECT 1 FROM reviews WHERE reviews.product_id = products.id AND reviews.is_active = true)',
+    )
+
+    for name, columns in REVIEW_INDEXES:
+        create_index_concurrently(
+            name, 'reviews', columns,
+            postgresql_where=sa.text('is_active'), sqlite_where=sa.text('is_active = 1'),
+        )
+    # Отзывы товара теперь читаются по comment_date, индекс по (product_id, id) не нужен
+    drop_index_concurrently('ix_reviews_product_id_active', 'reviews')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    create_index_concurrently(
+        'ix_reviews_product_id_active', 'reviews', ['product_id', 'id'],
+        postgresql_where=sa.text('is_active'), sqlite_where=sa.text('is_active = 1'),
+    )
+    for name, _ in reversed(REVIEW_INDEXES):
+        drop_index_concurrently(name, 'reviews')
+    for grade in reversed(GRADES):
+        op.drop_column('products', f'grade_{grade}_count')
@@ -1,4 +1,4 @@
-from sqlalchemy import String, ForeignKey
+from sqlalchemy import DDL, String, ForeignKey, Index, event, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import TYPE_CHECKING
 
@@ -14,6 +14,17 @@ if TYPE_CHECKING:
 
 class Product(Base):
     __tablename__ = "products"
+    # Частичные индексы под списки активных товаров и их сортировки
+    __table_args__ = (
+        Index("ix_products_active_id", "id",
+              postgresql_where=text("is_active"), sqlite_where=text("is_active = 1")),
+        Index("ix_products_active_price_id", "price", "id",
+              postgresql_where=text("is_active"), sqlite_where=text("is_active = 1")),
+        Index("ix_products_active_rating_id", "rating", "id",
+              postgresql_where=text("is_active"), sqlite_where=text("is_active = 1")),
+        Index("ix_products_category_id_active", "category_id", "id",
+              postgresql_where=text("is_active"), sqlite_where=text("is_active = 1")),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
@@ -23,6 +34,15 @@ class Product(Base):
     stock: Mapped[int] = mapped_column(nullable=False)
     is_active: Mapped[bool] = mapped_column(default=True)
     rating: Mapped[float] = mapped_column(default=0.0, nullable=False)
+    # Агрегаты активных отзывов, rating = rating_sum / rating_count
+    rating_sum: Mapped[int] = mapped_column(default=0, server_default="0", nullable=False)
+    rating_count: Mapped[int] = mapped_column(default=0, server_default="0", nullable=False)
+    # Гистограмма оценок активных отзывов для GET /reviews/products/{id}/reviews/summary
+    grade_1_count: Mapped[int] = mapped_column(default=0, server_default="0", nullable=False)
+    grade_2_count: Mapped[int] = mapped_column(default=0, server_default="0", nullable=False)
+    grade_3_count: Mapped[int] = mapped_column(default=0, server_default="0", nullable=False)
+    grade_4_count: Mapped[int] = mapped_column(default=0, server_default="0", nullable=False)
+    grade_5_count: Mapped[int] = mapped_column(default=0, server_default="0", nullable=False)
 
     category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"), nullable=False)
     seller_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
@@ -30,4 +50,40 @@ class Product(Base):
     category: Mapped["Category"] = relationship("Category", back_populates="products")
     seller: Mapped["User"] = relationship("User", back_populates="products")
     
-    reviews: Mapped[list["Review"]] = relationship("Review", back_populates="product")
\ No newline at end of file
+    reviews: Mapped[list["Review"]] = relationship("Review", back_populates="product")
+
+
+# Полнотекстовый поиск по name и description (см. app/search.py).
+# PostgreSQL: генерируемая колонка tsvector и GIN-индекс, SQLite: внешняя FTS5-таблица с триггерами.
+# Колонка не отображена в модели, чтобы ORM её не читал и не писал.
+SEARCH_TS_CONFIG = "russian"
+
+SEARCH_DDL = {
+    "postgresql": [
+        f"""ALTER TABLE products ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            to_tsvector('{SEARCH_TS_CONFIG}', coalesce(name, '') || ' ' || coalesce(description, ''))
+        ) STORED""",
+        "CREATE INDEX ix_products_search_vector ON products USING gin (search_vector)",
+    ],
+    "sqlite": [
+        """CREATE VIRTUAL TABLE products_fts USING fts5(
+            name, description, content='products', content_rowid='id'
+        )""",
+        """CREATE TRIGGER products_fts_ai AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+        END""",
+        """CREATE TRIGGER products_fts_ad AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END""",
+        """CREATE TRIGGER products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+        END""",
+    ],
+}
+
+for _dialect, _statements in SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(Product.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
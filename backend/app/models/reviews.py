@@ -1,4 +1,4 @@
-from sqlalchemy import Text, DateTime, ForeignKey
+from sqlalchemy import Text, DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import TYPE_CHECKING
 from datetime import datetime, timezone
@@ -11,12 +11,22 @@ if TYPE_CHECKING:
 
 class Review(Base):
     __tablename__ = "reviews"
+    __table_args__ = (
+        # Отзывы товара и все отзывы, от новых к старым
+        Index("ix_reviews_product_id_comment_date_active", "product_id", "comment_date", "id",
+              postgresql_where=text("is_active"), sqlite_where=text("is_active = 1")),
+        Index("ix_reviews_active_comment_date_id", "comment_date", "id",
+              postgresql_where=text("is_active"), sqlite_where=text("is_active = 1")),
+        # Проверка повторного отзыва в create_reviews
+        Index("ix_reviews_product_id_user_id_active", "product_id", "user_id",
+              postgresql_where=text("is_active"), sqlite_where=text("is_active = 1")),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), nullable=False)
     comment: Mapped[str | None] = mapped_column(Text, nullable=True)
-    comment_date: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.now(timezone.utc))
+    comment_date: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     grade: Mapped[int] = mapped_column(nullable=False)
     is_active: Mapped[bool] = mapped_column(default=True)
 
@@ -0,0 +1,105 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any
+
+from fastapi import HTTPException, status
+from sqlalchemy import ColumnElement, Select, tuple_
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def _dump_key(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _load_key(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def _key_matches(value: Any, key: ColumnElement) -> bool:
+    """
+    Проверяет, что значение из курсора подходит по типу к колонке сортировки:
+    иначе asyncpg упадёт на привязке параметра уже при выполнении запроса
+    """
+    if isinstance(value, bool):
+        return False
+    python_type = key.type.python_type
+    if python_type in (float, Decimal):
+        return isinstance(value, (int, float))
+    return isinstance(value, python_type)
+
+
+def encode_cursor(sort: str, key: Any, row_id: int) -> str:
+    """
+    Упаковывает позицию последней строки страницы в непрозрачный курсор
+    """
+    raw = json.dumps([sort, _dump_key(key), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, key: ColumnElement) -> tuple[Any, int]:
+    """
+    Распаковывает курсор и проверяет, что он выдан для той же сортировки
+    и значение ключа подходит к колонке key
+    """
+    invalid_cursor = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor"
+    )
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, last_key, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        last_key = _load_key(last_key)
+    except (ValueError, TypeError):
+        raise invalid_cursor
+    if cursor_sort != sort or not isinstance(row_id, int) or isinstance(row_id, bool):
+        raise invalid_cursor
+    if not _key_matches(last_key, key):
+        raise invalid_cursor
+    return last_key, row_id
+
+
+def keyset_paginate(
+    stmt: Select,
+    key: ColumnElement,
+    pk: ColumnElement,
+    sort: str,
+    limit: int,
+    after: str | None = None,
+    descending: bool = False,
+) -> Select:
+    """
+    Добавляет к запросу сортировку по (key, pk) и условие (key, pk) > (:key, :pk).
+    Берём на одну строку больше, чтобы понять, есть ли следующая страница.
+    """
+    if after is not None:
+        last_key, last_id = decode_cursor(after, sort, key)
+        if key is pk:
+            position, last = pk, last_id
+        else:
+            position, last = tuple_(key, pk), (last_key, last_id)
+        stmt = stmt.where(position < last if descending else position > last)
+
+    order = [key] if key is pk else [key, pk]
+    stmt = stmt.order_by(*(column.desc() if descending else column.asc() for column in order))
+    return stmt.limit(limit + 1)
+
+
+def build_page(rows: list, key_name: str, sort: str, limit: int) -> dict:
+    """
+    Отрезает лишнюю строку и формирует курсор на следующую страницу
+    """
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, getattr(last, key_name), last.id)
+    return {"items": rows, "next_cursor": next_cursor}
@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.categories import Category as CategoryModel
-from app.schemas import Category as CategorySchema, CategoryCreate
+from app.schemas import Category as CategorySchema, CategoryCreate, CategoryTreeNode
 from app.db_depends import get_async_db
+from app.serialization import dump_json, json_response, category_list_adapter
+from app.cache import catalog_cache
+from app.events import CATEGORY_CHANGED, publish
+from app.etag import catalog_versions, not_modified
+from app.category_tree import category_tree, subtree_ids
+from app.snapshots import catalog_snapshots
+from app.singleflight import catalog_flights
 
 
 # Создаём маршрутизатор с префиксом и тегом
@@ -14,13 +21,49 @@ router = APIRouter(
 )
 
 
-@router.get("/", response_model=list[CategorySchema])
-async def get_all_categories(db: AsyncSession = Depends(get_async_db)):
-    stmt = select(CategoryModel).where(
+def active_categories_statement():
+    return select(CategoryModel).where(
         CategoryModel.is_active == True
     )
-    result = await db.scalars(stmt)
-    return result.all()
+
+
+@catalog_flights.coalesce(lambda: ("categories",))
+@catalog_snapshots.register(
+    "categories", routes=[("/categories/", "")], etag_keys=[("categories",)], topics=[CATEGORY_CHANGED],
+)
+async def load_categories(db: AsyncSession) -> bytes:
+    result = await db.scalars(active_categories_statement())
+    return dump_json(category_list_adapter, result.all())
+
+
+@catalog_flights.coalesce(lambda: ("category_tree",))
+@catalog_snapshots.register(
+    "category_tree", routes=[("/categories/tree", "")], etag_keys=[("categories",)], topics=[CATEGORY_CHANGED],
+)
+async def load_category_tree(db: AsyncSession) -> bytes:
+    return await category_tree.get(db)
+
+
+@router.get("/", response_model=list[CategorySchema])
+async def get_all_categories(request: Request):
+    etag = catalog_versions.etag(("categories",))
+    if (cached := not_modified(request, etag, exists=True)) is not None:
+        return cached
+
+    payload = await catalog_cache.get_or_load(("categories",), load_categories)
+    return json_response(payload, headers={"ETag": etag})
+
+
+@router.get("/tree", response_model=list[CategoryTreeNode])
+async def get_category_tree(request: Request):
+    """
+    Возвращает дерево активных категорий из памяти, без обхода по одному запросу на уровень.
+    """
+    etag = catalog_versions.etag(("categories",))
+    if (cached := not_modified(request, etag, exists=True)) is not None:
+        return cached
+
+    return json_response(await load_category_tree(), headers={"ETag": etag})
 
 
 @router.post("/", response_model=CategorySchema, status_code=status.HTTP_201_CREATED)
@@ -40,6 +83,7 @@ async def create_category(category: CategoryCreate, db: AsyncSession = Depends(g
     db_category = CategoryModel(**category.model_dump())
     db.add(db_category)
     await db.commit()
+    publish(CATEGORY_CHANGED, category_id=db_category.id)
     return db_category
 
 
@@ -79,13 +123,14 @@ async def update_category(category_id: int, category: CategoryCreate, db: AsyncS
         .values(**category.model_dump())
     )
     await db.commit()
+    publish(CATEGORY_CHANGED, category_id=category_id)
     return db_category
 
 
 @router.delete("/{category_id}", status_code=status.HTTP_200_OK)
 async def delete_category(category_id: int, db: AsyncSession = Depends(get_async_db)):
     """
-    Удаляет категорию по её ID.
+    Удаляет категорию по её ID вместе со всеми подкатегориями.
     """
     stmt = select(CategoryModel).where(
         CategoryModel.id == category_id,
@@ -99,12 +144,15 @@ async def delete_category(category_id: int, db: AsyncSession = Depends(get_async
             detail="Category not found"
         )
     
+    # Поддерево снимается одним UPDATE по рекурсивному CTE, без осиротевших потомков
+    subtree = subtree_ids(category_id, active_only=False)
     stmt_delete = update(CategoryModel).where(
-        CategoryModel.id == category_id
+        CategoryModel.id.in_(select(subtree.c.id))
     ).values(is_active=False)
-    
+
     await db.execute(stmt_delete)
     await db.commit()
+    publish(CATEGORY_CHANGED, category_id=category_id)
 
 
     return {
@@ -1,14 +1,33 @@
 import stat
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select, update
+from functools import partial
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import ColumnElement, Float, Integer, Select, any_, bindparam, cast, column, func, select, update, values
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.products import Product as ProductModel
-from app.schemas import Product as ProductSchema, ProductCreate
+from app.schemas import (
+    Product as ProductSchema, ProductBulkUpdateItem, ProductBulkUpdateReport, ProductCreate,
+    ProductImportReport, ProductPage,
+)
 from app.models.categories import Category as CategoryModel
-from app.db_depends import get_async_db
-from app.models.users import User as UserModel
-from app.auth import get_current_seller
+from app.db_depends import get_async_db, get_async_read_db
+from app.auth import Principal, get_current_seller
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_paginate, build_page
+from app.streaming import NDJSON_MEDIA_TYPE, export_statement, ndjson_response
+from app.serialization import (
+    dump_json, fast_json_response, json_response, product_adapter, product_list_adapter, product_page_adapter,
+)
+from app.cache import catalog_cache
+from app.events import PRODUCT_CHANGED, PRODUCTS_CHANGED, publish
+from app.etag import catalog_versions, not_modified
+from app.category_tree import subtree_ids
+from app.search import search_products
+from app.facets import ProductFilters, product_facets, product_filters
+from app.bulk_import import CSV_MEDIA_TYPE, ProductImporter, iter_csv_rows, iter_lines, iter_ndjson_rows
+from app.snapshots import catalog_snapshots
+from app.singleflight import SingleFlight, get_single_flight
 
 
 
@@ -18,21 +37,164 @@ router = APIRouter(
     tags=["products"],
 )
 
+# Допустимые ключи сортировки списков товаров, "-" перед ключом — по убыванию
+PRODUCT_SORT_KEYS = {
+    "id": ProductModel.id,
+    "price": ProductModel.price,
+    "rating": ProductModel.rating,
+}
+PRODUCT_SORT_PATTERN = "^-?(id|price|rating)$"
+
+# Массовое обновление: позиций в запросе и строк в одном UPDATE
+BULK_UPDATE_MAX_ITEMS = 50000
+BULK_UPDATE_BATCH_SIZE = 1000
+# Сколько товаров можно запросить в GET /products/batch
+PRODUCT_BATCH_MAX_IDS = 100
+
+
+def paginate_products(stmt: Select, sort: str, limit: int, after: str | None) -> Select:
+    """
+    Добавляет к запросу товаров курсорную пагинацию по (sort_key, id)
+    """
+    return keyset_paginate(
+        stmt,
+        key=PRODUCT_SORT_KEYS[sort.lstrip("-")],
+        pk=ProductModel.id,
+        sort=sort,
+        limit=limit,
+        after=after,
+        descending=sort.startswith("-"),
+    )
+
+
+async def fetch_product_page(db: AsyncSession, stmt: Select, sort: str, limit: int, after: str | None) -> dict:
+    """
+    Выполняет запрос товаров с курсорной пагинацией по (sort_key, id)
+    """
+    result = await db.execute(paginate_products(stmt, sort=sort, limit=limit, after=after))
+    return build_page(result.scalars().all(), key_name=sort.lstrip("-"), sort=sort, limit=limit)
+
 
-@router.get("/", response_model=list[ProductSchema], status_code=status.HTTP_200_OK)
-async def get_all_products(db: AsyncSession = Depends(get_async_db)):
+def category_products_statement(category_id: int, include_subcategories: bool) -> Select:
     """
-    Возвращает список всех товаров.
+    Активные товары категории или всего её поддерева, без сортировки и пагинации
     """
-    stmt_products = select(ProductModel).where(
+    if include_subcategories:
+        subtree = subtree_ids(category_id)
+        category_filter = ProductModel.category_id.in_(select(subtree.c.id))
+    else:
+        category_filter = ProductModel.category_id == category_id
+    return select(ProductModel).where(
+        category_filter,
         ProductModel.is_active == True
     )
-    result_products = await db.execute(stmt_products)
-    return result_products.scalars().all()
+
+
+def product_detail_statement(product_id: int) -> Select:
+    """
+    Товар и состояние его категории одним запросом
+    """
+    return (
+        select(ProductModel, CategoryModel.is_active)
+        .outerjoin(CategoryModel, CategoryModel.id == ProductModel.category_id)
+        .where(ProductModel.id == product_id, ProductModel.is_active == True)
+    )
+
+
+def id_in(key: ColumnElement, ids: list[int], dialect: str) -> ColumnElement:
+    """
+    Условие key IN ids. На PostgreSQL — key = ANY(:ids) с одним параметром-массивом:
+    текст запроса не зависит от числа id, и asyncpg переиспользует подготовленное выражение
+    """
+    if dialect == "postgresql":
+        return key == any_(bindparam("ids", ids, type_=ARRAY(Integer), unique=True))
+    return key.in_(ids)
+
+
+def product_batch_statement(product_ids: list[int], dialect: str) -> Select:
+    """
+    Активные товары активных категорий из списка product_ids, в любом порядке
+    """
+    return (
+        select(ProductModel)
+        .join(CategoryModel, CategoryModel.id == ProductModel.category_id)
+        .where(
+            id_in(ProductModel.id, product_ids, dialect),
+            ProductModel.is_active == True,
+            CategoryModel.is_active == True,
+        )
+    )
+
+
+async def load_first_page(db: AsyncSession, sort: str) -> bytes:
+    """
+    Первая страница списка товаров без фильтров, такая же, как у GET /products/?sort=...
+    """
+    stmt_products = select(ProductModel).where(*ProductFilters().clauses())
+    page = await fetch_product_page(db, stmt_products, sort=sort, limit=DEFAULT_PAGE_SIZE, after=None)
+    return dump_json(product_page_adapter, page)
+
+
+# Снимки первых страниц для каждой сортировки; без параметров — сортировка по id
+for _sort in [prefix + key for key in PRODUCT_SORT_KEYS for prefix in ("", "-")]:
+    catalog_snapshots.register(
+        f"products:{_sort}",
+        routes=[("/products/", f"sort={_sort}")] + ([("/products/", "")] if _sort == "id" else []),
+        etag_keys=[("products",)],
+        topics=[PRODUCT_CHANGED, PRODUCTS_CHANGED],
+    )(partial(load_first_page, sort=_sort))
+
+
+@router.get("/", response_model=ProductPage, status_code=status.HTTP_200_OK)
+async def get_all_products(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+    after: str | None = Query(None, description="Курсор, полученный в next_cursor"),
+    sort: str = Query("id", pattern=PRODUCT_SORT_PATTERN, description="Сортировка: id, price, rating, с '-' по убыванию"),
+    filters: ProductFilters = Depends(product_filters),
+    facets: bool = Query(False, description="Вернуть счётчики по категориям, цене и рейтингу"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Возвращает страницу активных товаров с учётом фильтров.
+    С facets=true в ответ добавляются счётчики для всех подходящих товаров.
+    """
+    etag = catalog_versions.etag(("products",))
+    if (cached := not_modified(request, etag, exists=True)) is not None:
+        return cached
+
+    stmt_products = select(ProductModel).where(*filters.clauses())
+    page = await fetch_product_page(db, stmt_products, sort=sort, limit=limit, after=after)
+    if facets:
+        page["facets"] = await product_facets(db, filters)
+    return fast_json_response(product_page_adapter, page, headers={"ETag": etag})
+
+
+@router.get("/search", response_model=ProductPage, status_code=status.HTTP_200_OK)
+async def search(
+    q: str = Query(min_length=1, max_length=200, description="Поисковый запрос по названию и описанию"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+    after: str | None = Query(None, description="Курсор, полученный в next_cursor"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Полнотекстовый поиск по активным товарам, от более релевантных к менее.
+    """
+    page = await search_products(db, q, limit=limit, after=after)
+    return fast_json_response(product_page_adapter, page)
+
+
+@router.get("/export", response_class=StreamingResponse, responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}})
+async def export_products(include_inactive: bool = Query(False, description="Выгружать и неактивные товары")):
+    """
+    Потоково выгружает товары в формате NDJSON, по одному товару на строку.
+    """
+    where = () if include_inactive else (ProductModel.is_active == True,)
+    return ndjson_response(export_statement(ProductModel, ProductSchema, *where), filename="products.ndjson")
 
 
 @router.post("/products", response_model=ProductSchema, status_code=status.HTTP_201_CREATED)
-async def create_product(product: ProductCreate, db: AsyncSession = Depends(get_async_db), current_user: UserModel = Depends(get_current_seller)):
+async def create_product(product: ProductCreate, db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_seller)):
     """
     Создаёт новый товар привязанный к продавцу.
     """
@@ -52,156 +214,293 @@ async def create_product(product: ProductCreate, db: AsyncSession = Depends(get_
     db.add(db_product)
     await db.commit()
     await db.refresh(db_product)
+    publish(PRODUCT_CHANGED, product_id=db_product.id, category_ids=[db_product.category_id])
     return db_product
 
 
-@router.get("/category/{category_id}", response_model=list[ProductSchema], status_code=status.HTTP_200_OK)
-async def get_products_by_category(category_id: int, db: AsyncSession = Depends(get_async_db)):
+@router.post(
+    "/import",
+    response_model=ProductImportReport,
+    status_code=status.HTTP_200_OK,
+    openapi_extra={"requestBody": {"content": {CSV_MEDIA_TYPE: {}, NDJSON_MEDIA_TYPE: {}}, "required": True}},
+)
+async def import_products(request: Request, db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_seller)):
     """
-    Возвращает список товаров в указанной категории по её ID.
+    Массово создаёт товары продавца из тела запроса в формате CSV (text/csv, первая строка — заголовок)
+    или NDJSON (application/x-ndjson). Строки с ошибками пропускаются и перечисляются в отчёте.
     """
-    stmt_category = select(CategoryModel).where(
-        CategoryModel.id == category_id,
-        CategoryModel.is_active == True,
-    )
-    result_category = await db.execute(stmt_category)
-    category = result_category.scalar()
-    if category is None:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == CSV_MEDIA_TYPE:
+        parse = iter_csv_rows
+    elif content_type == NDJSON_MEDIA_TYPE:
+        parse = iter_ndjson_rows
+    else:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Category not found"
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Expected {CSV_MEDIA_TYPE} or {NDJSON_MEDIA_TYPE}"
         )
-    
-    stmt_all = select(ProductModel).where(
-        ProductModel.category_id == category_id,
-        ProductModel.is_active == True
-    )
-    result_all = await db.execute(stmt_all)
-    products = result_all.scalars().all()
-    
-    return products
+    importer = ProductImporter(db, seller_id=current_user.id)
+    return await importer.run(parse(iter_lines(request.stream())))
 
 
-@router.get("/{product_id}", response_model=ProductSchema, status_code=status.HTTP_200_OK)
-async def get_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
+@router.get("/category/{category_id}", response_model=ProductPage, status_code=status.HTTP_200_OK)
+async def get_products_by_category(
+    category_id: int,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+    after: str | None = Query(None, description="Курсор, полученный в next_cursor"),
+    sort: str = Query("id", pattern=PRODUCT_SORT_PATTERN, description="Сортировка: id, price, rating, с '-' по убыванию"),
+    include_subcategories: bool = Query(False, description="Включать товары всех подкатегорий"),
+    flights: SingleFlight = Depends(get_single_flight),
+):
     """
-    Возвращает детальную информацию о товаре по его ID.
+    Возвращает страницу товаров в указанной категории по её ID.
+    С include_subcategories=true — товары всего поддерева категории.
     """
-    stmt_product = select(ProductModel).where(
-        ProductModel.id == product_id,
-        ProductModel.is_active == True
-    )
-    result_product = await db.execute(stmt_product)
-    product = result_product.scalar()
-    if product is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found"
+    # Список поддерева зависит от товаров любых подкатегорий, поэтому привязан ко всей коллекции
+    products_key = ("products",) if include_subcategories else ("category_products", category_id)
+    etag = catalog_versions.etag(("categories",), products_key)
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+
+    async def load_page(db: AsyncSession) -> bytes:
+        stmt_category = select(CategoryModel).where(
+            CategoryModel.id == category_id,
+            CategoryModel.is_active == True,
         )
-    
-    stmt_category = select(CategoryModel).where(
-        CategoryModel.id == product.category_id,
-        CategoryModel.is_active == True
-    )
-    result_category = await db.execute(stmt_category)
-    category = result_category.scalar()
-    if category is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Category not found"
+        result_category = await db.execute(stmt_category)
+        category = result_category.scalar()
+        if category is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Category not found"
+            )
+
+        stmt_all = category_products_statement(category_id, include_subcategories)
+        page = await fetch_product_page(db, stmt_all, sort=sort, limit=limit, after=after)
+        return dump_json(product_page_adapter, page)
+
+    cache_kind = "subtree_products" if include_subcategories else "category_products"
+    key = (cache_kind, category_id, sort, limit, after)
+    payload = await catalog_cache.get_or_load(key, lambda: flights.run(key, load_page))
+    if (cached := not_modified(request, etag, exists=True)) is not None:
+        return cached
+    return json_response(payload, headers={"ETag": etag})
+
+
+def bulk_update_statement(seller_id: int, items: list[ProductBulkUpdateItem]):
+    """
+    Один UPDATE ... FROM (VALUES ...) на пачку. Владелец и активность проверяются
+    в том же WHERE, RETURNING возвращает только реально обновлённые товары.
+    """
+    # VALUES оформлен как CTE: SQLite не понимает список колонок у подзапроса в FROM
+    changes = values(
+        column("id", Integer), column("price", Float), column("stock", Integer),
+        name="changes",
+    ).data([(item.id, item.price, item.stock) for item in items]).cte("changes")
+    return (
+        update(ProductModel)
+        .where(
+            ProductModel.id == changes.c.id,
+            ProductModel.seller_id == seller_id,
+            ProductModel.is_active == True,
+        )
+        .values(
+            # Если в пачке колонка целиком из NULL, PostgreSQL выведет для неё тип text
+            price=func.coalesce(cast(changes.c.price, Float), ProductModel.price),
+            stock=func.coalesce(cast(changes.c.stock, Integer), ProductModel.stock),
         )
-    
-    return product
+        .returning(ProductModel.id, ProductModel.category_id)
+    )
 
 
-@router.patch("/{product_id}", response_model=ProductSchema)
-async def update_product(product_id: int, product: ProductCreate, db: AsyncSession = Depends(get_async_db), current_user: UserModel = Depends(get_current_seller)):
+async def bulk_update_batch(db: AsyncSession, seller_id: int, items: list[ProductBulkUpdateItem]) -> list:
+    return (await db.execute(bulk_update_statement(seller_id, items))).all()
+
+
+@router.patch("/bulk", response_model=ProductBulkUpdateReport, status_code=status.HTTP_200_OK)
+async def bulk_update_products(
+    items: list[ProductBulkUpdateItem] = Body(max_length=BULK_UPDATE_MAX_ITEMS),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_seller),
+):
     """
-    Обновляет товар по его ID, если принадлежит продавцу.
+    Массово меняет цену и остаток товаров продавца. Все изменения применяются в одной транзакции,
+    чужие, несуществующие и неактивные товары отклоняются без ошибки.
+    """
+    # При повторах id побеждает последняя позиция, иначе UPDATE ... FROM выбрал бы любую
+    changes = {item.id: item for item in items if item.price is not None or item.stock is not None}
+    pending = list(changes.values())
+
+    updated = []
+    for start in range(0, len(pending), BULK_UPDATE_BATCH_SIZE):
+        updated += await bulk_update_batch(db, current_user.id, pending[start:start + BULK_UPDATE_BATCH_SIZE])
+    await db.commit()
+
+    applied_ids = {row.id for row in updated}
+    if updated:
+        publish(PRODUCTS_CHANGED, product_ids=applied_ids, category_ids={row.category_id for row in updated})
+    rejected_ids = sorted({item.id for item in items} - applied_ids)
+    return {"applied": len(applied_ids), "rejected": len(rejected_ids), "rejected_ids": rejected_ids}
+
+
+def active_category_exists(category_id):
+    """
+    EXISTS-условие: категория существует и активна.
+    category_id — значение или колонка
+    """
+    return (
+        select(CategoryModel.id)
+        .where(CategoryModel.id == category_id, CategoryModel.is_active == True)
+        .exists()
+    )
+
+
+async def write_rejection(db: AsyncSession, product_id: int, category_id, seller_id: int, action: str) -> HTTPException:
+    """
+    Условный UPDATE не затронул строк — одним запросом выясняем почему.
+    Порядок проверок тот же, что был у пошаговых SELECT: товар, владелец, категория
     """
-    stmt_product = select(ProductModel).where(
+    stmt = select(ProductModel.seller_id, active_category_exists(category_id)).where(
         ProductModel.id == product_id,
         ProductModel.is_active == True
     )
-    result_product = await db.execute(stmt_product)
-    db_product = result_product.scalar()
-    if db_product is None:
-        raise HTTPException(
+    row = (await db.execute(stmt)).one_or_none()
+    if row is None:
+        return HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
-    if db_product.seller_id != current_user.id:
-        raise HTTPException(
+    if row.seller_id != seller_id:
+        return HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="You can only update your own products"
+            detail=f"You can only {action} your own products"
         )
-
-    stmt_category = select(CategoryModel).where(
-        CategoryModel.id == product.category_id,
-        CategoryModel.is_active == True
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Category not found"
     )
-    result_category = await db.execute(stmt_category)
-    db_category = result_category.scalar()
-    if db_category is None:
+
+
+@router.get("/batch", response_model=list[ProductSchema], status_code=status.HTTP_200_OK)
+async def get_products_batch(
+    request: Request,
+    ids: str = Query(pattern=r"^\d+(,\d+)*$", description=f"ID товаров через запятую, не больше {PRODUCT_BATCH_MAX_IDS}"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Возвращает несколько товаров одним запросом, в порядке ids.
+    Отсутствующие и неактивные товары, а также товары неактивных категорий пропускаются.
+    """
+    product_ids = list(dict.fromkeys(int(product_id) for product_id in ids.split(",")))
+    if len(product_ids) > PRODUCT_BATCH_MAX_IDS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Category not found"
+            detail=f"At most {PRODUCT_BATCH_MAX_IDS} ids per request"
         )
+    etag = catalog_versions.etag(("categories",), *(("product", product_id) for product_id in product_ids))
+    if (cached := not_modified(request, etag, exists=True)) is not None:
+        return cached
 
-    await db.execute(
-        update(ProductModel)
+    stmt = product_batch_statement(product_ids, db.get_bind().dialect.name)
+    products = {product.id: product for product in (await db.scalars(stmt)).all()}
+    found = [products[product_id] for product_id in product_ids if product_id in products]
+    return fast_json_response(product_list_adapter, found, headers={"ETag": etag})
+
+
+@router.get("/{product_id}", response_model=ProductSchema, status_code=status.HTTP_200_OK)
+async def get_product(
+    product_id: int,
+    request: Request,
+    flights: SingleFlight = Depends(get_single_flight),
+):
+    """
+    Возвращает детальную информацию о товаре по его ID.
+    """
+    etag = catalog_versions.etag(("categories",), ("product", product_id))
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+
+    async def load_product(db: AsyncSession) -> bytes:
+        row = (await db.execute(product_detail_statement(product_id))).one_or_none()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Product not found"
+            )
+        product, category_active = row
+        if not category_active:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Category not found"
+            )
+        return dump_json(product_adapter, product)
+
+    key = ("product", product_id)
+    payload = await catalog_cache.get_or_load(key, lambda: flights.run(key, load_product))
+    if (cached := not_modified(request, etag, exists=True)) is not None:
+        return cached
+    return json_response(payload, headers={"ETag": etag})
+
+
+@router.patch("/{product_id}", response_model=ProductSchema)
+async def update_product(product_id: int, product: ProductCreate, db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_seller)):
+    """
+    Обновляет товар по его ID, если принадлежит продавцу.
+    """
+    # Прежняя категория нужна для инвалидации. RETURNING видит уже новую строку, поэтому старую
+    # снимаем в MATERIALIZED CTE: она вычисляется до UPDATE и на PostgreSQL, и на SQLite
+    old = (
+        select(ProductModel.id, ProductModel.category_id)
         .where(ProductModel.id == product_id)
+        .cte("old_product")
+        .prefix_with("MATERIALIZED")
+    )
+    stmt = (
+        update(ProductModel)
+        .where(
+            ProductModel.id == old.c.id,
+            ProductModel.seller_id == current_user.id,
+            ProductModel.is_active == True,
+            active_category_exists(product.category_id),
+        )
         .values(**product.model_dump())
+        .returning(ProductModel, select(old.c.category_id).scalar_subquery())
+        .execution_options(synchronize_session=False)
     )
+    row = (await db.execute(stmt)).one_or_none()
+    if row is None:
+        raise await write_rejection(db, product_id, product.category_id, current_user.id, "update")
+    db_product, old_category_id = row
     await db.commit()
-    await db.refresh(db_product)
+    publish(PRODUCT_CHANGED, product_id=product_id, category_ids=[old_category_id, db_product.category_id])
     return db_product
 
 
 @router.delete("/{product_id}", status_code=status.HTTP_200_OK)
-async def delete_product(product_id: int, db: AsyncSession = Depends(get_async_db), current_user: UserModel = Depends(get_current_seller)):
+async def delete_product(product_id: int, db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_seller)):
     """
     Удаляет товар по его ID, если принадлежит тому продавцу.
     """
-    stmt_product = select(ProductModel).where(
-        ProductModel.id == product_id,
-        ProductModel.is_active == True
-    )
-    result_product = await db.execute(stmt_product)
-    product = result_product.scalar()
-    if product is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found"
-        )
-    if product.seller_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You can only delete your own products"
-        )
-    
-    stmt_category = select(CategoryModel).where(
-        CategoryModel.id == product.category_id,
-        CategoryModel.is_active == True
-    )
-    result_category = await db.execute(stmt_category)
-    category = result_category.scalar()
-    if category is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Category not found"
-        )
-    await db.execute(
+    stmt = (
         update(ProductModel)
-        .where(ProductModel.id == product_id)
+        .where(
+            ProductModel.id == product_id,
+            ProductModel.seller_id == current_user.id,
+            ProductModel.is_active == True,
+            active_category_exists(ProductModel.category_id),
+        )
         .values(is_active=False)
+        .returning(ProductModel.category_id)
+        .execution_options(synchronize_session=False)
     )
+    category_id = (await db.execute(stmt)).scalar_one_or_none()
+    if category_id is None:
+        raise await write_rejection(db, product_id, ProductModel.category_id, current_user.id, "delete")
     await db.commit()
-    await db.refresh(product)
-    
+    publish(PRODUCT_CHANGED, product_id=product_id, category_ids=[category_id])
+
     return {
         "status": "success",
         "message": "Product marked as inactive"
     }
-
-
@@ -1,66 +1,210 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import update, select
-from sqlalchemy.sql import func
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Float, Select, case, cast, update, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas import Review as ReviewSchema, ReviewCreate
+from app.schemas import Review as ReviewSchema, ReviewCreate, ReviewPage, ReviewSummary
 from app.db_depends import get_async_db
 from app.models.reviews import Review as ReviewModel
 from app.models.products import Product as ProductModel
-from app.auth import get_current_seller, get_current_buyer, get_current_admin
-from app.models import User as UserModel
+from app.auth import Principal, get_current_seller, get_current_buyer, get_current_admin
+from app.streaming import NDJSON_MEDIA_TYPE, export_statement, ndjson_response
+from app.serialization import dump_json, json_response, review_page_adapter, review_summary_adapter
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_paginate, build_page
+from app.events import PRODUCT_CHANGED, REVIEW_CHANGED, publish
+from app.etag import catalog_versions, not_modified
+from app.singleflight import SingleFlight, get_single_flight
 
 
 router = APIRouter(prefix="/reviews", tags=["reviews"])
 
+# Отзывы отдаются от новых к старым
+REVIEW_SORT = "-comment_date"
 
-async def update_product_rating(db: AsyncSession, product_id: int):
-    product = await db.get(ProductModel, product_id)
-    if product is None:
+# Оценка -> колонка гистограммы в products
+GRADE_COLUMNS = {grade: getattr(ProductModel, f"grade_{grade}_count") for grade in range(1, 6)}
+
+
+async def apply_review_grade(db: AsyncSession, product_id: int, grade: int, count_delta: int) -> int:
+    """
+    Атомарно сдвигает агрегаты рейтинга и гистограмму оценок товара в текущей транзакции.
+    count_delta: 1 — отзыв с оценкой grade добавлен, -1 — удалён.
+    Возвращает category_id товара для инвалидации кэшей.
+    """
+    new_sum = ProductModel.rating_sum + grade * count_delta
+    new_count = ProductModel.rating_count + count_delta
+    grade_column = GRADE_COLUMNS[grade]
+    stmt = (
+        update(ProductModel)
+        .where(ProductModel.id == product_id)
+        .values(
+            {
+                ProductModel.rating_sum: new_sum,
+                ProductModel.rating_count: new_count,
+                ProductModel.rating: case((new_count > 0, cast(new_sum, Float) / new_count), else_=0.0),
+                grade_column: grade_column + count_delta,
+            }
+        )
+        .returning(ProductModel.category_id)
+    )
+    category_id = (await db.execute(stmt)).scalar_one_or_none()
+    if category_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
+    return category_id
 
-    stmt_avg = select(func.avg(ReviewModel.grade)).where(ReviewModel.product_id == product_id, ReviewModel.is_active == True)
-    result_reviews_avg = await db.execute(stmt_avg)
-    avg_reviews = result_reviews_avg.scalar_one_or_none()
 
-    avg_rating = avg_reviews or 0.0
+def active_reviews_statement(product_id: int | None = None) -> Select:
+    """
+    Активные отзывы товара или, без product_id, все активные отзывы
+    """
+    stmt = select(ReviewModel).where(ReviewModel.is_active == True)
+    if product_id is not None:
+        stmt = stmt.where(ReviewModel.product_id == product_id)
+    return stmt
 
-    product.rating = avg_rating
-    await db.commit()
+
+def paginate_reviews(stmt: Select, limit: int, after: str | None) -> Select:
+    """
+    Добавляет к запросу отзывов курсорную пагинацию по (comment_date, id) от новых к старым
+    """
+    return keyset_paginate(
+        stmt,
+        key=ReviewModel.comment_date,
+        pk=ReviewModel.id,
+        sort=REVIEW_SORT,
+        limit=limit,
+        after=after,
+        descending=True,
+    )
 
 
-@router.get("/", response_model=list[ReviewSchema], status_code=status.HTTP_200_OK)
-async def get_all_reviews(db: AsyncSession = Depends(get_async_db)):
+async def fetch_review_page(db: AsyncSession, stmt: Select, limit: int, after: str | None) -> dict:
     """
-    Возвращает все комментарии
+    Выполняет запрос отзывов с курсорной пагинацией по (comment_date, id) от новых к старым
     """
-    stmt = select(ReviewModel).where(ReviewModel.is_active == True)
-    result_reviews = await db.execute(stmt)
-    return result_reviews.scalars().all()
+    result = await db.execute(paginate_reviews(stmt, limit=limit, after=after))
+    return build_page(result.scalars().all(), key_name="comment_date", sort=REVIEW_SORT, limit=limit)
 
 
-@router.get("/products/{product_id}/reviews", response_model=list[ReviewSchema])
-async def get_product_reviews(product_id: int, db: AsyncSession = Depends(get_async_db)):
-    stmt_product = select(ProductModel).where(ProductModel.id == product_id, ProductModel.is_active == True)
-    result_product = await db.execute(stmt_product)
-    product = result_product.scalar()
-    if product is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found"
+@router.get("/", response_model=ReviewPage, status_code=status.HTTP_200_OK)
+async def get_all_reviews(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+    after: str | None = Query(None, description="Курсор, полученный в next_cursor"),
+    flights: SingleFlight = Depends(get_single_flight),
+):
+    """
+    Возвращает страницу комментариев, от новых к старым
+    """
+    etag = catalog_versions.etag(("reviews",))
+    if (cached := not_modified(request, etag, exists=True)) is not None:
+        return cached
+
+    async def load_page(db: AsyncSession) -> bytes:
+        page = await fetch_review_page(db, active_reviews_statement(), limit=limit, after=after)
+        return dump_json(review_page_adapter, page)
+
+    payload = await flights.run(("reviews", limit, after), load_page)
+    return json_response(payload, headers={"ETag": etag})
+
+
+@router.get("/export", response_class=StreamingResponse, responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}})
+async def export_reviews(include_inactive: bool = Query(False, description="Выгружать и удалённые отзывы")):
+    """
+    Потоково выгружает отзывы в формате NDJSON, по одному отзыву на строку.
+    """
+    where = () if include_inactive else (ReviewModel.is_active == True,)
+    return ndjson_response(export_statement(ReviewModel, ReviewSchema, *where), filename="reviews.ndjson")
+
+
+@router.get("/products/{product_id}/reviews", response_model=ReviewPage)
+async def get_product_reviews(
+    product_id: int,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"),
+    after: str | None = Query(None, description="Курсор, полученный в next_cursor"),
+    flights: SingleFlight = Depends(get_single_flight),
+):
+    """
+    Возвращает страницу отзывов товара, от новых к старым
+    """
+    etag = catalog_versions.etag(("product", product_id), ("product_reviews", product_id))
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+
+    async def load_page(db: AsyncSession) -> bytes:
+        stmt_product = select(ProductModel.id).where(ProductModel.id == product_id, ProductModel.is_active == True)
+        if await db.scalar(stmt_product) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Product not found"
+            )
+
+        page = await fetch_review_page(db, active_reviews_statement(product_id), limit=limit, after=after)
+        return dump_json(review_page_adapter, page)
+
+    payload = await flights.run(("product_reviews", product_id, limit, after), load_page)
+    if (cached := not_modified(request, etag, exists=True)) is not None:
+        return cached
+    return json_response(payload, headers={"ETag": etag})
+
+
+@router.get("/products/{product_id}/reviews/summary", response_model=ReviewSummary)
+async def get_product_review_summary(
+    product_id: int,
+    request: Request,
+    flights: SingleFlight = Depends(get_single_flight),
+):
+    """
+    Количество, средняя оценка и гистограмма оценок отзывов товара.
+    Агрегаты ведут пути записи отзывов, здесь читается одна строка products
+    """
+    etag = catalog_versions.etag(("product", product_id))
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+
+    async def load_summary(db: AsyncSession) -> bytes:
+        stmt = select(ProductModel.rating_count, ProductModel.rating, *GRADE_COLUMNS.values()).where(
+            ProductModel.id == product_id,
+            ProductModel.is_active == True
         )
-    
-    stmt_reviews = select(ReviewModel).where(ReviewModel.product_id == product.id, ReviewModel.is_active == True)
-    result_reviews = await db.execute(stmt_reviews)
-    reviews = result_reviews.scalars().all()
-    return reviews
+        row = (await db.execute(stmt)).one_or_none()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Product not found"
+            )
+        rating_count, rating, *grade_counts = row
+        summary = {
+            "product_id": product_id,
+            "count": rating_count,
+            "mean": rating,
+            "histogram": dict(zip(GRADE_COLUMNS, grade_counts)),
+        }
+        return dump_json(review_summary_adapter, summary)
+
+    payload = await flights.run(("review_summary", product_id), load_summary)
+    if (cached := not_modified(request, etag, exists=True)) is not None:
+        return cached
+    return json_response(payload, headers={"ETag": etag})
+
+
+def duplicate_review_statement(product_id: int, user_id: int) -> Select:
+    """
+    Активный отзыв пользователя на товар, если он уже есть
+    """
+    return select(ReviewModel).where(
+        ReviewModel.product_id == product_id,
+        ReviewModel.user_id == user_id,
+        ReviewModel.is_active == True
+    )
 
 
 @router.post("/", response_model=ReviewSchema)
-async def create_reviews(review: ReviewCreate, db: AsyncSession = Depends(get_async_db), current_user: UserModel = Depends(get_current_buyer)):
+async def create_reviews(review: ReviewCreate, db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_buyer)):
     stmt_product = select(ProductModel).where(ProductModel.id == review.product_id, ProductModel.is_active == True)
     result_product = await db.execute(stmt_product)
     product = result_product.scalar_one_or_none()
@@ -76,12 +220,7 @@ async def create_reviews(review: ReviewCreate, db: AsyncSession = Depends(get_as
             detail="Wrong grade"
         )
 
-    stmt_check = select(ReviewModel).where(
-        ReviewModel.product_id == review.product_id,
-        ReviewModel.user_id == current_user.id,
-        ReviewModel.is_active == True
-        )
-    result_stmt_check = await db.execute(stmt_check)
+    result_stmt_check = await db.execute(duplicate_review_statement(review.product_id, current_user.id))
     db_check_review = result_stmt_check.scalar_one_or_none()
     if db_check_review:
         raise HTTPException(
@@ -91,37 +230,40 @@ async def create_reviews(review: ReviewCreate, db: AsyncSession = Depends(get_as
 
     db_review = ReviewModel(**review.model_dump(), user_id=current_user.id)
     db.add(db_review)
+    await db.flush()
+    # Отзыв и агрегаты рейтинга фиксируются одним commit
+    await apply_review_grade(db, review.product_id, grade=review.grade, count_delta=1)
     await db.commit()
-    await db.refresh(db_review)
 
-    await update_product_rating(db=db, product_id=review.product_id)
+    publish(PRODUCT_CHANGED, product_id=review.product_id, category_ids=[product.category_id])
+    publish(REVIEW_CHANGED, product_id=review.product_id)
 
     return db_review
 
 
 @router.delete("/{review_id}", status_code=status.HTTP_200_OK)
-async def delete_review(review_id: int, db: AsyncSession = Depends(get_async_db), current_user: UserModel = Depends(get_current_admin)):
+async def delete_review(review_id: int, db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_admin)):
     """
     Удаляет отзыв
     """
-    stmt_review = select(ReviewModel).where(ReviewModel.id == review_id, ReviewModel.is_active == True)
-    result_review = await db.execute(stmt_review)
-    db_review = result_review.scalar()
+    # Снимаем флаг только с активного отзыва, чтобы повторное удаление не уменьшило агрегаты дважды
+    stmt_review = (
+        update(ReviewModel)
+        .where(ReviewModel.id == review_id, ReviewModel.is_active == True)
+        .values(is_active=False)
+        .returning(ReviewModel.product_id, ReviewModel.grade)
+    )
+    db_review = (await db.execute(stmt_review)).one_or_none()
     if db_review is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Review not found"
         )
-    
-    await db.execute(
-        update(ReviewModel)
-        .where(ReviewModel.id == db_review.id)
-        .values(is_active=False)
-    )
 
+    category_id = await apply_review_grade(db, db_review.product_id, grade=db_review.grade, count_delta=-1)
     await db.commit()
-    await db.refresh(db_review)
-    
-    await update_product_rating(db=db, product_id=db_review.product_id)
+
+    publish(PRODUCT_CHANGED, product_id=db_review.product_id, category_ids=[category_id])
+    publish(REVIEW_CHANGED, product_id=db_review.product_id)
 
     return {"message": "Review deleted"}
@@ -0,0 +1,59 @@
+from fastapi import APIRouter
+
+from app.admission import admission
+from app.cache import catalog_cache
+from app.auth import hashing_pool
+from app.database import pool_status
+from app.snapshots import catalog_snapshots
+from app.singleflight import catalog_flights
+
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+
+@router.get("/cache")
+async def get_cache_stats():
+    """
+    Счётчики кэша каталога: попадания, промахи, вытеснения
+    """
+    return catalog_cache.stats()
+
+
+@router.get("/password-hashing")
+async def get_password_hashing_stats():
+    """
+    Загрузка пула хеширования паролей: глубина очереди и время ожидания
+    """
+    return hashing_pool.stats()
+
+
+@router.get("/db-pool")
+async def get_db_pool_stats():
+    """
+    Пул соединений с БД: занятость и время ожидания свободного соединения
+    """
+    return pool_status()
+
+
+@router.get("/admission")
+async def get_admission_stats():
+    """
+    Контроль допуска: выполняющиеся и ожидающие запросы по классам, отказы с 503 по причинам
+    """
+    return admission.stats()
+
+
+@router.get("/snapshots")
+async def get_snapshot_stats():
+    """
+    Снимки ответов каталога: готовность, размеры вариантов, попадания и пересборки
+    """
+    return catalog_snapshots.stats()
+
+
+@router.get("/single-flight")
+async def get_single_flight_stats():
+    """
+    Объединение одинаковых чтений: сколько запросов выполнили загрузку, сколько дождались чужой
+    """
+    return catalog_flights.stats()
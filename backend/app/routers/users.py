@@ -2,14 +2,17 @@ import jwt
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from fastapi.security import OAuth2PasswordRequestForm
 
 
 from app.models.users import User as UserModel
 from app.schemas import UserCreate, User as UserSchema
 from app.db_depends import get_async_db
-from app.auth import create_refresh_token, hash_password, verify_password, create_access_token
+from app.auth import (
+    Principal, create_refresh_token, hash_password_async, verify_password_async, create_access_token,
+    get_current_admin, revoked_users,
+)
 from app.config import SECRET_KEY, ALGORITHM
 
  
@@ -36,7 +39,7 @@ async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)
     #создание пользователя с хэшем
     db_user = UserModel(
         email=user.email,
-        hashed_password=hash_password(user.password),
+        hashed_password=await hash_password_async(user.password),
         role=user.role
     )
 
@@ -56,7 +59,7 @@ async def login(
     stmt_user = select(UserModel).where(UserModel.email == form_data.username)
     result_user = await db.execute(stmt_user)
     user = result_user.scalar()
-    if user is None or not verify_password(form_data.password, user.hashed_password):
+    if user is None or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -92,4 +95,30 @@ async def refresh_token(refresh_token: str, db: AsyncSession = Depends(get_async
     if user is None:
         raise credentials_exception
     access_token = create_access_token(data={"sub": user.email, "role": user.role, "id": user.id})
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.delete("/{user_id}", status_code=status.HTTP_200_OK)
+async def deactivate_user(user_id: int, db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_admin)):
+    """
+    Деактивирует пользователя. Его токены перестают приниматься в этом процессе сразу,
+    в остальных — после обновления списка отозванных (REVOKED_USERS_REFRESH_SECONDS)
+    """
+    stmt = (
+        update(UserModel)
+        .where(UserModel.id == user_id, UserModel.is_active == True)
+        .values(is_active=False)
+        .returning(UserModel.id)
+    )
+    if (await db.execute(stmt)).scalar_one_or_none() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    await db.commit()
+    revoked_users.revoke(user_id)
+
+    return {
+        "status": "success",
+        "message": "User marked as inactive"
+    }
@@ -27,6 +27,17 @@ class Category(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class CategoryTreeNode(BaseModel):
+    """
+    Узел дерева активных категорий.
+    Используется в GET /categories/tree.
+    """
+    id: int = Field(description="Уникальный идентификатор категории")
+    name: str = Field(description="Название категории")
+    parent_id: int | None = Field(None, description="ID родительской категории, если есть")
+    children: list["CategoryTreeNode"] = Field(default_factory=list, description="Дочерние категории")
+
+
 class ProductCreate(BaseModel):
     """
     Модель для создания и обновления товара.
@@ -60,6 +71,79 @@ class Product(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ProductBulkUpdateItem(BaseModel):
+    """
+    Новые цена и/или остаток одного товара. Незаданные поля не меняются.
+    """
+    id: int = Field(description="ID товара")
+    price: float | None = Field(None, gt=0, description="Новая цена (больше 0)")
+    stock: int | None = Field(None, ge=0, description="Новый остаток (0 или больше)")
+
+
+class ProductBulkUpdateReport(BaseModel):
+    """
+    Итог массового обновления товаров.
+    """
+    applied: int = Field(description="Сколько товаров обновлено")
+    rejected: int = Field(description="Сколько позиций отклонено")
+    rejected_ids: list[int] = Field(description="ID отклонённых позиций: нет товара, чужой товар или нечего менять")
+
+
+class ImportRowError(BaseModel):
+    """
+    Ошибки одной строки импорта.
+    """
+    row: int = Field(description="Номер строки данных, начиная с 1 (без заголовка CSV)")
+    errors: list[str] = Field(description="Описание ошибок")
+
+
+class ProductImportReport(BaseModel):
+    """
+    Итог массового импорта товаров.
+    """
+    total: int = Field(description="Сколько строк прочитано")
+    inserted: int = Field(description="Сколько товаров создано")
+    rejected: int = Field(description="Сколько строк отклонено")
+    errors: list[ImportRowError] = Field(description="Ошибки по строкам (не больше 1000)")
+
+
+class CategoryFacet(BaseModel):
+    """
+    Количество подходящих товаров в категории.
+    """
+    category_id: int = Field(description="ID категории")
+    count: int = Field(description="Количество товаров")
+
+
+class RangeFacet(BaseModel):
+    """
+    Количество подходящих товаров в диапазоне [min, max).
+    """
+    min: float = Field(description="Нижняя граница, включительно")
+    max: float | None = Field(None, description="Верхняя граница, не включительно; null — без ограничения")
+    count: int = Field(description="Количество товаров")
+
+
+class ProductFacets(BaseModel):
+    """
+    Счётчики для фильтров витрины по товарам, прошедшим фильтры запроса.
+    """
+    categories: list[CategoryFacet] = Field(description="По категориям")
+    price: list[RangeFacet] = Field(description="По диапазонам цены")
+    rating: list[RangeFacet] = Field(description="По диапазонам рейтинга")
+
+
+class ProductPage(BaseModel):
+    """
+    Страница списка товаров с курсором на следующую.
+    """
+    items: list[Product] = Field(description="Товары текущей страницы")
+    next_cursor: str | None = Field(None, description="Курсор следующей страницы, если она есть")
+    facets: ProductFacets | None = Field(None, description="Счётчики фильтров, если запрошены")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class UserCreate(BaseModel):
     email: EmailStr = Field(description="Email пользователя")
     password: str = Field(min_length=8, description="Пароль (минимум 8 символов)")
@@ -94,4 +178,24 @@ class Review(ReviewCreate):
     is_active: bool
 
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ReviewPage(BaseModel):
+    """
+    Страница отзывов от новых к старым с курсором на следующую.
+    """
+    items: list[Review] = Field(description="Отзывы текущей страницы")
+    next_cursor: str | None = Field(None, description="Курсор следующей страницы, если она есть")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ReviewSummary(BaseModel):
+    """
+    Сводка по активным отзывам товара.
+    """
+    product_id: int = Field(description="ID товара")
+    count: int = Field(description="Количество отзывов")
+    mean: float = Field(description="Средняя оценка")
+    histogram: dict[int, int] = Field(description="Количество отзывов по оценкам от 1 до 5")
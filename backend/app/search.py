@@ -0,0 +1,85 @@
+import re
+
+from fastapi import HTTPException, status
+from sqlalchemy import Float, Select, column, func, literal_column, select, table, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.products import Product as ProductModel, SEARCH_TS_CONFIG
+from app.pagination import build_page, keyset_paginate
+
+
+# Ключ курсора поисковой выдачи
+SEARCH_SORT = "relevance"
+
+
+def _query_words(query: str) -> list[str]:
+    """
+    Слова пользовательского ввода. Синтаксис движков (кавычки, операторы) в запрос не попадает
+    """
+    return re.findall(r"\w+", query)
+
+
+def _postgres_ranked(words: list[str]) -> Select:
+    # Все слова обязательны, последнее — префикс (поиск по мере ввода); to_tsquery приводит их к основам
+    ts_query = func.to_tsquery(SEARCH_TS_CONFIG, " & ".join(words) + ":*")
+    search_vector = literal_column("products.search_vector")
+    return (
+        select(ProductModel.id, type_coerce(func.ts_rank_cd(search_vector, ts_query), Float).label("rank"))
+        .where(search_vector.op("@@")(ts_query))
+    )
+
+
+def _fts5_query(words: list[str]) -> str:
+    """
+    Запрос FTS5, в котором, как и на PostgreSQL, все слова обязательны, а последнее — префикс
+    """
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+
+def _sqlite_ranked(words: list[str]) -> Select:
+    fts = table("products_fts", column("rowid"))
+    fts_name = literal_column("products_fts")
+    # bm25 тем меньше, чем документ релевантнее, поэтому меняем знак
+    return (
+        select(fts.c.rowid.label("id"), type_coerce(-func.bm25(fts_name), Float).label("rank"))
+        .where(fts_name.op("MATCH")(_fts5_query(words)))
+    )
+
+
+def search_statement(dialect: str, query: str, limit: int, after: str | None) -> Select | None:
+    """
+    Запрос страницы поиска для диалекта; None — в запросе нет ни одного слова
+    """
+    if dialect not in ("postgresql", "sqlite"):
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Full-text search is not supported for this database"
+        )
+    words = _query_words(query)
+    if not words:
+        return None
+    ranked = _postgres_ranked(words) if dialect == "postgresql" else _sqlite_ranked(words)
+
+    ranked = ranked.subquery("ranked")
+    stmt = (
+        select(ProductModel, ranked.c.rank, ranked.c.id)
+        .join(ranked, ranked.c.id == ProductModel.id)
+        .where(ProductModel.is_active == True)
+    )
+    return keyset_paginate(
+        stmt, key=ranked.c.rank, pk=ranked.c.id, sort=SEARCH_SORT, limit=limit, after=after, descending=True
+    )
+
+
+async def search_products(db: AsyncSession, query: str, limit: int, after: str | None) -> dict:
+    """
+    Ищет активные товары по name и description, сортирует по убыванию релевантности.
+    PostgreSQL — tsvector + GIN, SQLite — FTS5.
+    """
+    stmt = search_statement(db.get_bind().dialect.name, query, limit=limit, after=after)
+    if stmt is None:
+        return {"items": [], "next_cursor": None}
+    rows = (await db.execute(stmt)).all()
+    page = build_page(rows, key_name="rank", sort=SEARCH_SORT, limit=limit)
+    page["items"] = [row.Product for row in page["items"]]
+    return page
@@ -0,0 +1,62 @@
+import time
+from typing import Any
+
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import TypeAdapter
+
+from app.metrics import record_serialization
+
+from app.schemas import (
+    Category as CategorySchema,
+    Product as ProductSchema,
+    ProductPage,
+    ReviewPage,
+    ReviewSummary,
+)
+
+
+# Адаптеры строятся один раз при импорте, а не на каждый запрос
+product_adapter = TypeAdapter(ProductSchema)
+product_page_adapter = TypeAdapter(ProductPage)
+product_list_adapter = TypeAdapter(list[ProductSchema])
+category_list_adapter = TypeAdapter(list[CategorySchema])
+review_page_adapter = TypeAdapter(ReviewPage)
+review_summary_adapter = TypeAdapter(ReviewSummary)
+
+
+def dump_json(adapter: TypeAdapter, data: Any) -> bytes:
+    """
+    Валидирует ORM-объекты и сразу кодирует их в JSON силами pydantic-core,
+    минуя jsonable_encoder и stdlib json.
+    """
+    started = time.perf_counter()
+    payload = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+    record_serialization(time.perf_counter() - started)
+    return payload
+
+
+class TimedORJSONResponse(ORJSONResponse):
+    """
+    Ответ по умолчанию: ORJSONResponse, который учитывает время кодирования в метриках запроса
+    """
+
+    def render(self, content: Any) -> bytes:
+        started = time.perf_counter()
+        payload = super().render(content)
+        record_serialization(time.perf_counter() - started)
+        return payload
+
+
+def json_response(payload: bytes, headers: dict[str, str] | None = None) -> Response:
+    """
+    Отдаёт уже закодированный JSON как есть
+    """
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+
+def fast_json_response(adapter: TypeAdapter, data: Any, headers: dict[str, str] | None = None) -> Response:
+    """
+    Быстрый путь для списочных эндпоинтов: FastAPI не валидирует готовый Response повторно,
+    поэтому response_model остаётся только для документации
+    """
+    return json_response(dump_json(adapter, data), headers=headers)
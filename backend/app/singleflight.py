@@ -0,0 +1,176 @@
+import asyncio
+import functools
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Hashable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import DB_REPLICA_MAX_LAG, SINGLE_FLIGHT_GRACE
+from app.database import async_session_maker, open_read_session
+from app.events import CATEGORY_CHANGED, PRODUCT_CHANGED, PRODUCTS_CHANGED, REVIEW_CHANGED, subscribe
+
+
+# Сколько готовых результатов держать в окне grace, прежде чем чистить устаревшие
+RECENT_MAXSIZE = 10000
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные одинаковые чтения: пока загрузка по ключу выполняется,
+    остальные запросы с тем же ключом ждут её результат, а не повторяют SELECT.
+    С grace > 0 готовый результат ещё grace секунд отдаётся без загрузки.
+
+    Загрузка идёт в отдельной задаче со своей сессией из open_session, поэтому отмена ожидающего,
+    в том числе начавшего загрузку, не отменяет её для остальных и не закрывает им сессию.
+    Сессия обработчика для этого не годится: её закрывает завершение его запроса.
+    Первые replica_lag секунд после записи загрузки читают из основной БД: реплика могла ещё
+    не получить запись, а результат загрузки попадёт в кэш каталога и окно grace
+    Результат получают все ожидающие, поэтому он должен быть неизменяемым — например, готовые байты JSON
+    """
+
+    def __init__(
+        self,
+        grace: float = 0.0,
+        open_session: Callable[[], Awaitable[AsyncSession]] = open_read_session,
+        replica_lag: float = 0.0,
+    ):
+        self.grace = grace
+        self.open_session = open_session
+        self.replica_lag = replica_lag
+        self._written_at = float("-inf")
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self._recent: dict[Hashable, tuple[float, Any]] = {}
+        # Растёт при каждом forget(): результат загрузки, начатой до записи, в окно grace не попадёт
+        self._generation = 0
+        # Счётчики по виду ключа — первому элементу кортежа
+        self.leaders: defaultdict[str, int] = defaultdict(int)
+        self.coalesced: defaultdict[str, int] = defaultdict(int)
+        self.grace_hits: defaultdict[str, int] = defaultdict(int)
+
+    async def run(self, key: Hashable, fn: Callable[[AsyncSession], Awaitable[Any]]) -> Any:
+        """
+        Результат fn(db) по ключу; db открывается внутри загрузки и закрывается после неё
+        """
+        kind = self._kind(key)
+        recent = self._recent.get(key)
+        if recent is not None:
+            expires_at, value = recent
+            if expires_at > time.monotonic():
+                self.grace_hits[kind] += 1
+                return value
+            del self._recent[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._load(key, fn))
+            self._inflight[key] = task
+            self.leaders[kind] += 1
+        else:
+            self.coalesced[kind] += 1
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, fn: Callable[[AsyncSession], Awaitable[Any]]) -> Any:
+        task = asyncio.current_task()
+        generation = self._generation
+        try:
+            async with await self._open_session() as db:
+                value = await fn(db)
+        finally:
+            # После forget() по этому ключу могла начаться новая загрузка — её не трогаем
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+        if self.grace > 0 and generation == self._generation:
+            self._remember(key, value)
+        return value
+
+    async def _open_session(self) -> AsyncSession:
+        if time.monotonic() - self._written_at < self.replica_lag:
+            return async_session_maker()
+        return await self.open_session()
+
+    def _remember(self, key: Hashable, value: Any) -> None:
+        if len(self._recent) >= RECENT_MAXSIZE:
+            now = time.monotonic()
+            self._recent = {k: entry for k, entry in self._recent.items() if entry[0] > now}
+            if len(self._recent) >= RECENT_MAXSIZE:
+                self._recent.clear()
+        self._recent[key] = (time.monotonic() + self.grace, value)
+
+    def coalesce(self, key: Callable[..., Hashable]):
+        """
+        Декоратор асинхронной функции fn(db, *args); key строит ключ из остальных аргументов.
+        Обёртка вызывается без db — сессию открывает загрузка
+        """
+        def decorator(fn: Callable[..., Awaitable[Any]]):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                return await self.run(key(*args, **kwargs), lambda db: fn(db, *args, **kwargs))
+            return wrapper
+        return decorator
+
+    def forget(self) -> None:
+        """
+        После записи новые запросы не должны присоединяться к загрузке, начатой до неё.
+        Уже ожидающие получат её результат, как получили бы его и без объединения
+        """
+        self._generation += 1
+        self._written_at = time.monotonic()
+        self._inflight.clear()
+        self._recent.clear()
+
+    @staticmethod
+    def _kind(key: Hashable) -> str:
+        return str(key[0]) if isinstance(key, tuple) and key else str(key)
+
+    def stats(self) -> dict:
+        kinds = sorted({*self.leaders, *self.coalesced, *self.grace_hits})
+        return {
+            "grace": self.grace,
+            "in_flight": len(self._inflight),
+            "kinds": {
+                kind: {
+                    "leaders": self.leaders[kind],
+                    "coalesced": self.coalesced[kind],
+                    "grace_hits": self.grace_hits[kind],
+                }
+                for kind in kinds
+            },
+        }
+
+    def render_metrics(self) -> list[str]:
+        """
+        Счётчики в текстовом формате Prometheus
+        """
+        lines = []
+        for name, help, counter in (
+            ("single_flight_leaders_total", "Чтения, выполнившие загрузку", self.leaders),
+            ("single_flight_coalesced_total", "Чтения, дождавшиеся чужой загрузки", self.coalesced),
+            ("single_flight_grace_hits_total", "Чтения, получившие результат из окна grace", self.grace_hits),
+        ):
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} counter"]
+            lines += [f'{name}{{kind="{kind}"}} {count}' for kind, count in sorted(counter.items())]
+        return lines
+
+
+# Загрузки каталога. Ключи повторяют ключи catalog_cache, плюс
+#   ("category_tree",)
+#   ("reviews", limit, after)
+#   ("product_reviews", product_id, limit, after)
+#   ("review_summary", product_id)
+catalog_flights = SingleFlight(grace=SINGLE_FLIGHT_GRACE, replica_lag=DB_REPLICA_MAX_LAG)
+
+
+def get_single_flight() -> SingleFlight:
+    """
+    Зависимость для обработчиков чтения; в тестах подменяется через dependency_overrides
+    """
+    return catalog_flights
+
+
+@subscribe(PRODUCT_CHANGED)
+@subscribe(PRODUCTS_CHANGED)
+@subscribe(CATEGORY_CHANGED)
+@subscribe(REVIEW_CHANGED)
+def _on_catalog_changed(**payload: Any) -> None:
+    catalog_flights.forget()
@@ -0,0 +1,256 @@
+import asyncio
+import gzip
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Hashable, Iterable
+
+from fastapi import Response, status
+from starlette.datastructures import Headers
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import CATALOG_CACHE_TTL, CATALOG_SNAPSHOTS, SNAPSHOT_REBUILD_DELAY
+from app.database import async_session_maker
+from app.etag import catalog_versions, etag_matches
+from app.events import subscribe
+
+try:
+    import zstandard
+except ImportError:
+    # zstd необязателен: без пакета zstandard отдаём gzip
+    zstandard = None
+
+
+log = logging.getLogger(__name__)
+
+GZIP_LEVEL = 9
+ZSTD_LEVEL = 19
+# Меньшие ответы сжатие почти не уменьшает
+MIN_COMPRESS_SIZE = 256
+# При равном q выбирается кодировка, стоящая раньше
+ENCODING_PREFERENCE = ("zstd", "gzip")
+
+
+@dataclass
+class Snapshot:
+    body: bytes
+    # Кодировка -> сжатое тело; только варианты, которые меньше исходного
+    encoded: dict[str, bytes]
+    built_at: float
+
+
+@dataclass
+class SnapshotSpec:
+    """
+    Один снимок: как его собрать, из каких ключей версий строится ETag и по какому пути он отдаётся
+    """
+    name: str
+    # Шаблон пути, он же метка маршрута в метриках
+    path: str
+    builder: Callable[[AsyncSession], Awaitable[bytes]]
+    etag_keys: list[Hashable]
+    snapshot: Snapshot | None = None
+    generation: int = 0
+    task: asyncio.Task | None = field(default=None, repr=False)
+
+
+def encode_variants(body: bytes) -> dict[str, bytes]:
+    """
+    Сжимает тело один раз при сборке снимка, поэтому уровни максимальные
+    """
+    if len(body) < MIN_COMPRESS_SIZE:
+        return {}
+    variants = {"gzip": gzip.compress(body, GZIP_LEVEL, mtime=0)}
+    if zstandard is not None:
+        variants["zstd"] = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+
+
+def negotiate_encoding(header: str | None, available: Iterable[str]) -> str | None:
+    """
+    Выбирает кодировку по Accept-Encoding с учётом q; None — отдать без сжатия
+    """
+    if not header:
+        return None
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        quality = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for coding in ENCODING_PREFERENCE:
+        if coding not in available:
+            continue
+        quality = accepted.get(coding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class SnapshotStore:
+    """
+    Готовые к отдаче тела самых частых ответов: JSON и его сжатые варианты.
+    Изменение данных сразу снимает снимок (запросы идут обычным путём) и запускает
+    пересборку в фоне. Снимок старше ttl продолжает отдаваться, пока собирается новый:
+    другой воркер мог изменить данные, не уведомив этот, как и в случае с кэшем каталога
+    """
+
+    def __init__(self, ttl: float, rebuild_delay: float):
+        self.ttl = ttl
+        self.rebuild_delay = rebuild_delay
+        self._specs: dict[str, SnapshotSpec] = {}
+        # (путь, строка запроса) -> снимок
+        self._routes: dict[tuple[str, str], SnapshotSpec] = {}
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.failures = 0
+
+    def register(self, name: str, routes: list[tuple[str, str]], etag_keys: list[Hashable], topics: list[str]):
+        """
+        Регистрирует сборщик снимка, используется как декоратор.
+        routes — пары (путь, строка запроса), которые в точности соответствуют ответу сборщика
+        """
+        def decorator(builder: Callable[[AsyncSession], Awaitable[bytes]]):
+            spec = SnapshotSpec(name=name, path=routes[0][0], builder=builder, etag_keys=etag_keys)
+            self._specs[name] = spec
+            for route in routes:
+                self._routes[route] = spec
+            for topic in topics:
+                subscribe(topic)(lambda **payload: self.invalidate(name))
+            return builder
+        return decorator
+
+    def lookup(self, path: str, query: str) -> SnapshotSpec | None:
+        return self._routes.get((path, query))
+
+    def get(self, spec: SnapshotSpec) -> Snapshot | None:
+        snapshot = spec.snapshot
+        if snapshot is None:
+            self.misses += 1
+            self._schedule(spec, delay=0.0)
+            return None
+        if time.monotonic() - snapshot.built_at > self.ttl:
+            self._schedule(spec, delay=0.0)
+        self.hits += 1
+        return snapshot
+
+    def invalidate(self, name: str) -> None:
+        spec = self._specs[name]
+        spec.generation += 1
+        spec.snapshot = None
+        self._schedule(spec, delay=self.rebuild_delay)
+
+    def warm(self) -> None:
+        """
+        Запускает сборку всех снимков в фоне, например при старте приложения
+        """
+        for spec in self._specs.values():
+            self._schedule(spec, delay=0.0)
+
+    def _schedule(self, spec: SnapshotSpec, delay: float) -> None:
+        # Со снимками, отключёнными через CATALOG_SNAPSHOTS, собирать их незачем.
+        # Уже запланированная сборка увидит новое поколение сама
+        if not CATALOG_SNAPSHOTS or (spec.task is not None and not spec.task.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        spec.task = loop.create_task(self._rebuild(spec, delay))
+
+    async def _rebuild(self, spec: SnapshotSpec, delay: float) -> None:
+        if delay:
+            await asyncio.sleep(delay)
+        while True:
+            generation = spec.generation
+            try:
+                # Снимок отдаётся с текущим ETag, поэтому собирается из основной БД: отстающая реплика
+                # вернула бы данные до записи, которая этот ETag уже сменила
+                async with async_session_maker() as db:
+                    body = await spec.builder(db)
+                encoded = await asyncio.to_thread(encode_variants, body)
+            except Exception:
+                # Следующий промах попробует снова, а пока запросы идут обычным путём
+                self.failures += 1
+                log.exception("Failed to build snapshot %s", spec.name)
+                return
+            # Данные изменились во время сборки — собираем заново
+            if generation == spec.generation:
+                spec.snapshot = Snapshot(body=body, encoded=encoded, built_at=time.monotonic())
+                self.rebuilds += 1
+                return
+
+    async def close(self) -> None:
+        tasks = [spec.task for spec in self._specs.values() if spec.task is not None and not spec.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "rebuilds": self.rebuilds,
+            "failures": self.failures,
+            "zstd": zstandard is not None,
+            "snapshots": {
+                name: {
+                    "ready": spec.snapshot is not None,
+                    "bytes": len(spec.snapshot.body) if spec.snapshot else None,
+                    "encoded_bytes": {
+                        encoding: len(data) for encoding, data in spec.snapshot.encoded.items()
+                    } if spec.snapshot else None,
+                }
+                for name, spec in self._specs.items()
+            },
+        }
+
+
+catalog_snapshots = SnapshotStore(ttl=CATALOG_CACHE_TTL, rebuild_delay=SNAPSHOT_REBUILD_DELAY)
+
+
+class SnapshotMiddleware:
+    """
+    Чистый ASGI-middleware: отдаёт готовый снимок без маршрутизации, зависимостей и сессии БД.
+    Если снимка нет, запрос идёт в приложение как обычно
+    """
+
+    def __init__(self, app, store: SnapshotStore = catalog_snapshots):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        spec = snapshot = None
+        if CATALOG_SNAPSHOTS and scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            spec = self.store.lookup(scope["path"], scope["query_string"].decode("latin-1"))
+        if spec is not None:
+            snapshot = self.store.get(spec)
+        if snapshot is None:
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = negotiate_encoding(request_headers.get("accept-encoding"), snapshot.encoded)
+        # ETag тот же, что у обычного ответа маршрута; у сжатых вариантов — свой
+        etag = catalog_versions.etag(*spec.etag_keys)
+        if encoding is not None:
+            etag = f'{etag[:-1]}-{encoding}"'
+        headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+        # Метка маршрута для MetricsMiddleware
+        scope["route"] = spec
+
+        if etag_matches(request_headers.get("if-none-match"), etag, exists=True):
+            response = Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        elif encoding is None:
+            response = Response(content=snapshot.body, media_type="application/json", headers=headers)
+        else:
+            headers["Content-Encoding"] = encoding
+            response = Response(content=snapshot.encoded[encoding], media_type="application/json", headers=headers)
+        await response(scope, receive, send)
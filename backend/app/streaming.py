@@ -0,0 +1,45 @@
+from typing import AsyncIterator
+
+import orjson
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Select, select
+
+from app.database import open_read_session
+
+
+# Сколько строк забираем с сервера за одну порцию курсора
+EXPORT_CHUNK_SIZE = 1000
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def export_statement(model, schema: type[BaseModel], *where) -> Select:
+    """
+    Строит запрос только по колонкам схемы ответа, без загрузки ORM-объектов
+    """
+    columns = [getattr(model, name) for name in schema.model_fields]
+    return select(*columns).where(*where).order_by(model.id)
+
+
+async def iter_ndjson(stmt: Select, chunk_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    Читает строки серверным курсором и отдаёт их порциями в формате NDJSON.
+    Сессия открывается здесь, а не через Depends, чтобы жить столько же, сколько поток ответа.
+    Выгрузка только читает, поэтому идёт на реплику, если она есть.
+    """
+    async with await open_read_session() as session:
+        result = await session.stream(stmt.execution_options(yield_per=chunk_size))
+        async for partition in result.mappings().partitions():
+            yield b"".join(orjson.dumps(dict(row)) + b"\n" for row in partition)
+
+
+def ndjson_response(stmt: Select, filename: str) -> StreamingResponse:
+    """
+    Оборачивает поток NDJSON в ответ с именем файла для скачивания
+    """
+    return StreamingResponse(
+        iter_ndjson(stmt),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,254 @@
+"""
+Нагрузочный прогон всех роутеров в процессе, через httpx ASGI-транспорт.
+
+Заполняет базу синтетическим каталогом (benchmarks.seed), затем для каждого сценария
+отправляет --requests запросов при фиксированной --concurrency и записывает
+пропускную способность и p50/p95/p99 по эндпоинтам в JSON. Сценарии с записью
+меняют данные, поэтому сравнивать имеет смысл прогоны на свежезаполненной базе.
+
+Запуск из каталога backend:
+    python -m benchmarks.load --scale 100k --out baseline.json
+    python -m benchmarks.load --reuse --out current.json --compare baseline.json
+Код возврата 1, если p95 какого-либо эндпоинта вырос больше чем на --threshold.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import subprocess
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+import httpx
+
+from app.cache import catalog_cache
+from app.database import init_engine
+from app.main import app
+from benchmarks.seed import SEED_PASSWORD, Catalog, describe_catalog, scale_argument, seed_catalog, user_email
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    # (номер запроса, генератор случайных чисел, каталог) -> путь
+    path: Callable[[int, random.Random, Catalog], str]
+    body: Callable[[int, random.Random, Catalog], Any] | None = None
+    # "seller", "buyer" или None
+    auth: str | None = None
+    # Доля от --requests: тяжёлые эндпоинты гоняем реже
+    weight: float = 1.0
+
+
+def random_product(rng: random.Random, catalog: Catalog) -> int:
+    return rng.randint(1, catalog.products)
+
+
+SCENARIOS = [
+    Scenario("GET /products/", "GET", lambda i, rng, c: "/products/"),
+    Scenario("GET /products/?sort=-price", "GET", lambda i, rng, c: "/products/?sort=-price"),
+    Scenario(
+        "GET /products/?facets (filters)", "GET",
+        lambda i, rng, c: f"/products/?facets=true&in_stock=true&min_price={rng.choice([0, 500, 1000])}&min_rating=3",
+    ),
+    Scenario("GET /products/search", "GET", lambda i, rng, c: "/products/search?q=" + rng.choice(["телефон", "синий чехол", "игровой"])),
+    Scenario("GET /products/{id}", "GET", lambda i, rng, c: f"/products/{random_product(rng, c)}"),
+    Scenario(
+        "GET /products/batch (20 ids)", "GET",
+        lambda i, rng, c: "/products/batch?ids=" + ",".join(str(random_product(rng, c)) for _ in range(20)),
+    ),
+    Scenario("GET /products/category/{id}", "GET", lambda i, rng, c: f"/products/category/{rng.choice(c.leaf_categories)}"),
+    Scenario(
+        "GET /products/category/{id}?include_subcategories", "GET",
+        lambda i, rng, c: f"/products/category/{rng.choice(c.root_categories)}?include_subcategories=true",
+    ),
+    Scenario("GET /products/export", "GET", lambda i, rng, c: "/products/export", weight=0.01),
+    Scenario("GET /categories/", "GET", lambda i, rng, c: "/categories/"),
+    Scenario("GET /categories/tree", "GET", lambda i, rng, c: "/categories/tree"),
+    Scenario("GET /reviews/products/{id}/reviews", "GET", lambda i, rng, c: f"/reviews/products/{random_product(rng, c)}/reviews"),
+    Scenario(
+        "GET /reviews/products/{id}/reviews/summary", "GET",
+        lambda i, rng, c: f"/reviews/products/{random_product(rng, c)}/reviews/summary",
+    ),
+    Scenario("GET /reviews/", "GET", lambda i, rng, c: "/reviews/", weight=0.01),
+    Scenario("GET /stats/cache", "GET", lambda i, rng, c: "/stats/cache"),
+    Scenario(
+        "POST /products/products", "POST", lambda i, rng, c: "/products/products",
+        body=lambda i, rng, c: {
+            "name": f"Новый товар {i}", "price": rng.randint(1, 10000), "stock": 10,
+            "category_id": rng.choice(c.leaf_categories),
+        },
+        auth="seller",
+    ),
+    Scenario(
+        "PATCH /products/{id}", "PATCH", lambda i, rng, c: f"/products/{rng.choice(c.products_of(1, 1000))}",
+        body=lambda i, rng, c: {
+            "name": f"Обновлённый товар {i}", "price": rng.randint(1, 10000), "stock": rng.randint(0, 50),
+            "category_id": rng.choice(c.leaf_categories),
+        },
+        auth="seller",
+    ),
+    Scenario(
+        "PATCH /products/bulk (100 items)", "PATCH", lambda i, rng, c: "/products/bulk",
+        body=lambda i, rng, c: [
+            {"id": product_id, "stock": rng.randint(0, 50)} for product_id in rng.sample(c.products_of(1, 1000), 100)
+        ],
+        auth="seller", weight=0.2,
+    ),
+    Scenario(
+        "POST /reviews/", "POST", lambda i, rng, c: "/reviews/",
+        # Каждый запрос — свой товар, иначе покупатель упрётся в запрет повторного отзыва
+        body=lambda i, rng, c: {"product_id": c.products - i, "comment": "Отзыв из нагрузочного теста", "grade": rng.randint(1, 5)},
+        auth="buyer",
+    ),
+    Scenario("POST /users/token", "POST", lambda i, rng, c: "/users/token", weight=0.1),
+]
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def login(client: httpx.AsyncClient, role: str) -> dict[str, str]:
+    response = await client.post("/users/token", data={"username": user_email(role, 1), "password": SEED_PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def run_scenario(client, scenario: Scenario, catalog: Catalog, headers: dict, requests: int, concurrency: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    counter = itertools.count()
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        while (i := next(counter)) < requests:
+            kwargs: dict[str, Any] = {"headers": headers.get(scenario.auth, {})}
+            if scenario.name == "POST /users/token":
+                kwargs["data"] = {"username": user_email("buyer", 1 + i % catalog.buyers), "password": SEED_PASSWORD}
+            elif scenario.body is not None:
+                kwargs["json"] = scenario.body(i, rng, catalog)
+            started = time.perf_counter()
+            response = await client.request(scenario.method, scenario.path(i, rng, catalog), **kwargs)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Печатает изменения p95 и возвращает эндпоинты с регрессией.
+    Разница меньше миллисекунды считается шумом
+    """
+    regressions = []
+    print(f"\n{'endpoint':<52} {'p95 base':>10} {'p95 now':>10} {'change':>8}")
+    for name, result in current["endpoints"].items():
+        base = baseline["endpoints"].get(name)
+        if base is None:
+            print(f"{name:<52} {'-':>10} {result['p95_ms']:>10.2f} {'new':>8}")
+            continue
+        change = result["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        regressed = change > threshold and result["p95_ms"] - base["p95_ms"] > 1.0
+        marker = "  REGRESSION" if regressed else ""
+        print(f"{name:<52} {base['p95_ms']:>10.2f} {result['p95_ms']:>10.2f} {change:>+7.0%}{marker}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=scale_argument, default=10_000, help="10k, 100k, 1m или число товаров")
+    parser.add_argument("--url", default="sqlite+aiosqlite:///bench.sqlite")
+    parser.add_argument("--reuse", action="store_true", help="не заполнять базу заново")
+    parser.add_argument("--requests", type=int, default=500, help="запросов на сценарий (с учётом веса)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--no-cache", action="store_true", help="отключить кэш каталога")
+    parser.add_argument("--only", help="подстрока имени сценария")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="benchmark.json")
+    parser.add_argument("--compare", help="JSON предыдущего прогона")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимый рост p95, доля")
+    args = parser.parse_args()
+
+    engine = init_engine(args.url)
+    if args.reuse:
+        catalog = await describe_catalog(engine)
+    else:
+        started = time.perf_counter()
+        catalog = await seed_catalog(engine, args.scale, seed=args.seed)
+        print(f"seeded {catalog.products} products, {catalog.reviews} reviews in {time.perf_counter() - started:.1f} s")
+    if args.no_cache:
+        catalog_cache.maxsize = 0
+
+    results = {}
+    # lifespan повторно вызовет init_engine(), получит уже созданный Engine и прогреет пул
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            headers = {"seller": await login(client, "seller"), "buyer": await login(client, "buyer")}
+            for scenario in SCENARIOS:
+                if args.only and args.only not in scenario.name:
+                    continue
+                requests = max(1, int(args.requests * scenario.weight))
+                result = await run_scenario(
+                    client, scenario, catalog, headers, requests, min(args.concurrency, requests), args.seed,
+                )
+                results[scenario.name] = result
+                print(
+                    f"{scenario.name:<52} {result['rps']:>8.1f} rps  p50 {result['p50_ms']:>8.2f}  "
+                    f"p95 {result['p95_ms']:>8.2f}  p99 {result['p99_ms']:>8.2f} ms  errors {result['errors']}"
+                )
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "dialect": engine.dialect.name,
+            "products": catalog.products,
+            "reviews": catalog.reviews,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "cache": not args.no_cache,
+            "python": platform.python_version(),
+        },
+        "endpoints": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"\nsaved {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
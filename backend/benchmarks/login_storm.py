@@ -0,0 +1,87 @@
+"""
+Задержка лёгких запросов во время шторма логинов.
+
+Пока N задач параллельно проверяют пароли (тот же вызов, что делает /users/token),
+зонд раз в --interval секунд запрашивает GET / через ASGI-транспорт приложения.
+Сравниваются синхронный verify_password в event loop и verify_password_async из пула.
+
+Запуск из каталога backend:
+    python -m benchmarks.login_storm --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.auth import hash_password, hashing_pool, verify_password, verify_password_async
+from app.main import app
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def storm(verify, hashed: str, logins: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login() -> None:
+        async with semaphore:
+            result = verify("password123", hashed)
+            if asyncio.iscoroutine(result):
+                await result
+            # Отдаём управление, как это сделал бы реальный обработчик между запросами к БД
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(login() for _ in range(logins)))
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, interval: float) -> list[float]:
+    """
+    Задержка считается от момента, когда запрос должен был уйти, —
+    так в неё попадает и время, пока event loop был занят хешированием
+    """
+    latencies = []
+    while not stop.is_set():
+        scheduled = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        await client.get("/")
+        latencies.append((time.perf_counter() - scheduled) * 1000)
+    return latencies
+
+
+async def run(label: str, verify, hashed: str, args) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(client, stop, args.interval))
+        started = time.perf_counter()
+        await storm(verify, hashed, args.logins, args.concurrency)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        latencies = await probe_task
+
+    print(
+        f"{label:<22} logins/s {args.logins / elapsed:7.1f}   probe n={len(latencies):4d}  "
+        f"p50 {statistics.median(latencies):8.2f} ms  p99 {percentile(latencies, 0.99):8.2f} ms  "
+        f"max {max(latencies):8.2f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.005)
+    args = parser.parse_args()
+
+    hashed = hash_password("password123")
+    await run("sync in event loop", verify_password, hashed, args)
+    await run("hashing pool", verify_password_async, hashed, args)
+    print("pool stats:", hashing_pool.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+"""
+Задержка и качество полнотекстового поиска товаров.
+
+Заполняет отдельную базу N случайными товарами из общего словаря и подмешивает
+«иголки» — по 10 товаров с редким словом на каждый запрос. Затем измеряет
+p50/p95/p99 задержки search_products и precision@10: долю иголок среди первых 10 найденных товаров.
+
+Запуск из каталога backend (база создаётся заново):
+    python -m benchmarks.search --products 1000000 --url sqlite+aiosqlite:///bench_search.sqlite
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.models import Category as CategoryModel, Product as ProductModel, User as UserModel
+from app.search import search_products
+
+
+VOCABULARY = (
+    "телефон чехол ноутбук зарядка кабель наушники колонка часы планшет камера "
+    "красный синий чёрный белый большой маленький быстрый лёгкий новый прочный "
+    "кожаный металлический беспроводной игровой домашний детский"
+).split()
+NEEDLES = ["зюзюблик", "квазистатор", "лунокорд", "брандахлыст", "фиолетрон"]
+NEEDLES_PER_QUERY = 10
+BATCH_SIZE = 10_000
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def random_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+async def seed(maker: async_sessionmaker, products: int, rng: random.Random) -> set[int]:
+    """
+    Возвращает id иголок; их номера выбраны случайно по всему диапазону
+    """
+    needle_ids = rng.sample(range(1, products + 1), NEEDLES_PER_QUERY * len(NEEDLES))
+    needle_words = {
+        product_id: NEEDLES[index // NEEDLES_PER_QUERY] for index, product_id in enumerate(needle_ids)
+    }
+    async with maker() as db:
+        db.add(CategoryModel(id=1, name="Bench"))
+        db.add(UserModel(id=1, email="bench@example.com", hashed_password="-", role="seller"))
+        await db.commit()
+        for start in range(1, products + 1, BATCH_SIZE):
+            rows = []
+            for product_id in range(start, min(start + BATCH_SIZE, products + 1)):
+                description = random_text(rng, 12)
+                if product_id in needle_words:
+                    description = f"{description} {needle_words[product_id]}"
+                rows.append({
+                    "id": product_id,
+                    "name": random_text(rng, 3),
+                    "description": description,
+                    "price": 100.0,
+                    "stock": 1,
+                    "is_active": True,
+                    "rating": 0.0,
+                    "category_id": 1,
+                    "seller_id": 1,
+                })
+            await db.execute(insert(ProductModel), rows)
+            await db.commit()
+    return set(needle_ids)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--url", default="sqlite+aiosqlite:///bench_search.sqlite")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine = create_async_engine(args.url)
+    maker = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    needle_ids = await seed(maker, args.products, rng)
+    print(f"seeded {args.products} products in {time.perf_counter() - started:.1f} s")
+
+    # Редкое слово вместе с частым: проверяем, что частое слово не топит иголки
+    queries = [f"{needle} {rng.choice(VOCABULARY)}" for needle in NEEDLES] + [needle for needle in NEEDLES]
+    timings, precisions = [], []
+    async with maker() as db:
+        for _ in range(args.repeat):
+            for query in queries:
+                started = time.perf_counter()
+                page = await search_products(db, query, limit=10, after=None)
+                timings.append((time.perf_counter() - started) * 1000)
+                items = page["items"]
+                if items:
+                    precisions.append(sum(product.id in needle_ids for product in items) / len(items))
+        # Частое слово: большая выдача, основная нагрузка на ранжирование
+        common = []
+        for _ in range(min(args.repeat, 5)):
+            started = time.perf_counter()
+            await search_products(db, rng.choice(VOCABULARY), limit=10, after=None)
+            common.append((time.perf_counter() - started) * 1000)
+
+    print(
+        f"needle queries  n={len(timings):5d}  p50 {statistics.median(timings):8.2f} ms  "
+        f"p95 {percentile(timings, 0.95):8.2f} ms  p99 {percentile(timings, 0.99):8.2f} ms  "
+        f"precision@10 {statistics.mean(precisions):.2f}"
+    )
+    print(f"common word     n={len(common):5d}  p50 {statistics.median(common):8.2f} ms  max {max(common):8.2f} ms")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,226 @@
+"""
+Генератор синтетического каталога для нагрузочных тестов.
+
+Создаёт продавцов и покупателей, трёхуровневое дерево категорий, товары и отзывы.
+Агрегаты рейтинга товаров сразу согласованы с отзывами. Вставка идёт пачками
+executemany с явными id, поэтому связи строятся без RETURNING.
+
+У всех пользователей пароль SEED_PASSWORD, логины seller{N}@example.com и buyer{N}@example.com.
+
+Запуск из каталога backend (таблицы пересоздаются):
+    python -m benchmarks.seed --scale 100k --url sqlite+aiosqlite:///bench.sqlite
+"""
+import argparse
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.auth import hash_password
+from app.database import Base
+from app.models import (
+    Category as CategoryModel, Product as ProductModel, Review as ReviewModel, User as UserModel,
+)
+
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+SEED_PASSWORD = "password123"
+BATCH_SIZE = 5000
+
+# Ширина дерева категорий по уровням: 8 корней, по 5 детей, по 4 внука
+CATEGORY_FANOUT = [8, 5, 4]
+
+WORDS = (
+    "телефон чехол ноутбук зарядка кабель наушники колонка часы планшет камера "
+    "красный синий чёрный белый большой маленький быстрый лёгкий новый прочный "
+    "кожаный металлический беспроводной игровой домашний детский"
+).split()
+
+
+@dataclass
+class Catalog:
+    """
+    Что получилось после заполнения: нужно нагрузочному тесту для построения запросов
+    """
+    products: int
+    sellers: int
+    buyers: int
+    root_categories: list[int]
+    leaf_categories: list[int]
+    reviews: int
+
+    def seller_of(self, product_id: int) -> int:
+        return product_id % self.sellers + 1
+
+    def products_of(self, seller_id: int, limit: int) -> list[int]:
+        first = seller_id - 1 or self.sellers
+        return list(range(first, self.products + 1, self.sellers))[:limit]
+
+
+def user_email(role: str, number: int) -> str:
+    return f"{role}{number}@example.com"
+
+
+def build_categories() -> tuple[list[dict], list[int], list[int]]:
+    rows, roots, level = [], [], [None]
+    for depth, fanout in enumerate(CATEGORY_FANOUT):
+        next_level = []
+        for parent_id in level:
+            for _ in range(fanout):
+                category_id = len(rows) + 1
+                rows.append({"id": category_id, "name": f"Категория {category_id}", "parent_id": parent_id, "is_active": True})
+                next_level.append(category_id)
+        if depth == 0:
+            roots = next_level
+        level = next_level
+    return rows, roots, level
+
+
+async def insert_batches(engine: AsyncEngine, model, rows) -> None:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            async with engine.begin() as conn:
+                await conn.execute(insert(model), batch)
+            batch = []
+    if batch:
+        async with engine.begin() as conn:
+            await conn.execute(insert(model), batch)
+
+
+async def seed_catalog(engine: AsyncEngine, products: int, reviews_per_product: float = 2.0, seed: int = 42) -> Catalog:
+    """
+    Пересоздаёт схему и заполняет её синтетическими данными
+    """
+    rng = random.Random(seed)
+    sellers = max(5, products // 2000)
+    buyers = max(20, products // 200)
+    hashed = hash_password(SEED_PASSWORD)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    users = [
+        {"id": i, "email": user_email("seller", i), "hashed_password": hashed, "role": "seller", "is_active": True}
+        for i in range(1, sellers + 1)
+    ] + [
+        {"id": sellers + i, "email": user_email("buyer", i), "hashed_password": hashed, "role": "buyer", "is_active": True}
+        for i in range(1, buyers + 1)
+    ]
+    await insert_batches(engine, UserModel, users)
+
+    categories, roots, leaves = build_categories()
+    await insert_batches(engine, CategoryModel, categories)
+
+    now = datetime.now(timezone.utc)
+    review_total = 0
+    for first_id in range(1, products + 1, BATCH_SIZE):
+        product_rows, review_rows = [], []
+        for product_id in range(first_id, min(first_id + BATCH_SIZE, products + 1)):
+            # Число отзывов ~ экспоненциальное: у большинства мало, у немногих много
+            count = min(buyers, int(rng.expovariate(1 / reviews_per_product))) if reviews_per_product else 0
+            grades = rng.choices([1, 2, 3, 4, 5], weights=[1, 1, 2, 4, 5], k=count)
+            for user_offset, grade in zip(rng.sample(range(1, buyers + 1), count), grades):
+                review_rows.append({
+                    "user_id": sellers + user_offset,
+                    "product_id": product_id,
+                    "comment": " ".join(rng.choices(WORDS, k=6)),
+                    "comment_date": now - timedelta(minutes=rng.randrange(525_600)),
+                    "grade": grade,
+                    "is_active": True,
+                })
+            product_rows.append({
+                "id": product_id,
+                "name": " ".join(rng.choices(WORDS, k=3)),
+                "description": " ".join(rng.choices(WORDS, k=12)),
+                "price": round(rng.lognormvariate(7, 1.2), 2),
+                "image_url": None,
+                "stock": rng.randrange(0, 100),
+                "is_active": True,
+                "rating": sum(grades) / count if count else 0.0,
+                "rating_sum": sum(grades),
+                "rating_count": count,
+                **{f"grade_{grade}_count": grades.count(grade) for grade in range(1, 6)},
+                "category_id": rng.choice(leaves),
+                "seller_id": product_id % sellers + 1,
+            })
+        # Пачка товаров и их отзывы в одной транзакции, в памяти не больше одной пачки
+        async with engine.begin() as conn:
+            await conn.execute(insert(ProductModel), product_rows)
+            if review_rows:
+                await conn.execute(insert(ReviewModel), review_rows)
+        review_total += len(review_rows)
+
+    if engine.dialect.name == "postgresql":
+        # Явные id не двигают последовательности, а следующие INSERT из API на них полагаются
+        async with engine.begin() as conn:
+            for table in ("users", "categories", "products", "reviews"):
+                await conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT coalesce(max(id), 1) FROM {table}))"
+                ))
+        async with engine.connect() as conn:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("ANALYZE"))
+
+    return Catalog(
+        products=products,
+        sellers=sellers,
+        buyers=buyers,
+        root_categories=roots,
+        leaf_categories=leaves,
+        reviews=review_total,
+    )
+
+
+async def describe_catalog(engine: AsyncEngine) -> Catalog:
+    """
+    Восстанавливает Catalog по уже заполненной базе, чтобы не пересоздавать её перед каждым прогоном
+    """
+    async with engine.connect() as conn:
+        products = await conn.scalar(select(func.max(ProductModel.id)))
+        sellers = await conn.scalar(select(func.count()).where(UserModel.role == "seller"))
+        buyers = await conn.scalar(select(func.count()).where(UserModel.role == "buyer"))
+        reviews = await conn.scalar(select(func.count()).select_from(ReviewModel))
+        roots = (await conn.scalars(select(CategoryModel.id).where(CategoryModel.parent_id.is_(None)))).all()
+        children = select(CategoryModel.parent_id).where(CategoryModel.parent_id.is_not(None))
+        leaves = (await conn.scalars(select(CategoryModel.id).where(CategoryModel.id.not_in(children)))).all()
+    return Catalog(
+        products=products or 0,
+        sellers=sellers,
+        buyers=buyers,
+        root_categories=list(roots),
+        leaf_categories=list(leaves),
+        reviews=reviews,
+    )
+
+
+def scale_argument(value: str) -> int:
+    return SCALES.get(value.lower()) or int(value)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=scale_argument, default=SCALES["10k"], help="10k, 100k, 1m или число товаров")
+    parser.add_argument("--reviews-per-product", type=float, default=2.0)
+    parser.add_argument("--url", default="sqlite+aiosqlite:///bench.sqlite")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine = create_async_engine(args.url)
+    started = time.perf_counter()
+    catalog = await seed_catalog(engine, args.scale, args.reviews_per_product, args.seed)
+    print(
+        f"seeded {catalog.products} products, {catalog.reviews} reviews, "
+        f"{catalog.sellers} sellers, {catalog.buyers} buyers in {time.perf_counter() - started:.1f} s"
+    )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
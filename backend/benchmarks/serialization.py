@@ -0,0 +1,84 @@
+"""
+Микробенчмарк сериализации страницы товаров.
+
+Сравнивает стандартный путь FastAPI (response_model -> validate -> serialize -> json.dumps)
+с быстрым путём из app.serialization (TypeAdapter -> dump_json).
+
+Запуск из каталога backend:
+    python -m benchmarks.serialization --items 10000 --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.models import Product as ProductModel
+from app.schemas import ProductPage
+from app.serialization import dump_json, product_page_adapter
+
+
+def make_products(count: int) -> list[ProductModel]:
+    """
+    Создаёт несохранённые ORM-объекты, чтобы мерить только сериализацию
+    """
+    return [
+        ProductModel(
+            id=i,
+            name=f"Товар {i}",
+            description="Описание товара " * 8,
+            price=100.0 + i % 997,
+            image_url=f"/media/products/{i}.jpg",
+            stock=i % 50,
+            category_id=1 + i % 40,
+            is_active=True,
+            rating=(i % 50) / 10,
+        )
+        for i in range(count)
+    ]
+
+
+async def fastapi_default(field, page: dict) -> bytes:
+    content = await serialize_response(field=field, response_content=page)
+    return JSONResponse(content).body
+
+
+async def fast_path(page: dict) -> bytes:
+    return dump_json(product_page_adapter, page)
+
+
+async def measure(label: str, make_call, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await make_call()
+        timings.append(time.perf_counter() - started)
+    median = statistics.median(timings) * 1000
+    print(f"{label:<28} median {median:8.2f} ms   min {min(timings) * 1000:8.2f} ms")
+    return median
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    page = {"items": make_products(args.items), "next_cursor": None}
+    field = create_model_field(name="Response_get_all_products", type_=ProductPage, mode="serialization")
+
+    # Оба пути должны давать один и тот же документ
+    assert json.loads(await fastapi_default(field, page)) == json.loads(await fast_path(page))
+
+    print(f"Сериализация {args.items} товаров, {args.repeat} повторов")
+    before = await measure("FastAPI response_model", lambda: fastapi_default(field, page), args.repeat)
+    after = await measure("TypeAdapter.dump_json", lambda: fast_path(page), args.repeat)
+    print(f"Ускорение: x{before / after:.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,209 @@
+"""
+EXPLAIN для запросов роутеров: проверяет, что ни один из них не читает таблицу целиком.
+
+Запросы строятся теми же функциями, что и в app/routers/*, app/search.py и app/facets.py,
+поэтому при изменении роутера проверка меняется вместе с ним. На PostgreSQL перед EXPLAIN
+выполняется SET enable_seqscan = off, чтобы на маленькой базе планировщик показал,
+может ли запрос вообще использовать индекс. Та же проверка запускается в tests/test_explain_queries.py.
+
+Запуск из каталога backend:
+    python -m scripts.explain_queries [--verbose]
+Код возврата 1, если хотя бы один запрос падает в последовательное сканирование.
+"""
+import argparse
+import asyncio
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import Executable, event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import active_user_statement
+from app.category_tree import tree_rows_statement
+from app.database import Base, async_session_maker, dispose_engine, init_engine
+from app.facets import ProductFilters, facets_statement
+from app.models import Product as ProductModel
+from app.pagination import encode_cursor
+from app.routers.categories import active_categories_statement
+from app.routers.products import (
+    PRODUCT_SORT_KEYS, bulk_update_statement, category_products_statement, paginate_products,
+    product_batch_statement, product_detail_statement,
+)
+from app.routers.reviews import REVIEW_SORT, active_reviews_statement, duplicate_review_statement, paginate_reviews
+from app.schemas import ProductBulkUpdateItem
+from app.search import search_statement
+
+
+@dataclass
+class ExplainedQuery:
+    name: str
+    stmt: Executable
+    # Запрос по смыслу возвращает всю таблицу (например, все активные категории)
+    allow_seq_scan: bool = False
+
+
+def _prefix_explain(conn, cursor, statement, parameters, context, executemany):
+    """
+    Подставляет EXPLAIN перед уже скомпилированным запросом с execution_options(explain=...).
+    Параметры проходят обычную обработку типов, поэтому подходят и типы без литерального
+    представления (массивы asyncpg, regconfig), и UPDATE ... RETURNING
+    """
+    prefix = context.execution_options.get("explain") if context is not None else None
+    if prefix:
+        statement = f"{prefix} {statement}"
+    return statement, parameters
+
+
+def _collect_plan(conn, cursor, statement, parameters, context, executemany):
+    """
+    Забирает строки плана прямо из курсора: результат запроса разбирал бы их по колонкам исходного SELECT
+    """
+    plan = context.execution_options.get("explain_plan") if context is not None else None
+    if plan is not None:
+        plan += [str(row[-1]) for row in cursor.fetchall()]
+
+
+PAGE = 20
+
+
+def router_queries(dialect: str) -> list[ExplainedQuery]:
+    """
+    Запросы роутеров с типичными параметрами. Поиск и выборка по списку id зависят от диалекта
+    """
+    active_products = select(ProductModel).where(*ProductFilters().clauses())
+    review_cursor = encode_cursor(REVIEW_SORT, datetime(2024, 1, 1, tzinfo=timezone.utc), 1)
+    sorts = [prefix + key for key in PRODUCT_SORT_KEYS for prefix in ("", "-")]
+    queries = [
+        ExplainedQuery(f"products.get_all_products (sort={sort})", paginate_products(active_products, sort, PAGE, None))
+        for sort in sorts
+    ]
+    queries += [
+        ExplainedQuery(
+            "products.get_all_products (sort=price, next page)",
+            paginate_products(active_products, "price", PAGE, encode_cursor("price", 100.0, 1)),
+        ),
+        ExplainedQuery(
+            "products.get_all_products (category_id, in_stock)",
+            paginate_products(
+                select(ProductModel).where(*ProductFilters(category_id=1, in_stock=True).clauses()), "id", PAGE, None
+            ),
+        ),
+        ExplainedQuery(
+            "products.get_all_products facets (category_id)",
+            facets_statement(ProductFilters(category_id=1)),
+        ),
+        ExplainedQuery(
+            "products.get_all_products facets",
+            facets_statement(ProductFilters()),
+            # Счётчики по всем активным товарам
+            allow_seq_scan=True,
+        ),
+        ExplainedQuery(
+            "products.search",
+            search_statement(dialect, "телефон чехол", PAGE, None),
+        ),
+        ExplainedQuery(
+            "products.get_products_by_category",
+            paginate_products(category_products_statement(1, include_subcategories=False), "id", PAGE, None),
+        ),
+        ExplainedQuery(
+            "products.get_products_by_category (include_subcategories)",
+            paginate_products(category_products_statement(1, include_subcategories=True), "id", PAGE, None),
+        ),
+        ExplainedQuery("products.get_product", product_detail_statement(1)),
+        ExplainedQuery("products.get_products_batch", product_batch_statement([1, 2, 3], dialect)),
+        ExplainedQuery(
+            "products.bulk_update_products",
+            bulk_update_statement(1, [
+                ProductBulkUpdateItem(id=1, price=10.0),
+                ProductBulkUpdateItem(id=2, stock=5),
+            ]),
+        ),
+        ExplainedQuery("categories.get_all_categories", active_categories_statement(), allow_seq_scan=True),
+        ExplainedQuery("categories.get_category_tree", tree_rows_statement(), allow_seq_scan=True),
+        ExplainedQuery("reviews.get_all_reviews", paginate_reviews(active_reviews_statement(), PAGE, None)),
+        ExplainedQuery(
+            "reviews.get_all_reviews (next page)",
+            paginate_reviews(active_reviews_statement(), PAGE, review_cursor),
+        ),
+        ExplainedQuery("reviews.get_product_reviews", paginate_reviews(active_reviews_statement(1), PAGE, None)),
+        ExplainedQuery(
+            "reviews.get_product_reviews (next page)",
+            paginate_reviews(active_reviews_statement(1), PAGE, review_cursor),
+        ),
+        ExplainedQuery("reviews.create_reviews duplicate check", duplicate_review_statement(1, 1)),
+        ExplainedQuery("auth: active user by email", active_user_statement("user@example.com")),
+    ]
+    return queries
+
+
+# Последовательное сканирование в плане PostgreSQL и SQLite
+SEQ_SCAN_PATTERNS = {
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    "sqlite": re.compile(r"^SCAN (\w+)\s*$", re.MULTILINE),
+}
+
+
+async def explain_queries(
+    session: AsyncSession, queries: list[ExplainedQuery] | None = None, verbose: bool = False
+) -> list[str]:
+    """
+    Печатает результат по каждому запросу (по умолчанию — router_queries) и возвращает имена тех,
+    что читают таблицу целиком
+    """
+    dialect = session.bind.dialect
+    pattern = SEQ_SCAN_PATTERNS.get(dialect.name)
+    if pattern is None:
+        raise SystemExit(f"EXPLAIN для диалекта {dialect.name} не поддерживается")
+
+    if dialect.name == "postgresql":
+        await session.execute(text("SET enable_seqscan = off"))
+        prefix = "EXPLAIN"
+    else:
+        prefix = "EXPLAIN QUERY PLAN"
+
+    connection = await session.connection()
+    event.listen(connection.sync_engine, "before_cursor_execute", _prefix_explain, retval=True)
+    event.listen(connection.sync_engine, "after_cursor_execute", _collect_plan)
+    failures = []
+    try:
+        for query in queries if queries is not None else router_queries(dialect.name):
+            lines = []
+            # Через Connection, а не Session: ORM не должен разбирать строки плана как товары
+            await connection.execute(query.stmt.execution_options(explain=prefix, explain_plan=lines))
+            plan = "\n".join(lines)
+            # Сканирование CTE и подзапросов не в счёт, только таблиц
+            scans = [table for table in pattern.findall(plan) if table in Base.metadata.tables]
+            ok = query.allow_seq_scan or not scans
+            print(f"[{'ok' if ok else 'SEQ SCAN'}] {query.name}")
+            if verbose or not ok:
+                print("    " + plan.replace("\n", "\n    "))
+            if not ok:
+                failures.append(query.name)
+    finally:
+        event.remove(connection.sync_engine, "before_cursor_execute", _prefix_explain)
+        event.remove(connection.sync_engine, "after_cursor_execute", _collect_plan)
+    if dialect.name == "postgresql":
+        await session.execute(text("RESET enable_seqscan"))
+    return failures
+
+
+async def explain_all(verbose: bool) -> list[str]:
+    init_engine()
+    async with async_session_maker() as session:
+        failures = await explain_queries(session, verbose=verbose)
+    await dispose_engine()
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true", help="печатать планы всех запросов")
+    args = parser.parse_args()
+    failures = asyncio.run(explain_all(args.verbose))
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
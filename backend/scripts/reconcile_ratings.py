@@ -0,0 +1,161 @@
+"""
+Сверка агрегатов рейтинга товаров с таблицей отзывов.
+
+Одним запросом находит товары, у которых rating_sum/rating_count, rating или гистограмма
+grade_N_count расходятся с активными отзывами. С флагом --fix исправляет их
+одним UPDATE по тем же агрегатам.
+
+Запуск из каталога backend:
+    python -m scripts.reconcile_ratings [--fix] [--show 20]
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import Float, case, cast, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session_maker, dispose_engine, init_engine
+from app.models import Product as ProductModel, Review as ReviewModel
+
+
+GRADES = range(1, 6)
+
+# rating — частное с плавающей точкой, сравниваем с допуском
+RATING_TOLERANCE = 1e-9
+
+
+def grade_column(grade: int):
+    return getattr(ProductModel, f"grade_{grade}_count")
+
+
+def mean_rating(grade_sum, grade_count):
+    """
+    То же выражение, по которому rating ведёт apply_review_grade
+    """
+    return case((grade_count > 0, cast(grade_sum, Float) / grade_count), else_=0.0)
+
+
+def rating_differs(grade_sum, grade_count):
+    return func.abs(ProductModel.rating - mean_rating(grade_sum, grade_count)) > RATING_TOLERANCE
+
+
+def review_aggregates():
+    return (
+        select(
+            ReviewModel.product_id,
+            func.sum(ReviewModel.grade).label("grade_sum"),
+            func.count().label("grade_count"),
+            *(func.count().filter(ReviewModel.grade == grade).label(f"grade_{grade}") for grade in GRADES),
+        )
+        .where(ReviewModel.is_active == True)
+        .group_by(ReviewModel.product_id)
+        .subquery("agg")
+    )
+
+
+async def reconcile(session: AsyncSession, fix: bool, show: int) -> int:
+    """
+    Печатает расхождения, с fix=True исправляет их. Возвращает число товаров с расхождениями
+    """
+    agg = review_aggregates()
+    expected_sum = func.coalesce(agg.c.grade_sum, 0)
+    expected_count = func.coalesce(agg.c.grade_count, 0)
+    expected_grades = {grade: func.coalesce(agg.c[f"grade_{grade}"], 0) for grade in GRADES}
+    mismatch = or_(
+        ProductModel.rating_sum != expected_sum,
+        ProductModel.rating_count != expected_count,
+        rating_differs(expected_sum, expected_count),
+        *(grade_column(grade) != expected for grade, expected in expected_grades.items()),
+    )
+
+    stmt_mismatched = (
+        select(
+            ProductModel.id,
+            ProductModel.rating_sum,
+            ProductModel.rating_count,
+            ProductModel.rating,
+            expected_sum.label("expected_sum"),
+            expected_count.label("expected_count"),
+            mean_rating(expected_sum, expected_count).label("expected_rating"),
+            *(grade_column(grade) for grade in GRADES),
+            *(expected.label(f"expected_grade_{grade}") for grade, expected in expected_grades.items()),
+        )
+        .outerjoin(agg, agg.c.product_id == ProductModel.id)
+        .where(mismatch)
+        .order_by(ProductModel.id)
+    )
+
+    rows = (await session.execute(stmt_mismatched)).all()
+    print(f"Товаров с расхождениями: {len(rows)}")
+    for row in rows[:show]:
+        print(
+            f"  product {row.id}: sum {row.rating_sum} -> {row.expected_sum}, "
+            f"count {row.rating_count} -> {row.expected_count}, "
+            f"rating {row.rating} -> {row.expected_rating}, "
+            f"grades {[row._mapping[grade_column(grade)] for grade in GRADES]} "
+            f"-> {[row._mapping[f'expected_grade_{grade}'] for grade in GRADES]}"
+        )
+
+    if fix and rows:
+        # Коррелированные подзапросы: и проверка, и исправление — один UPDATE по всей таблице
+        actual_sum = (
+            select(func.coalesce(func.sum(ReviewModel.grade), 0))
+            .where(ReviewModel.product_id == ProductModel.id, ReviewModel.is_active == True)
+            .scalar_subquery()
+        )
+        actual_count = (
+            select(func.count())
+            .where(ReviewModel.product_id == ProductModel.id, ReviewModel.is_active == True)
+            .scalar_subquery()
+        )
+        actual_grades = {
+            grade: select(func.count())
+            .where(
+                ReviewModel.product_id == ProductModel.id,
+                ReviewModel.is_active == True,
+                ReviewModel.grade == grade,
+            )
+            .scalar_subquery()
+            for grade in GRADES
+        }
+        result = await session.execute(
+            update(ProductModel)
+            .where(or_(
+                ProductModel.rating_sum != actual_sum,
+                ProductModel.rating_count != actual_count,
+                rating_differs(actual_sum, actual_count),
+                *(grade_column(grade) != actual for grade, actual in actual_grades.items()),
+            ))
+            .values(
+                rating_sum=actual_sum,
+                rating_count=actual_count,
+                rating=mean_rating(actual_sum, actual_count),
+                **{f"grade_{grade}_count": actual for grade, actual in actual_grades.items()},
+            ),
+            execution_options={"synchronize_session": False},
+        )
+        await session.commit()
+        print(f"Исправлено товаров: {result.rowcount}")
+
+    return len(rows)
+
+
+async def reconcile_all(fix: bool, show: int) -> int:
+    init_engine()
+    async with async_session_maker() as session:
+        mismatched = await reconcile(session, fix=fix, show=show)
+    await dispose_engine()
+    return mismatched
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fix", action="store_true", help="исправить найденные расхождения")
+    parser.add_argument("--show", type=int, default=20, help="сколько расхождений вывести")
+    args = parser.parse_args()
+    mismatched = asyncio.run(reconcile_all(fix=args.fix, show=args.show))
+    raise SystemExit(1 if mismatched and not args.fix else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import os
+import tempfile
+
+# app.config читает окружение при импорте, поэтому задаём его до импорта приложения
+os.environ["SECRET_KEY"] = "test-secret-key-for-pytest-only-0123456789"
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='ecommerce-tests-')}/default.sqlite"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+# Кэш и снимки каталога общие для процесса, а база у каждого теста своя
+os.environ["CATALOG_CACHE_MAXSIZE"] = "0"
+os.environ["CATALOG_SNAPSHOTS"] = "false"
+# Без окна отставания реплик: тесты, которым оно нужно, включают его сами
+os.environ["DB_REPLICA_MAX_LAG"] = "0"
+
+import pytest
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    """
+    Основная БД приложения — свежий файл SQLite со всеми таблицами и индексами моделей
+    """
+    import app.models  # noqa: F401 — регистрирует таблицы в Base.metadata
+    from app.database import Base, dispose_engine, init_engine
+
+    engine = init_engine(url=f"sqlite+aiosqlite:///{tmp_path}/primary.sqlite", replica_urls=[])
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    yield engine
+    await dispose_engine()
+
+
+@pytest.fixture
+async def catalog(engine):
+    """
+    Небольшой каталог: продавец и покупатель, две категории (вторая — дочерняя), товары и отзывы
+    """
+    from app.database import async_session_maker
+    from app.models import Category, Product, Review, User
+
+    async with async_session_maker() as session:
+        seller = User(email="seller@example.com", hashed_password="-", role="seller")
+        buyer = User(email="buyer@example.com", hashed_password="-", role="buyer")
+        phones = Category(name="Телефоны")
+        cases = Category(name="Чехлы", parent=phones)
+        session.add_all([seller, buyer, phones, cases])
+        await session.flush()
+        products = [
+            Product(name="Телефон базовый", description="Простой телефон", price=100.0, stock=5,
+                    category_id=phones.id, seller_id=seller.id),
+            Product(name="Телефон с камерой", description="Телефон с хорошей камерой и чехол в комплекте",
+                    price=300.0, stock=0, category_id=phones.id, seller_id=seller.id),
+            Product(name="Чехол кожаный", description="Чехол для телефона", price=20.0, stock=50,
+                    category_id=cases.id, seller_id=seller.id),
+            Product(name="Чехол снятый", description="Чехол, снятый с продажи", price=15.0, stock=1,
+                    category_id=cases.id, seller_id=seller.id, is_active=False),
+        ]
+        session.add_all(products)
+        await session.flush()
+        session.add_all([
+            Review(user_id=buyer.id, product_id=products[0].id, comment="Хорош", grade=5),
+            Review(user_id=buyer.id, product_id=products[1].id, comment="Неплох", grade=4),
+        ])
+        await session.commit()
+    return {"seller": seller, "buyer": buyer, "categories": [phones, cases], "products": products}
+
+
+@pytest.fixture
+async def client(engine):
+    """
+    HTTP-клиент к приложению в том же процессе, с запуском и остановкой lifespan
+    """
+    import httpx
+
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            yield client
+
+
+@pytest.fixture
+def auth_headers():
+    """
+    Заголовок Authorization с токеном, какой выдаёт /users/token
+    """
+    from app.auth import create_access_token
+
+    def make(user) -> dict:
+        token = create_access_token(data={"sub": user.email, "role": user.role, "id": user.id})
+        return {"Authorization": f"Bearer {token}"}
+
+    return make
+
+
+@pytest.fixture
+def cached_catalog(monkeypatch):
+    """
+    Включает кэш каталога, который в тестах отключён через CATALOG_CACHE_MAXSIZE=0
+    """
+    from app.cache import catalog_cache
+
+    monkeypatch.setattr(catalog_cache, "maxsize", 1000)
+    yield catalog_cache
+    catalog_cache.clear()
+
+
+@pytest.fixture
+async def lagging_replica(catalog, engine, tmp_path, monkeypatch):
+    """
+    Реплика — копия основной БД на момент заполнения каталога, записи до неё не доходят
+    """
+    import shutil
+
+    from app.database import create_engine_from_settings, replica_router
+    from app.singleflight import catalog_flights
+
+    replica_path = tmp_path / "replica.sqlite"
+    shutil.copy(engine.url.database, replica_path)
+    replica = create_engine_from_settings(f"sqlite+aiosqlite:///{replica_path}")
+    replica_router.configure([replica])
+    monkeypatch.setattr(catalog_flights, "replica_lag", 60.0)
+    # Записи предыдущих тестов не в счёт
+    monkeypatch.setattr(catalog_flights, "_written_at", float("-inf"))
+    yield replica
+    replica_router.configure([])
+    replica_router.routed.clear()
+    await replica.dispose()
@@ -0,0 +1,152 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy import exc
+
+from app.admission import AdmissionClass, AdmissionController, AdmissionMiddleware, admission
+from app.config import ADMISSION_RETRY_AFTER
+from app.database import pool_stats
+
+
+pytestmark = pytest.mark.anyio
+
+
+class BlockingApp:
+    """
+    ASGI-приложение, которое держит запросы к /slow, пока не открыт release
+    """
+
+    def __init__(self):
+        self.entered = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, scope, receive, send):
+        if scope["path"] == "/slow":
+            self.entered += 1
+            await self.release.wait()
+        if scope["path"] == "/pool-timeout":
+            raise exc.TimeoutError("QueuePool limit reached")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        if scope["path"] == "/pool-timeout-after-start":
+            raise exc.TimeoutError("QueuePool limit reached")
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+@pytest.fixture
+def controller():
+    return AdmissionController({"auth": (1, 0), "read": (2, 1), "write": (1, 0)}, queue_timeout=0.2,
+                               pool_wait_threshold=0.25)
+
+
+@pytest.fixture
+def blocking_app():
+    return BlockingApp()
+
+
+@pytest.fixture
+async def limited_client(controller, blocking_app):
+    transport = httpx.ASGITransport(app=AdmissionMiddleware(blocking_app, controller))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+async def wait_until(condition):
+    while not condition():
+        await asyncio.sleep(0)
+
+
+def assert_overloaded(response):
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(ADMISSION_RETRY_AFTER)
+
+
+def test_classify(controller):
+    assert controller.classify("GET", "/products") is controller.classes["read"]
+    assert controller.classify("HEAD", "/categories/") is controller.classes["read"]
+    assert controller.classify("POST", "/products") is controller.classes["write"]
+    assert controller.classify("POST", "/users/token") is controller.classes["auth"]
+    for path in ("/", "/metrics", "/stats/db-pool", "/docs"):
+        assert controller.classify("GET", path) is None
+
+
+async def test_saturated_class_queues_then_sheds(controller, blocking_app, limited_client):
+    read = controller.classes["read"]
+    # Два слота заняты, третий запрос ждёт в очереди, четвёртому места нет
+    held = [asyncio.create_task(limited_client.get("/slow")) for _ in range(2)]
+    await wait_until(lambda: blocking_app.entered == 2)
+    queued = asyncio.create_task(limited_client.get("/slow"))
+    await wait_until(lambda: read.queued == 1)
+
+    assert_overloaded(await limited_client.get("/fast"))
+    assert read.stats() | {"shed": None} == {
+        "concurrency": 2, "queue_size": 1, "in_flight": 2, "queued": 1, "max_queued": 1, "admitted": 2,
+        "shed": None,
+    }
+    # Другие классы не затронуты
+    assert (await limited_client.post("/fast")).status_code == 200
+
+    blocking_app.release.set()
+    assert [response.status_code for response in await asyncio.gather(*held, queued)] == [200] * 3
+    assert (read.in_flight, read.queued, read.admitted) == (0, 0, 3)
+    assert read.shed == {"queue_full": 1}
+
+
+async def test_queue_timeout(controller, blocking_app, limited_client):
+    write = controller.classes["write"]
+    write.queue_size = 1
+    held = asyncio.create_task(limited_client.post("/slow"))
+    await wait_until(lambda: blocking_app.entered == 1)
+    # Очередь есть, но слот не освобождается дольше queue_timeout
+    assert_overloaded(await limited_client.post("/fast"))
+    assert write.shed == {"queue_timeout": 1}
+    assert write.queued == 0
+
+    blocking_app.release.set()
+    assert (await held).status_code == 200
+    assert write.in_flight == 0
+
+
+async def test_pool_saturation_skips_the_queue(controller, blocking_app, limited_client, monkeypatch):
+    read = controller.classes["read"]
+    held = [asyncio.create_task(limited_client.get("/slow")) for _ in range(2)]
+    await wait_until(lambda: blocking_app.entered == 2)
+
+    monkeypatch.setattr(pool_stats, "recent", lambda: controller.pool_wait_threshold * 2)
+    # Место в очереди есть, но при перегруженном пуле ждать бессмысленно
+    assert_overloaded(await limited_client.get("/fast"))
+    assert read.shed == {"pool_saturated": 1}
+    assert read.max_queued == 0
+
+    blocking_app.release.set()
+    await asyncio.gather(*held)
+    # Свободный слот выдаётся и при перегруженном пуле
+    assert (await limited_client.get("/fast")).status_code == 200
+
+
+async def test_pool_timeout_becomes_503(controller, limited_client):
+    read = controller.classes["read"]
+    assert_overloaded(await limited_client.get("/pool-timeout"))
+    assert read.shed == {"pool_timeout": 1}
+    assert read.in_flight == 0
+
+    # Ответ уже начат — подменить его на 503 нельзя
+    with pytest.raises(exc.TimeoutError):
+        await limited_client.get("/pool-timeout-after-start")
+    assert read.shed == {"pool_timeout": 1}
+    assert read.in_flight == 0
+
+
+async def test_app_sheds_saturated_class(client, monkeypatch):
+    read = AdmissionClass("read", 1, 0)
+    monkeypatch.setitem(admission.classes, "read", read)
+    await read.acquire(timeout=0, pool_saturated=False)
+    try:
+        assert_overloaded(await client.get("/products/"))
+        # Служебные пути открыты и под перегрузкой
+        metrics = (await client.get("/metrics")).text
+        assert 'admission_shed_total{class="read",reason="queue_full"} 1' in metrics
+        assert 'admission_in_flight{class="read"} 1' in metrics
+    finally:
+        read.release()
+    assert (await client.get("/products/")).status_code == 200
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+from sqlalchemy import update
+
+from app import auth
+from app.auth import revoked_users
+from app.config import ALGORITHM, SECRET_KEY
+from app.database import async_session_maker
+from app.models import User as UserModel
+
+
+pytestmark = pytest.mark.anyio
+
+# Любой ответ, кроме 401/403, значит, что продавец прошёл проверку
+SELLER_ONLY = "/products/999999"
+
+
+@pytest.fixture(autouse=True)
+def fresh_revoked_users(monkeypatch):
+    """
+    Список отозванных общий для процесса, а id пользователей в каждом тесте начинаются заново
+    """
+    monkeypatch.setattr(revoked_users, "_ids", frozenset())
+    monkeypatch.setattr(revoked_users, "_revoked_locally", set())
+    monkeypatch.setattr(revoked_users, "_loaded_at", float("-inf"))
+
+
+@pytest.fixture
+async def admin(catalog):
+    async with async_session_maker() as session:
+        user = UserModel(email="admin@example.com", hashed_password="-", role="admin")
+        session.add(user)
+        await session.commit()
+    return user
+
+
+async def deactivate_in_db(user_id: int) -> None:
+    """
+    Деактивация мимо этого процесса — как если бы её выполнил другой воркер
+    """
+    async with async_session_maker() as session:
+        await session.execute(update(UserModel).where(UserModel.id == user_id).values(is_active=False))
+        await session.commit()
+
+
+def bearer(claims: dict, expires_in: timedelta = timedelta(minutes=5)) -> dict:
+    token = jwt.encode(claims | {"exp": datetime.now(timezone.utc) + expires_in}, SECRET_KEY, algorithm=ALGORITHM)
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def test_role_checks(catalog, client, auth_headers):
+    assert (await client.delete(SELLER_ONLY, headers=auth_headers(catalog["seller"]))).status_code == 404
+    response = await client.delete(SELLER_ONLY, headers=auth_headers(catalog["buyer"]))
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Only sellers can perform this action"
+    assert (await client.delete(SELLER_ONLY)).status_code == 401
+
+
+async def test_invalid_tokens(catalog, client):
+    response = await client.delete(SELLER_ONLY, headers=bearer({"sub": "seller@example.com"}, timedelta(minutes=-1)))
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has expired"
+    response = await client.delete(SELLER_ONLY, headers={"Authorization": "Bearer not-a-jwt"})
+    assert response.status_code == 401
+
+
+async def test_claims_mode_trusts_token_role(catalog, client):
+    buyer = catalog["buyer"]
+    # Роль берётся из подписанного токена, строка пользователя не читается
+    headers = bearer({"sub": buyer.email, "id": buyer.id, "role": "seller"})
+    assert (await client.delete(SELLER_ONLY, headers=headers)).status_code == 404
+
+
+async def test_db_mode_reads_role_from_database(catalog, client, monkeypatch):
+    monkeypatch.setattr(auth, "AUTH_MODE", "db")
+    buyer = catalog["buyer"]
+    headers = bearer({"sub": buyer.email, "id": buyer.id, "role": "seller"})
+    assert (await client.delete(SELLER_ONLY, headers=headers)).status_code == 403
+
+    await deactivate_in_db(catalog["seller"].id)
+    seller = catalog["seller"]
+    headers = bearer({"sub": seller.email, "id": seller.id, "role": "seller"})
+    assert (await client.delete(SELLER_ONLY, headers=headers)).status_code == 401
+
+
+async def test_token_without_claims_falls_back_to_database(catalog, client):
+    assert (await client.delete(SELLER_ONLY, headers=bearer({"sub": "seller@example.com"}))).status_code == 404
+    assert (await client.delete(SELLER_ONLY, headers=bearer({"sub": "buyer@example.com"}))).status_code == 403
+
+
+async def test_deactivated_user_is_revoked_at_once(catalog, client, admin, auth_headers):
+    seller = catalog["seller"]
+    assert (await client.delete(SELLER_ONLY, headers=auth_headers(seller))).status_code == 404
+
+    response = await client.delete(f"/users/{seller.id}", headers=auth_headers(admin))
+    assert response.status_code == 200
+    # Не дожидаясь обновления списка отозванных
+    assert (await client.delete(SELLER_ONLY, headers=auth_headers(seller))).status_code == 401
+    assert (await client.delete(f"/users/{seller.id}", headers=auth_headers(admin))).status_code == 404
+
+
+async def test_only_admin_deactivates_users(catalog, client, auth_headers):
+    response = await client.delete(f"/users/{catalog['buyer'].id}", headers=auth_headers(catalog["seller"]))
+    assert response.status_code == 403
+
+
+async def test_deactivation_elsewhere_applies_after_refresh(catalog, client, auth_headers, monkeypatch):
+    seller = catalog["seller"]
+    assert (await client.delete(SELLER_ONLY, headers=auth_headers(seller))).status_code == 404
+    await deactivate_in_db(seller.id)
+    # Список отозванных загружен до деактивации и ещё не устарел
+    assert (await client.delete(SELLER_ONLY, headers=auth_headers(seller))).status_code == 404
+
+    monkeypatch.setattr(revoked_users, "refresh_interval", 0.0)
+    assert (await client.delete(SELLER_ONLY, headers=auth_headers(seller))).status_code == 401
@@ -0,0 +1,140 @@
+import pytest
+from sqlalchemy import event, select
+
+from app import bulk_import
+from app.bulk_import import IMPORT_MAX_REPORTED_ERRORS, iter_csv_rows, iter_lines
+from app.database import async_session_maker
+from app.models import Product as ProductModel
+
+
+pytestmark = pytest.mark.anyio
+
+CSV = {"Content-Type": "text/csv"}
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(rows) -> list:
+    return [row async for row in rows]
+
+
+async def products_named(*names: str) -> dict:
+    async with async_session_maker() as session:
+        result = await session.scalars(select(ProductModel).where(ProductModel.name.in_(names)))
+        return {product.name: product for product in result.all()}
+
+
+async def test_lines_split_across_chunks():
+    data = "\ufeffname,price\r\nЧехол,10\r\nСтекло,5".encode()
+    # По одному байту: BOM и кириллица режутся посреди символа
+    lines = await collect(iter_lines(chunked(data, 1)))
+    assert lines == ["name,price", "Чехол,10", "Стекло,5"]
+
+
+async def test_csv_quoted_fields_span_lines():
+    async def lines():
+        for line in ['name,description', '"Чехол, кожаный","Первая строка', 'вторая ""строка"""', 'Стекло,']:
+            yield line
+
+    assert await collect(iter_csv_rows(lines())) == [
+        (1, {"name": "Чехол, кожаный", "description": 'Первая строка\nвторая "строка"'}),
+        (2, {"name": "Стекло"}),
+    ]
+
+
+async def test_csv_import(catalog, client, auth_headers):
+    category_id = catalog["categories"][1].id
+    body = (
+        "\ufeffname,description,price,stock,category_id\r\n"
+        f'Чехол силиконовый,"Мягкий,\r\nпрозрачный",12.5,10,{category_id}\r\n'
+        f"Стекло защитное,,5,100,{category_id}\r\n"
+        f"Плёнка,лишняя колонка,1,1,{category_id},x\r\n"
+        f'Сломанный,"без закрывающей кавычки,1,1,{category_id}\r\n'
+    ).encode()
+    response = await client.post("/products/import", content=body, headers=CSV | auth_headers(catalog["seller"]))
+    assert response.status_code == 200
+    assert response.json() == {
+        "total": 4,
+        "inserted": 2,
+        "rejected": 2,
+        "errors": [
+            {"row": 3, "errors": ["Expected 5 columns, got 6"]},
+            {"row": 4, "errors": ["Unterminated quoted field"]},
+        ],
+    }
+    products = await products_named("Чехол силиконовый", "Стекло защитное")
+    assert products["Чехол силиконовый"].description == "Мягкий,\nпрозрачный"
+    assert products["Стекло защитное"].description is None
+    assert {product.seller_id for product in products.values()} == {catalog["seller"].id}
+
+
+async def test_ndjson_errors_are_reported_by_row(catalog, client, auth_headers):
+    category_id = catalog["categories"][0].id
+    inactive_category = 999999
+    lines = [
+        f'{{"name": "Телефон новый", "price": 200, "stock": 3, "category_id": {category_id}}}',
+        "",
+        '{"name": "Телефон',
+        "[1, 2]",
+        f'{{"name": "Телефон бесплатный", "price": 0, "stock": 1, "category_id": {category_id}}}',
+        f'{{"name": "Телефон без категории", "price": 50, "stock": 1, "category_id": {inactive_category}}}',
+    ]
+    response = await client.post(
+        "/products/import", content="\n".join(lines).encode(), headers=NDJSON | auth_headers(catalog["seller"]),
+    )
+    report = response.json()
+    assert (report["total"], report["inserted"], report["rejected"]) == (5, 1, 4)
+    # Пустая строка не считается
+    assert [error["row"] for error in report["errors"]] == [2, 3, 4, 5]
+    assert report["errors"][0]["errors"][0].startswith("Invalid JSON")
+    assert report["errors"][1]["errors"] == ["Row must be a JSON object"]
+    assert report["errors"][2]["errors"][0].startswith("price:")
+    assert report["errors"][3]["errors"] == ["category_id: Category not found"]
+    assert list(await products_named("Телефон новый", "Телефон без категории")) == ["Телефон новый"]
+
+
+async def test_rows_are_inserted_in_batches(catalog, client, auth_headers, engine, monkeypatch):
+    monkeypatch.setattr(bulk_import, "IMPORT_BATCH_SIZE", 2)
+    inserts = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO products"):
+            inserts.append(statement)
+
+    category_id = catalog["categories"][0].id
+    body = "\n".join(
+        f'{{"name": "Товар {index}", "price": 10, "stock": 1, "category_id": {category_id}}}' for index in range(5)
+    )
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        response = await client.post(
+            "/products/import", content=body.encode(), headers=NDJSON | auth_headers(catalog["seller"]),
+        )
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+    assert response.json()["inserted"] == 5
+    assert len(inserts) == 3
+    assert len(await products_named(*(f"Товар {index}" for index in range(5)))) == 5
+
+
+async def test_reported_errors_are_truncated(catalog, client, auth_headers):
+    body = b"\n".join(b"{" for _ in range(IMPORT_MAX_REPORTED_ERRORS + 5))
+    response = await client.post("/products/import", content=body, headers=NDJSON | auth_headers(catalog["seller"]))
+    report = response.json()
+    # Считаются все ошибочные строки, в отчёт попадают первые
+    assert report["rejected"] == IMPORT_MAX_REPORTED_ERRORS + 5
+    assert len(report["errors"]) == IMPORT_MAX_REPORTED_ERRORS
+    assert report["errors"][-1]["row"] == IMPORT_MAX_REPORTED_ERRORS
+
+
+async def test_import_rejects_other_media_types_and_roles(catalog, client, auth_headers):
+    response = await client.post(
+        "/products/import", content=b"[]", headers={"Content-Type": "application/json"} | auth_headers(catalog["seller"]),
+    )
+    assert response.status_code == 415
+    response = await client.post("/products/import", content=b"", headers=CSV | auth_headers(catalog["buyer"]))
+    assert response.status_code == 403
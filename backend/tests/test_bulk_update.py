@@ -0,0 +1,104 @@
+import pytest
+from sqlalchemy import select
+
+from app.database import async_session_maker
+from app.models import Product as ProductModel, User as UserModel
+from app.routers import products as products_router
+from app.routers.products import BULK_UPDATE_MAX_ITEMS
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def price_and_stock(*product_ids: int) -> dict:
+    async with async_session_maker() as session:
+        stmt = select(ProductModel.id, ProductModel.price, ProductModel.stock).where(ProductModel.id.in_(product_ids))
+        return {row.id: (row.price, row.stock) for row in await session.execute(stmt)}
+
+
+@pytest.fixture
+async def foreign_product(catalog):
+    async with async_session_maker() as session:
+        other = UserModel(email="other-seller@example.com", hashed_password="-", role="seller")
+        session.add(other)
+        await session.flush()
+        product = ProductModel(name="Чужой товар", price=1.0, stock=1, category_id=catalog["categories"][0].id,
+                               seller_id=other.id)
+        session.add(product)
+        await session.commit()
+    return product
+
+
+async def test_partial_updates(catalog, client, auth_headers):
+    first, second, third = (product.id for product in catalog["products"][:3])
+    response = await client.patch("/products/bulk", headers=auth_headers(catalog["seller"]), json=[
+        {"id": first, "price": 110.0},
+        {"id": second, "stock": 7},
+        {"id": third, "price": 25.0, "stock": 0},
+    ])
+    assert response.status_code == 200
+    assert response.json() == {"applied": 3, "rejected": 0, "rejected_ids": []}
+    # Незаданное поле остаётся прежним
+    assert await price_and_stock(first, second, third) == {first: (110.0, 5), second: (300.0, 7), third: (25.0, 0)}
+
+
+async def test_column_without_values(catalog, client, auth_headers):
+    # Во всей пачке нет ни одной цены: колонка VALUES целиком из NULL
+    first, second = (product.id for product in catalog["products"][:2])
+    response = await client.patch("/products/bulk", headers=auth_headers(catalog["seller"]), json=[
+        {"id": first, "stock": 1}, {"id": second, "stock": 2},
+    ])
+    assert response.json()["applied"] == 2
+    assert await price_and_stock(first, second) == {first: (100.0, 1), second: (300.0, 2)}
+
+
+async def test_rejected_ids(catalog, client, auth_headers, foreign_product):
+    own, inactive = catalog["products"][0].id, catalog["products"][3].id
+    response = await client.patch("/products/bulk", headers=auth_headers(catalog["seller"]), json=[
+        {"id": own, "price": 90.0},
+        {"id": foreign_product.id, "price": 2.0},
+        {"id": 999999, "stock": 1},
+        {"id": inactive, "stock": 3},
+        # Нечего менять
+        {"id": catalog["products"][1].id},
+    ])
+    assert response.json() == {
+        "applied": 1,
+        "rejected": 4,
+        "rejected_ids": sorted([foreign_product.id, 999999, inactive, catalog["products"][1].id]),
+    }
+    assert await price_and_stock(own, foreign_product.id, inactive) == {
+        own: (90.0, 5), foreign_product.id: (1.0, 1), inactive: (15.0, 1),
+    }
+
+
+async def test_last_duplicate_wins_across_batches(catalog, client, auth_headers, monkeypatch):
+    monkeypatch.setattr(products_router, "BULK_UPDATE_BATCH_SIZE", 2)
+    first, second, third = (product.id for product in catalog["products"][:3])
+    response = await client.patch("/products/bulk", headers=auth_headers(catalog["seller"]), json=[
+        {"id": first, "price": 1.0},
+        {"id": second, "price": 2.0},
+        {"id": third, "price": 3.0},
+        {"id": first, "price": 4.0},
+    ])
+    assert response.json() == {"applied": 3, "rejected": 0, "rejected_ids": []}
+    assert await price_and_stock(first, second, third) == {first: (4.0, 5), second: (2.0, 0), third: (3.0, 50)}
+
+
+async def test_item_limit_and_validation(catalog, client, auth_headers):
+    headers = auth_headers(catalog["seller"])
+    too_many = [{"id": index, "stock": 1} for index in range(BULK_UPDATE_MAX_ITEMS + 1)]
+    assert (await client.patch("/products/bulk", headers=headers, json=too_many)).status_code == 422
+    assert (await client.patch("/products/bulk", headers=headers, json=[{"id": 1, "price": 0}])).status_code == 422
+    assert (await client.patch("/products/bulk", headers=headers, json=[{"id": 1, "stock": -1}])).status_code == 422
+    response = await client.patch("/products/bulk", headers=auth_headers(catalog["buyer"]), json=[])
+    assert response.status_code == 403
+
+
+async def test_bulk_update_changes_product_etag(catalog, client, auth_headers):
+    product_id = catalog["products"][0].id
+    etag = (await client.get(f"/products/{product_id}")).headers["etag"]
+    await client.patch("/products/bulk", headers=auth_headers(catalog["seller"]), json=[{"id": product_id, "stock": 9}])
+    response = await client.get(f"/products/{product_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["stock"] == 9
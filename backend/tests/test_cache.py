@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from app.cache import TTLCache
+from app.database import replica_router
+
+
+pytestmark = pytest.mark.anyio
+
+
+def product_update(product, **changes) -> dict:
+    fields = {
+        "name": product.name, "description": product.description, "price": product.price,
+        "image_url": product.image_url, "stock": product.stock, "category_id": product.category_id,
+    }
+    return fields | changes
+
+
+async def test_lru_eviction_and_ttl():
+    cache = TTLCache(maxsize=2, ttl=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    # "b" использовался давнее всего
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+    await asyncio.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+async def test_load_started_before_invalidation_is_not_cached():
+    cache = TTLCache(maxsize=10, ttl=60)
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return "old"
+
+    pending = asyncio.create_task(cache.get_or_load("key", load))
+    await asyncio.sleep(0)
+    cache.invalidate(["key"])
+    release.set()
+    assert await pending == "old"
+    assert cache.get("key") is None
+
+
+async def test_read_after_write_is_fresh_despite_lagging_replica(
+    catalog, client, cached_catalog, lagging_replica, auth_headers
+):
+    product = catalog["products"][0]
+    response = await client.get(f"/products/{product.id}")
+    assert response.json()["price"] == 100.0
+    assert replica_router.routed[0] == 1
+
+    response = await client.patch(
+        f"/products/{product.id}", json=product_update(product, price=150.0), headers=auth_headers(catalog["seller"]),
+    )
+    assert response.status_code == 200
+
+    # Реплика всё ещё отдаёт старую цену, но кэш после записи заполняется из основной БД
+    response = await client.get(f"/products/{product.id}")
+    assert response.json()["price"] == 150.0
+    assert replica_router.routed[0] == 1
+    hits = cached_catalog.hits
+    response = await client.get(f"/products/{product.id}")
+    assert response.json()["price"] == 150.0
+    assert cached_catalog.hits == hits + 1
+
+
+async def test_category_listing_after_write_is_fresh(catalog, client, cached_catalog, lagging_replica, auth_headers):
+    product = catalog["products"][0]
+    phones, cases = catalog["categories"]
+    url = f"/products/category/{cases.id}"
+    names = [item["name"] for item in (await client.get(url)).json()["items"]]
+    assert product.name not in names
+
+    response = await client.patch(
+        f"/products/{product.id}", json=product_update(product, category_id=cases.id),
+        headers=auth_headers(catalog["seller"]),
+    )
+    assert response.status_code == 200
+
+    names = [item["name"] for item in (await client.get(url)).json()["items"]]
+    assert product.name in names
@@ -0,0 +1,49 @@
+import anyio
+import orjson
+import pytest
+from sqlalchemy import update
+
+from app.category_tree import CategoryTree
+from app.database import async_session_maker
+from app.models import Category as CategoryModel
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def rename_root(name: str) -> None:
+    # Запись в обход роутера, как из другого воркера: события CATEGORY_CHANGED в этом процессе нет
+    async with async_session_maker() as session:
+        await session.execute(update(CategoryModel).where(CategoryModel.parent_id.is_(None)).values(name=name))
+        await session.commit()
+
+
+async def root_name(tree: CategoryTree) -> str:
+    async with async_session_maker() as session:
+        return orjson.loads(await tree.get(session))[0]["name"]
+
+
+async def test_tree_is_nested(catalog):
+    tree = CategoryTree(ttl=60)
+    async with async_session_maker() as session:
+        roots = orjson.loads(await tree.get(session))
+    assert [root["name"] for root in roots] == ["Телефоны"]
+    assert [child["name"] for child in roots[0]["children"]] == ["Чехлы"]
+
+
+async def test_tree_is_cached_until_invalidated(catalog):
+    tree = CategoryTree(ttl=60)
+    assert await root_name(tree) == "Телефоны"
+    await rename_root("Смартфоны")
+    assert await root_name(tree) == "Телефоны"
+    tree.invalidate()
+    assert await root_name(tree) == "Смартфоны"
+
+
+async def test_tree_expires_without_event(catalog):
+    tree = CategoryTree(ttl=0.2)
+    assert await root_name(tree) == "Телефоны"
+    await rename_root("Смартфоны")
+    assert await root_name(tree) == "Телефоны"
+    await anyio.sleep(0.3)
+    assert await root_name(tree) == "Смартфоны"
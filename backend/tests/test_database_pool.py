@@ -0,0 +1,74 @@
+from contextlib import AsyncExitStack
+
+import pytest
+from sqlalchemy import exc
+
+from app.database import (
+    InstrumentedQueuePool, PoolStats, create_engine_from_settings, pool_stats, pool_status, prewarm_engine,
+)
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def small_engine(tmp_path):
+    engine = create_engine_from_settings(
+        f"sqlite+aiosqlite:///{tmp_path}/pool.sqlite", pool_size=3, max_overflow=0, pool_timeout=0.1,
+    )
+    yield engine
+    await engine.dispose()
+
+
+def test_pool_stats_averages_and_recent_window():
+    stats = PoolStats()
+    stats.record(0.010)
+    stats.record(0.030)
+    stats.record_timeout(0.5)
+    assert stats.stats() | {"recent_wait_ms": None} == {
+        "checkouts": 2,
+        "timeouts": 1,
+        "avg_wait_ms": pytest.approx(20.0),
+        "max_wait_ms": pytest.approx(30.0),
+        "recent_wait_ms": None,
+    }
+    assert stats.recent() > 0
+    # Давно не было выдач — пул считается свободным
+    stats.recent_at -= 10
+    assert stats.recent(window=5.0) == 0.0
+
+
+@pytest.mark.parametrize("connections, opened", [(2, 2), (3, 3), (10, 3)])
+async def test_prewarm_opens_configured_connections(small_engine, connections, opened):
+    assert isinstance(small_engine.pool, InstrumentedQueuePool)
+    await prewarm_engine(small_engine, connections)
+    # Не больше pool_size, и все соединения возвращены в пул
+    assert small_engine.pool.checkedin() == opened
+    assert small_engine.pool.checkedout() == 0
+
+
+async def test_checkouts_and_timeouts_are_counted(small_engine, monkeypatch):
+    # Admission в следующих тестах не должен видеть это ожидание
+    monkeypatch.setattr(pool_stats, "recent_wait", pool_stats.recent_wait)
+    checkouts, timeouts = pool_stats.checkouts, pool_stats.timeouts
+    async with AsyncExitStack() as stack:
+        for _ in range(3):
+            await stack.enter_async_context(small_engine.connect())
+        assert small_engine.pool.checkedout() == 3
+        with pytest.raises(exc.TimeoutError):
+            await small_engine.connect().start()
+    assert pool_stats.checkouts - checkouts == 3
+    assert pool_stats.timeouts - timeouts == 1
+    # Ожидание до таймаута попадает в скользящее среднее, на которое смотрит admission
+    assert pool_stats.recent() > 0
+
+
+async def test_pool_status_reports_the_app_engine(engine, client):
+    status = pool_status()
+    assert {"size", "checked_in", "checked_out", "overflow", "checkouts", "timeouts"} <= status.keys()
+    assert status["checked_out"] == 0
+    async with engine.connect():
+        assert pool_status()["checked_out"] == 1
+        response = await client.get("/stats/db-pool")
+    assert response.status_code == 200
+    assert response.json()["size"] == engine.pool.size()
@@ -0,0 +1,76 @@
+import pytest
+
+from app.etag import etag_matches
+
+
+pytestmark = pytest.mark.anyio
+
+
+def test_etag_matches():
+    etag = '"abc-0-1"'
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches("*", etag)
+    assert etag_matches("*", etag, exists=True)
+
+
+async def test_repeated_get_is_not_modified(catalog, client):
+    url = f"/products/{catalog['products'][0].id}"
+    response = await client.get(url)
+    etag = response.headers["etag"]
+    assert response.status_code == 200
+
+    response = await client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+
+async def test_wildcard_matches_only_existing_resource(catalog, client):
+    headers = {"If-None-Match": "*"}
+    assert (await client.get(f"/products/{catalog['products'][0].id}", headers=headers)).status_code == 304
+    assert (await client.get("/products/999999", headers=headers)).status_code == 404
+    # Неактивный товар для клиента не существует
+    assert (await client.get(f"/products/{catalog['products'][3].id}", headers=headers)).status_code == 404
+    assert (await client.get("/products/category/999999", headers=headers)).status_code == 404
+    assert (await client.get("/reviews/products/999999/reviews", headers=headers)).status_code == 404
+    assert (await client.get("/categories/", headers=headers)).status_code == 304
+
+
+async def test_write_changes_etag(catalog, client, auth_headers):
+    product = catalog["products"][0]
+    url = f"/products/{product.id}"
+    etag = (await client.get(url)).headers["etag"]
+    list_etag = (await client.get(f"/products/category/{product.category_id}")).headers["etag"]
+
+    update = {"name": product.name, "price": 120.0, "stock": product.stock, "category_id": product.category_id}
+    response = await client.patch(url, json=update, headers=auth_headers(catalog["seller"]))
+    assert response.status_code == 200
+
+    response = await client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["price"] == 120.0
+    assert response.headers["etag"] != etag
+    response = await client.get(f"/products/category/{product.category_id}", headers={"If-None-Match": list_etag})
+    assert response.status_code == 200
+
+
+async def test_review_changes_product_reviews_etag(catalog, client, auth_headers):
+    product = catalog["products"][2]
+    url = f"/reviews/products/{product.id}/reviews"
+    etag = (await client.get(url)).headers["etag"]
+    other_etag = (await client.get(f"/reviews/products/{catalog['products'][0].id}/reviews")).headers["etag"]
+
+    response = await client.post(
+        "/reviews/", json={"product_id": product.id, "comment": "Годится", "grade": 4},
+        headers=auth_headers(catalog["buyer"]),
+    )
+    assert response.status_code == 200
+
+    assert (await client.get(url, headers={"If-None-Match": etag})).status_code == 200
+    # Отзывы других товаров не изменились
+    response = await client.get(f"/reviews/products/{catalog['products'][0].id}/reviews",
+                                headers={"If-None-Match": other_etag})
+    assert response.status_code == 304
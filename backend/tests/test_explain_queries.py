@@ -0,0 +1,33 @@
+import pytest
+from sqlalchemy import select
+
+from app.database import async_session_maker
+from app.models import Product as ProductModel
+from scripts.explain_queries import ExplainedQuery, explain_queries, router_queries
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_router_queries_use_indexes(catalog, capsys):
+    async with async_session_maker() as session:
+        failures = await explain_queries(session, verbose=True)
+    assert failures == [], capsys.readouterr().out
+
+
+async def test_sequential_scan_is_reported(catalog):
+    # По stock индекса нет
+    query = ExplainedQuery("products by stock", select(ProductModel).where(ProductModel.stock > 0))
+    async with async_session_maker() as session:
+        assert await explain_queries(session, [query]) == ["products by stock"]
+        assert await explain_queries(session, [ExplainedQuery(query.name, query.stmt, allow_seq_scan=True)]) == []
+
+
+async def test_review_pages_use_comment_date_index(catalog, capsys):
+    queries = [query for query in router_queries("sqlite") if query.name.startswith("reviews.get_")]
+    async with async_session_maker() as session:
+        assert await explain_queries(session, queries, verbose=True) == []
+    out = capsys.readouterr().out
+    # Порядок (comment_date, id) берётся из индекса, без отдельной сортировки
+    assert out.count("comment_date_") == len(queries)
+    assert "TEMP B-TREE" not in out
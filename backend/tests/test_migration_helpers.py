@@ -0,0 +1,203 @@
+import importlib
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from app import models  # регистрирует таблицы в Base.metadata
+from app.database import Base
+from app.migrations import helpers
+
+
+PRODUCTS = 25
+
+
+@pytest.fixture
+def bind(tmp_path):
+    """
+    Синхронное подключение к SQLite-базе со схемой моделей и PRODUCTS товарами; id идут с пропусками
+    """
+    engine = sa.create_engine(f"sqlite:///{tmp_path}/migrations.sqlite")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(sa.text("INSERT INTO users (id, email, hashed_password, is_active, role) "
+                                   "VALUES (1, 'seller@example.com', '-', 1, 'seller')"))
+        connection.execute(sa.text("INSERT INTO categories (id, name, is_active) VALUES (1, 'Bench', 1)"))
+        connection.execute(
+            sa.text("INSERT INTO products (id, name, price, stock, is_active, rating, category_id, seller_id) "
+                    "VALUES (:id, :name, 10, 1, 1, 0, 1, 1)"),
+            [{"id": index * 2, "name": f"product {index}"} for index in range(1, PRODUCTS + 1)],
+        )
+    with engine.connect() as connection:
+        yield connection
+    engine.dispose()
+
+
+@contextmanager
+def migration(bind: sa.Connection):
+    """
+    Контекст Alembic, как при запуске ревизии из env.py: op.* работают с этим подключением
+    """
+    bind.commit()
+    context = MigrationContext.configure(bind, opts={"transaction_per_migration": True})
+    # Так транзакцию отдельной ревизии открывает run_migrations() при transaction_per_migration
+    with context.begin_transaction(_per_migration=True), Operations.context(context):
+        yield
+
+
+def column_info(bind: sa.Connection, table: str, name: str) -> dict:
+    return next(column for column in sa.inspect(bind).get_columns(table) if column["name"] == name)
+
+
+def index_names(bind: sa.Connection, table: str) -> list[str]:
+    return [index["name"] for index in sa.inspect(bind).get_indexes(table)]
+
+
+def triggers(bind: sa.Connection, table: str) -> list[str]:
+    return sorted(bind.execute(
+        sa.text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = :table"), {"table": table}
+    ).scalars())
+
+
+def test_add_column_with_backfill(bind):
+    fts_triggers = triggers(bind, "products")
+    with migration(bind):
+        updated = helpers.add_column_with_backfill(
+            "products", sa.Column("sku", sa.String(20)), value="'SKU-' || id", nullable=False, batch_size=7,
+        )
+    assert updated == PRODUCTS
+    assert bind.execute(sa.text("SELECT count(*) FROM products WHERE sku = 'SKU-' || id")).scalar() == PRODUCTS
+    assert column_info(bind, "products", "sku")["nullable"] is False
+    # Пересоздание таблицы на SQLite не теряет триггеры FTS5
+    assert triggers(bind, "products") == fts_triggers
+
+
+def test_add_nullable_column_keeps_it_nullable(bind):
+    with migration(bind):
+        helpers.add_column_with_backfill("products", sa.Column("weight", sa.Integer()), value="0")
+    assert column_info(bind, "products", "weight")["nullable"] is True
+    assert bind.execute(sa.text("SELECT count(*) FROM products WHERE weight = 0")).scalar() == PRODUCTS
+
+
+def test_backfill_runs_in_batches_with_progress(bind, caplog):
+    caplog.set_level(logging.INFO, logger=helpers.log.name)
+    with migration(bind):
+        updated = helpers.backfill("products", "stock = 5", batch_size=10)
+    assert updated == PRODUCTS
+    # id от 2 до 50 — пять диапазонов по 10
+    progress = [record.getMessage() for record in caplog.records if record.getMessage().startswith("Backfill")]
+    assert len(progress) == 5
+    assert progress[-1].startswith("Backfill products: 100%, 25 rows")
+
+
+def test_backfill_resumes_by_where(bind):
+    with migration(bind):
+        helpers.backfill("products", "description = 'old'", where="id <= 20")
+        assert helpers.backfill("products", "description = 'new'", where="description IS NULL", batch_size=4) == 15
+        assert helpers.backfill("products", "description = 'new'", where="description IS NULL") == 0
+    assert dict(bind.execute(sa.text("SELECT description, count(*) FROM products GROUP BY description")).all()) == {
+        "old": 10, "new": 15,
+    }
+
+
+def test_backfill_pauses_between_batches(bind):
+    started = time.monotonic()
+    with migration(bind):
+        helpers.backfill("products", "stock = 2", batch_size=20, pause=0.05)
+    assert time.monotonic() - started >= 0.15
+
+
+def test_backfill_of_empty_table(bind):
+    with migration(bind):
+        assert helpers.backfill("reviews", "grade = 5") == 0
+
+
+def test_create_index_concurrently_is_idempotent(bind):
+    with migration(bind):
+        helpers.create_index_concurrently("ix_products_stock", "products", ["stock"])
+        # Повтор после сбоя посреди ревизии
+        helpers.create_index_concurrently("ix_products_stock", "products", ["stock"])
+    assert index_names(bind, "products").count("ix_products_stock") == 1
+    with migration(bind):
+        helpers.drop_index_concurrently("ix_products_stock", "products")
+        helpers.drop_index_concurrently("ix_products_stock", "products")
+    assert "ix_products_stock" not in index_names(bind, "products")
+
+
+def test_partial_index_is_used(bind):
+    with migration(bind):
+        helpers.create_index_concurrently(
+            "ix_products_active_stock", "products", ["stock"],
+            postgresql_where=sa.text("is_active"), sqlite_where=sa.text("is_active = 1"),
+        )
+    plan = bind.execute(sa.text("EXPLAIN QUERY PLAN SELECT id FROM products WHERE is_active = 1 AND stock > 0")).all()
+    assert "ix_products_active_stock" in plan[0][-1]
+
+
+def test_check_constraint_rejects_new_rows(bind):
+    with migration(bind):
+        helpers.add_check_constraint("ck_products_stock_positive", "products", "stock >= 0")
+    with pytest.raises(sa.exc.IntegrityError):
+        bind.execute(sa.text("UPDATE products SET stock = -1 WHERE id = 2"))
+    bind.rollback()
+
+
+@pytest.mark.parametrize("value, expected", [("0", 0), ("250", 250), ("500ms", 500), ("5s", 5000), ("2min", 120_000)])
+def test_timeout_ms(value, expected):
+    assert helpers.timeout_ms(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "5 seconds", "-1s", "1s; DROP TABLE products"])
+def test_timeout_ms_rejects_invalid_values(value):
+    with pytest.raises(ValueError):
+        helpers.timeout_ms(value)
+
+
+def test_lock_timeout_fails_fast_on_locked_table(tmp_path, bind):
+    helpers.apply_session_timeouts(bind, lock_timeout="200ms", statement_timeout="0")
+    assert bind.exec_driver_sql("PRAGMA busy_timeout").scalar() == 200
+    # Другое соединение держит блокировку записи, как долгая транзакция приложения
+    holder = sqlite3.connect(tmp_path / "migrations.sqlite", isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.monotonic()
+        with pytest.raises(sa.exc.OperationalError, match="database is locked"):
+            with migration(bind):
+                helpers.backfill("products", "stock = 3")
+        # Без busy_timeout драйвер ждал бы 5 секунд
+        assert time.monotonic() - started < 2
+    finally:
+        holder.rollback()
+        holder.close()
+    bind.rollback()
+    with migration(bind):
+        assert helpers.backfill("products", "stock = 3") == PRODUCTS
+
+
+def test_rating_aggregates_revision_backfills_from_reviews(tmp_path):
+    # Схема products и reviews до ревизии 35d7c509462d: rating есть, агрегатов ещё нет
+    engine = sa.create_engine(f"sqlite:///{tmp_path}/ratings.sqlite")
+    with engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE products (id INTEGER PRIMARY KEY, rating FLOAT NOT NULL DEFAULT 0.0)")
+        connection.exec_driver_sql(
+            "CREATE TABLE reviews (id INTEGER PRIMARY KEY, product_id INTEGER NOT NULL, "
+            "grade INTEGER NOT NULL, is_active BOOLEAN NOT NULL)"
+        )
+        connection.exec_driver_sql("INSERT INTO products (id) VALUES (1), (2), (3)")
+        connection.exec_driver_sql(
+            "INSERT INTO reviews (product_id, grade, is_active) VALUES (1, 5, 1), (1, 4, 1), (1, 1, 0), (2, 3, 1)"
+        )
+    revision = importlib.import_module("app.migrations.versions.35d7c509462d_add_product_rating_aggregates")
+
+    with engine.connect() as bind:
+        with migration(bind):
+            revision.upgrade()
+        rows = bind.exec_driver_sql("SELECT id, rating_sum, rating_count, rating FROM products ORDER BY id").all()
+    engine.dispose()
+    # Удалённый отзыв не учитывается, товар без отзывов остаётся с нулями
+    assert rows == [(1, 9, 2, 4.5), (2, 3, 1, 3.0), (3, 0, 0, 0.0)]
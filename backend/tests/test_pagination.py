@@ -0,0 +1,48 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.models import Product as ProductModel, Review as ReviewModel
+from app.pagination import decode_cursor, encode_cursor
+
+
+def assert_invalid(cursor: str, sort: str, key) -> None:
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, sort, key)
+    assert error.value.status_code == 400
+    assert error.value.detail == "Invalid cursor"
+
+
+def test_cursor_round_trip():
+    comment_date = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    cursor = encode_cursor("-comment_date", comment_date, 7)
+    assert decode_cursor(cursor, "-comment_date", ReviewModel.comment_date) == (comment_date, 7)
+    assert decode_cursor(encode_cursor("price", 10, 3), "price", ProductModel.price) == (10, 3)
+    assert decode_cursor(encode_cursor("id", 5, 5), "id", ProductModel.id) == (5, 5)
+
+
+def test_cursor_for_other_sort_is_rejected():
+    assert_invalid(encode_cursor("price", 1.5, 1), "rating", ProductModel.rating)
+
+
+@pytest.mark.parametrize("key, column", [
+    ("1.5", ProductModel.price),
+    (True, ProductModel.price),
+    (1.5, ProductModel.id),
+    ("2026-01-01", ReviewModel.comment_date),
+    (1, ReviewModel.comment_date),
+])
+def test_cursor_key_of_wrong_type_is_rejected(key, column):
+    assert_invalid(encode_cursor("sort", key, 1), "sort", column)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-base64!",
+    encode_cursor("sort", {"dt": "yesterday"}, 1),
+    encode_cursor("sort", {"dt": 1}, 1),
+    encode_cursor("sort", 1.5, "1"),
+    encode_cursor("sort", 1.5, True),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    assert_invalid(cursor, "sort", ProductModel.price)
@@ -0,0 +1,70 @@
+import pytest
+from sqlalchemy import or_, select, update
+from sqlalchemy.dialects import postgresql
+
+from app.database import async_session_maker
+from app.models import Category as CategoryModel, Product as ProductModel
+from app.routers.products import PRODUCT_BATCH_MAX_IDS, id_in
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def batch(client, ids: str, headers: dict | None = None):
+    return await client.get("/products/batch", params={"ids": ids}, headers=headers)
+
+
+def test_id_in_binds_one_array_per_call():
+    stmt = select(ProductModel.id).where(or_(
+        id_in(ProductModel.id, [1, 2, 3], "postgresql"), id_in(ProductModel.category_id, [4], "postgresql"),
+    ))
+    compiled = stmt.compile(dialect=postgresql.dialect())
+    # Два условия в одном запросе не затирают параметры друг друга
+    assert sorted(compiled.params.values()) == [[1, 2, 3], [4]]
+    assert "ANY" in str(compiled)
+    assert "IN" in str(select(ProductModel.id).where(id_in(ProductModel.id, [1, 2], "sqlite")))
+
+
+async def test_batch_keeps_requested_order(catalog, client):
+    first, second, third, inactive = (product.id for product in catalog["products"])
+    response = await batch(client, f"{third},999999,{first},{third},{inactive},{second},{first}")
+    assert response.status_code == 200
+    # Повторы схлопнуты, отсутствующие и неактивные пропущены
+    assert [product["id"] for product in response.json()] == [third, first, second]
+
+
+async def test_batch_skips_inactive_categories(catalog, client):
+    phones, cases = catalog["categories"]
+    async with async_session_maker() as session:
+        await session.execute(update(CategoryModel).where(CategoryModel.id == cases.id).values(is_active=False))
+        await session.commit()
+    ids = ",".join(str(product.id) for product in catalog["products"])
+    response = await batch(client, ids)
+    assert {product["category_id"] for product in response.json()} == {phones.id}
+
+
+async def test_batch_id_limit(catalog, client):
+    allowed = ",".join(str(product_id) for product_id in range(1, PRODUCT_BATCH_MAX_IDS + 1))
+    assert (await batch(client, allowed)).status_code == 200
+    # Лимит считается после удаления повторов
+    assert (await batch(client, f"{allowed},1,2,3")).status_code == 200
+    response = await batch(client, f"{allowed},{PRODUCT_BATCH_MAX_IDS + 1}")
+    assert response.status_code == 400
+    assert response.json()["detail"] == f"At most {PRODUCT_BATCH_MAX_IDS} ids per request"
+
+
+@pytest.mark.parametrize("ids", ["", "1,,2", "1,", "a", "1;2", "-1"])
+async def test_batch_rejects_malformed_ids(catalog, client, ids):
+    assert (await batch(client, ids)).status_code == 422
+
+
+async def test_batch_etag(catalog, client, auth_headers):
+    first, second = (product.id for product in catalog["products"][:2])
+    response = await batch(client, f"{first},{second}")
+    etag = response.headers["etag"]
+    assert (await batch(client, f"{first},{second}", headers={"If-None-Match": etag})).status_code == 304
+    # Изменение любого из товаров меняет ETag
+    await client.patch("/products/bulk", headers=auth_headers(catalog["seller"]), json=[{"id": second, "stock": 9}])
+    response = await batch(client, f"{first},{second}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()[1]["stock"] == 9
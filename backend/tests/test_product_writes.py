@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import update
+
+from app.database import async_session_maker
+from app.models import Category as CategoryModel, User as UserModel
+
+
+pytestmark = pytest.mark.anyio
+
+
+def product_update(product, **changes) -> dict:
+    fields = {
+        "name": product.name, "description": product.description, "price": product.price,
+        "image_url": product.image_url, "stock": product.stock, "category_id": product.category_id,
+    }
+    return fields | changes
+
+
+async def category_names(client, category_id: int) -> list[str]:
+    response = await client.get(f"/products/category/{category_id}")
+    assert response.status_code == 200
+    return [item["name"] for item in response.json()["items"]]
+
+
+async def test_update_product(catalog, client, auth_headers):
+    product = catalog["products"][0]
+    response = await client.patch(
+        f"/products/{product.id}", json=product_update(product, name="Телефон обновлённый", stock=9),
+        headers=auth_headers(catalog["seller"]),
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["id"], body["name"], body["stock"]) == (product.id, "Телефон обновлённый", 9)
+    assert (await client.get(f"/products/{product.id}")).json()["name"] == "Телефон обновлённый"
+
+
+async def test_update_rejections(catalog, client, auth_headers):
+    product = catalog["products"][0]
+    seller = auth_headers(catalog["seller"])
+    other = UserModel(id=100, email="other-seller@example.com", role="seller")
+
+    response = await client.patch("/products/999999", json=product_update(product), headers=seller)
+    assert (response.status_code, response.json()["detail"]) == (404, "Product not found")
+    # Неактивный товар для изменения тоже не существует
+    response = await client.patch(f"/products/{catalog['products'][3].id}", json=product_update(product), headers=seller)
+    assert response.status_code == 404
+
+    response = await client.patch(f"/products/{product.id}", json=product_update(product), headers=auth_headers(other))
+    assert (response.status_code, response.json()["detail"]) == (403, "You can only update your own products")
+
+    response = await client.patch(
+        f"/products/{product.id}", json=product_update(product, category_id=999999), headers=seller,
+    )
+    assert (response.status_code, response.json()["detail"]) == (400, "Category not found")
+
+    # Отклонённые запросы ничего не изменили
+    assert (await client.get(f"/products/{product.id}")).json()["category_id"] == product.category_id
+
+
+async def test_update_into_inactive_category(catalog, client, auth_headers):
+    product = catalog["products"][0]
+    cases = catalog["categories"][1]
+    async with async_session_maker() as session:
+        await session.execute(update(CategoryModel).where(CategoryModel.id == cases.id).values(is_active=False))
+        await session.commit()
+    response = await client.patch(
+        f"/products/{product.id}", json=product_update(product, category_id=cases.id),
+        headers=auth_headers(catalog["seller"]),
+    )
+    assert response.status_code == 400
+
+
+async def test_category_change_invalidates_old_and_new_lists(catalog, client, auth_headers, cached_catalog):
+    product = catalog["products"][0]
+    phones, cases = catalog["categories"]
+    assert product.name in await category_names(client, phones.id)
+    assert product.name not in await category_names(client, cases.id)
+    old_etag = (await client.get(f"/products/category/{phones.id}")).headers["etag"]
+    new_etag = (await client.get(f"/products/category/{cases.id}")).headers["etag"]
+
+    response = await client.patch(
+        f"/products/{product.id}", json=product_update(product, category_id=cases.id),
+        headers=auth_headers(catalog["seller"]),
+    )
+    assert response.status_code == 200
+    assert response.json()["category_id"] == cases.id
+
+    # Оба закэшированных списка пересобраны
+    assert product.name not in await category_names(client, phones.id)
+    assert product.name in await category_names(client, cases.id)
+    for category_id, etag in ((phones.id, old_etag), (cases.id, new_etag)):
+        response = await client.get(f"/products/category/{category_id}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+
+
+async def test_delete_product(catalog, client, auth_headers, cached_catalog):
+    product = catalog["products"][0]
+    assert product.name in await category_names(client, product.category_id)
+    other = UserModel(id=100, email="other-seller@example.com", role="seller")
+    assert (await client.delete(f"/products/{product.id}", headers=auth_headers(other))).status_code == 403
+
+    response = await client.delete(f"/products/{product.id}", headers=auth_headers(catalog["seller"]))
+    assert response.status_code == 200
+    assert (await client.get(f"/products/{product.id}")).status_code == 404
+    assert product.name not in await category_names(client, product.category_id)
+    assert (await client.delete(f"/products/{product.id}", headers=auth_headers(catalog["seller"]))).status_code == 404
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select, update
+
+from app.database import async_session_maker
+from app.models import Product as ProductModel, User as UserModel
+from app.routers.reviews import GRADE_COLUMNS
+from scripts.reconcile_ratings import reconcile
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def aggregates(product_id: int) -> tuple:
+    async with async_session_maker() as session:
+        stmt = select(
+            ProductModel.rating_sum, ProductModel.rating_count, ProductModel.rating, *GRADE_COLUMNS.values()
+        ).where(ProductModel.id == product_id)
+        return tuple((await session.execute(stmt)).one())
+
+
+async def test_concurrent_reviews_keep_aggregates(catalog, client, auth_headers):
+    product = catalog["products"][2]
+    grades = [5, 4, 4, 1, 5, 3]
+    async with async_session_maker() as session:
+        buyers = [UserModel(email=f"buyer{index}@example.com", hashed_password="-", role="buyer")
+                  for index in range(len(grades))]
+        session.add_all(buyers)
+        await session.commit()
+
+    # Каждый отзыв сдвигает агрегаты одним UPDATE в SQL, одновременные записи не теряют друг друга
+    responses = await asyncio.gather(*(
+        client.post(
+            "/reviews/", json={"product_id": product.id, "comment": None, "grade": grade}, headers=auth_headers(buyer),
+        )
+        for buyer, grade in zip(buyers, grades)
+    ))
+    assert [response.status_code for response in responses] == [200] * len(grades)
+    assert await aggregates(product.id) == (22, 6, pytest.approx(22 / 6), 1, 0, 1, 2, 2)
+
+    # В режиме claims токену администратора строка в БД не нужна
+    admin = UserModel(id=100, email="admin@example.com", role="admin")
+    response = await client.delete(f"/reviews/{responses[0].json()['id']}", headers=auth_headers(admin))
+    assert response.status_code == 200
+    # Повторное удаление не уменьшает агрегаты второй раз
+    response = await client.delete(f"/reviews/{responses[0].json()['id']}", headers=auth_headers(admin))
+    assert response.status_code == 404
+    assert await aggregates(product.id) == (17, 5, pytest.approx(17 / 5), 1, 0, 1, 2, 1)
+
+    summary = (await client.get(f"/reviews/products/{product.id}/reviews/summary")).json()
+    assert summary == {
+        "product_id": product.id, "count": 5, "mean": pytest.approx(3.4),
+        "histogram": {"1": 1, "2": 0, "3": 1, "4": 2, "5": 1},
+    }
+
+
+async def test_reconcile_fixes_rating_drift(catalog, capsys):
+    first, second = catalog["products"][:2]
+    async with async_session_maker() as session:
+        # Отзывы каталога добавлены напрямую, агрегаты ещё не посчитаны
+        assert await reconcile(session, fix=True, show=10) == 2
+        assert await reconcile(session, fix=False, show=10) == 0
+    assert await aggregates(first.id) == (5, 1, 5.0, 0, 0, 0, 0, 1)
+
+    async with async_session_maker() as session:
+        # Расходится только денормализованный rating
+        await session.execute(update(ProductModel).where(ProductModel.id == second.id).values(rating=2.5))
+        await session.commit()
+        capsys.readouterr()
+        assert await reconcile(session, fix=False, show=10) == 1
+        assert f"product {second.id}: " in capsys.readouterr().out
+        assert await reconcile(session, fix=True, show=10) == 1
+        assert await reconcile(session, fix=False, show=10) == 0
+    assert (await aggregates(second.id))[:3] == (4, 1, 4.0)
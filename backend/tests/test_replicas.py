@@ -0,0 +1,138 @@
+import httpx
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.requests import Request
+
+from app.database import Base, async_session_maker, dispose_engine, init_engine, replica_router
+from app.db_depends import get_async_read_db
+from app.main import app
+from app.models import Category as CategoryModel
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_database(url: str, label: str) -> None:
+    """
+    Отдельная база с одной категорией, названной по базе: по ответу видно, откуда он прочитан
+    """
+    engine = init_engine(url=url, replica_urls=[])
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    async with async_session_maker() as session:
+        session.add(CategoryModel(name=label))
+        await session.commit()
+    await dispose_engine()
+
+
+@pytest.fixture
+def urls(tmp_path):
+    return {name: f"sqlite+aiosqlite:///{tmp_path}/{name}.sqlite" for name in ("primary", "replica1", "replica2")}
+
+
+@pytest.fixture
+async def client_for(urls):
+    """
+    Фабрика клиентов: основная БД и заданные реплики, каждая с собственной категорией
+    """
+    clients = []
+
+    async def make(replicas: list[str]) -> httpx.AsyncClient:
+        for name, url in urls.items():
+            await create_database(url, name)
+        init_engine(url=urls["primary"], replica_urls=replicas)
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__aenter__()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+        clients.append((client, lifespan))
+        return client
+
+    yield make
+    for client, lifespan in clients:
+        await client.aclose()
+        await lifespan.__aexit__(None, None, None)
+    replica_router.fallbacks = 0
+    replica_router.routed.clear()
+    replica_router.failures.clear()
+
+
+async def category_names(client: httpx.AsyncClient) -> list[str]:
+    response = await client.get("/categories/")
+    assert response.status_code == 200
+    return [category["name"] for category in response.json()]
+
+
+async def names_in(url: str) -> list[str]:
+    engine = create_async_engine(url)
+    try:
+        async with engine.connect() as connection:
+            return list(await connection.scalars(select(CategoryModel.name).order_by(CategoryModel.id)))
+    finally:
+        await engine.dispose()
+
+
+async def test_reads_go_to_replica(client_for, urls):
+    client = await client_for([urls["replica1"]])
+    assert await category_names(client) == ["replica1"]
+    assert replica_router.routed[0] == 1
+
+
+async def test_replicas_are_used_round_robin(client_for, urls):
+    client = await client_for([urls["replica1"], urls["replica2"]])
+    served = [(await category_names(client))[0] for _ in range(4)]
+    assert sorted(served) == ["replica1", "replica1", "replica2", "replica2"]
+    assert served[0] != served[1]
+
+
+async def test_reads_use_primary_without_replicas(client_for):
+    client = await client_for([])
+    assert await category_names(client) == ["primary"]
+    assert replica_router.fallbacks == 0
+
+
+async def test_unreachable_replica_falls_back_to_primary(client_for, tmp_path):
+    client = await client_for([f"sqlite+aiosqlite:///{tmp_path}/missing/replica.sqlite"])
+    assert await category_names(client) == ["primary"]
+    assert replica_router.failures[0] == 1
+    assert replica_router.fallbacks == 1
+    # Упавшая реплика пропускается, не замедляя следующие запросы повторным подключением
+    assert await category_names(client) == ["primary"]
+    assert replica_router.failures[0] == 1
+
+
+async def test_unreachable_replica_is_skipped_for_healthy_one(client_for, urls, tmp_path):
+    client = await client_for([f"sqlite+aiosqlite:///{tmp_path}/missing/replica.sqlite", urls["replica2"]])
+    assert [(await category_names(client))[0] for _ in range(3)] == ["replica2"] * 3
+    assert replica_router.fallbacks == 0
+
+
+async def test_writes_never_reach_replica(client_for, urls):
+    client = await client_for([urls["replica1"]])
+    response = await client.post("/categories/", json={"name": "Новая"})
+    assert response.status_code == 201
+    # parent_id проверяется чтением в запросе на запись — оно тоже идёт в основную БД
+    parent_id = response.json()["id"]
+    response = await client.post("/categories/", json={"name": "Дочерняя", "parent_id": parent_id})
+    assert response.status_code == 201
+    assert await names_in(urls["primary"]) == ["primary", "Новая", "Дочерняя"]
+    assert await names_in(urls["replica1"]) == ["replica1"]
+
+
+def make_request(method: str) -> Request:
+    return Request({"type": "http", "method": method, "path": "/", "headers": [], "query_string": b""})
+
+
+@pytest.mark.parametrize("method, primary_flag", [("POST", False), ("PATCH", False), ("GET", True)])
+async def test_read_dependency_stays_on_primary(client_for, urls, method, primary_flag):
+    await client_for([urls["replica1"]])
+    request = make_request(method)
+    if primary_flag:
+        # Запрос уже получил сессию основной БД через get_async_db: читает свои записи
+        request.state.db_primary = True
+    sessions = get_async_read_db(request)
+    session = await sessions.__anext__()
+    try:
+        assert await session.scalar(select(CategoryModel.name)) == "primary"
+    finally:
+        await sessions.aclose()
@@ -0,0 +1,55 @@
+import pytest
+from fastapi import HTTPException
+
+from app.database import async_session_maker
+from app.search import search_products, search_statement
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def search_names(query: str, limit: int = 20) -> list[str]:
+    async with async_session_maker() as session:
+        page = await search_products(session, query, limit=limit, after=None)
+    return [product.name for product in page["items"]]
+
+
+async def test_results_are_ranked_by_relevance(catalog):
+    # У кожаного чехла слово есть и в названии, и в описании, у телефона — только в описании.
+    # Снятый с продажи чехол не находится
+    assert await search_names("чехол") == ["Чехол кожаный", "Телефон с камерой"]
+
+
+async def test_all_words_are_required(catalog):
+    assert await search_names("телефон камерой") == ["Телефон с камерой"]
+
+
+async def test_last_word_matches_as_prefix(catalog):
+    assert await search_names("каме") == ["Телефон с камерой"]
+    assert await search_names("кож") == ["Чехол кожаный"]
+    # Префиксом считается только последнее слово
+    assert await search_names("кож чехол") == []
+
+
+@pytest.mark.parametrize("query", ["", "   ", "!!! ?", '"*'])
+async def test_query_without_words_finds_nothing(catalog, query):
+    async with async_session_maker() as session:
+        assert await search_products(session, query, limit=20, after=None) == {"items": [], "next_cursor": None}
+
+
+async def test_fts5_syntax_is_not_interpreted(catalog):
+    assert await search_names("чехол OR NOT телефон") == []
+
+
+async def test_pages_follow_relevance(client, catalog):
+    first = (await client.get("/products/search", params={"q": "чехол", "limit": 1})).json()
+    assert [item["name"] for item in first["items"]] == ["Чехол кожаный"]
+    second = (await client.get("/products/search", params={"q": "чехол", "limit": 1, "after": first["next_cursor"]})).json()
+    assert [item["name"] for item in second["items"]] == ["Телефон с камерой"]
+    assert second["next_cursor"] is None
+
+
+def test_unsupported_dialect_is_reported_as_501():
+    with pytest.raises(HTTPException) as error:
+        search_statement("mysql", "чехол", limit=20, after=None)
+    assert error.value.status_code == 501
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event, select
+
+from app.database import open_read_session
+from app.models import Product as ProductModel
+from app.singleflight import SingleFlight, catalog_flights
+
+
+pytestmark = pytest.mark.anyio
+
+READERS = 8
+
+
+@pytest.fixture
+def product_queries(engine):
+    """
+    SELECT по products, выполненные за тест
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM products" in statement:
+            statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def gate(monkeypatch):
+    """
+    Задерживает загрузки catalog_flights до gate.set(), чтобы все чтения успели к ней присоединиться
+    """
+    opened = asyncio.Event()
+
+    async def open_session():
+        await opened.wait()
+        return await open_read_session()
+
+    monkeypatch.setattr(catalog_flights, "open_session", open_session)
+    return opened
+
+
+async def wait_for(condition) -> None:
+    for _ in range(100):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+async def test_concurrent_reads_run_one_query(catalog, client, product_queries, gate):
+    product_id = catalog["products"][0].id
+    coalesced = catalog_flights.coalesced["product"]
+    requests = [asyncio.create_task(client.get(f"/products/{product_id}")) for _ in range(READERS)]
+    await wait_for(lambda: catalog_flights.coalesced["product"] - coalesced == READERS - 1)
+    gate.set()
+    responses = await asyncio.gather(*requests)
+
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.content for response in responses}) == 1
+    assert len(product_queries) == 1
+
+
+async def test_cancelled_leader_does_not_break_followers(catalog, product_queries):
+    flights = SingleFlight()
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def load_names(db):
+        started.set()
+        await release.wait()
+        # Сессия принадлежит загрузке и после отмены первого читателя ещё открыта
+        result = await db.scalars(select(ProductModel.name).order_by(ProductModel.id))
+        return tuple(result.all())
+
+    leader = asyncio.create_task(flights.run(("names",), load_names))
+    await started.wait()
+    followers = [asyncio.create_task(flights.run(("names",), load_names)) for _ in range(READERS - 1)]
+    await asyncio.sleep(0)
+    leader.cancel()
+    release.set()
+
+    results = await asyncio.gather(*followers)
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert set(results) == {tuple(product.name for product in catalog["products"])}
+    assert len(product_queries) == 1
+    assert flights.stats()["kinds"]["names"] == {"leaders": 1, "coalesced": READERS - 1, "grace_hits": 0}
+
+
+async def test_forget_starts_new_load(engine):
+    flights = SingleFlight()
+    release = asyncio.Event()
+    loads = []
+
+    async def load(db):
+        loads.append(db)
+        await release.wait()
+        return b"{}"
+
+    before = asyncio.create_task(flights.run(("key",), load))
+    await wait_for(lambda: loads)
+    flights.forget()
+    after = asyncio.create_task(flights.run(("key",), load))
+    await wait_for(lambda: len(loads) == 2)
+    release.set()
+
+    assert await asyncio.gather(before, after) == [b"{}", b"{}"]
+    # Запрос после записи не присоединился к прежней загрузке, и у каждой загрузки своя сессия
+    assert len(loads) == 2
+    assert loads[0] is not loads[1]
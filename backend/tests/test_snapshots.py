@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from app import snapshots as snapshots_module
+from app.snapshots import catalog_snapshots, negotiate_encoding, zstandard
+
+
+pytestmark = pytest.mark.anyio
+
+PLAIN = {"Accept-Encoding": "identity"}
+
+
+@pytest.fixture
+async def snapshots(client, monkeypatch):
+    """
+    Включает снимки каталога после запуска приложения, поэтому при старте ничего не собрано
+    """
+    monkeypatch.setattr(snapshots_module, "CATALOG_SNAPSHOTS", True)
+    monkeypatch.setattr(catalog_snapshots, "rebuild_delay", 0.0)
+    yield catalog_snapshots
+    await catalog_snapshots.close()
+    for spec in catalog_snapshots._specs.values():
+        spec.snapshot = spec.task = None
+
+
+async def built(store) -> None:
+    await asyncio.gather(*(spec.task for spec in store._specs.values() if spec.task is not None))
+
+
+async def set_price(client, auth_headers, catalog, price: float) -> None:
+    response = await client.patch(
+        "/products/bulk", headers=auth_headers(catalog["seller"]), json=[{"id": catalog["products"][0].id, "price": price}],
+    )
+    assert response.json()["applied"] == 1
+
+
+def test_negotiate_encoding():
+    available = {"gzip": b"", "zstd": b""}
+    assert negotiate_encoding(None, available) is None
+    assert negotiate_encoding("gzip, zstd", available) == "zstd"
+    assert negotiate_encoding("zstd;q=0.5, gzip", available) == "gzip"
+    assert negotiate_encoding("*;q=0.1, zstd;q=0", available) == "gzip"
+    assert negotiate_encoding("br", available) is None
+    assert negotiate_encoding("zstd", {"gzip": b""}) is None
+
+
+async def test_miss_then_hit(catalog, client, snapshots):
+    hits, misses = snapshots.hits, snapshots.misses
+    # Первый запрос идёт обычным путём и запускает сборку
+    routed = await client.get("/products/", headers=PLAIN)
+    assert routed.status_code == 200
+    assert (snapshots.hits, snapshots.misses) == (hits, misses + 1)
+    await built(snapshots)
+
+    served = await client.get("/products/", headers=PLAIN)
+    assert snapshots.hits == hits + 1
+    # Снимок неотличим от ответа маршрута
+    assert served.json() == routed.json()
+    assert served.headers["etag"] == routed.headers["etag"]
+    assert "content-encoding" not in served.headers
+    # Другая строка запроса — уже не снимок
+    await client.get("/products/?limit=2", headers=PLAIN)
+    assert snapshots.hits == hits + 1
+
+
+async def test_compressed_variants_and_304(catalog, client, snapshots):
+    await client.get("/products/")
+    await built(snapshots)
+    plain = await client.get("/products/", headers=PLAIN)
+
+    response = await client.get("/products/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    # У сжатого варианта свой ETag
+    assert response.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    assert response.json() == plain.json()
+
+    for etag in (response.headers["etag"], "*"):
+        not_modified = await client.get("/products/", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert not_modified.status_code == 304
+        assert not_modified.headers["etag"] == response.headers["etag"]
+    # ETag варианта gzip не подходит к несжатому
+    response = await client.get("/products/", headers=PLAIN | {"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 200
+
+
+@pytest.mark.skipif(zstandard is None, reason="zstandard is not installed")
+async def test_zstd_variant(catalog, client, snapshots):
+    await client.get("/products/")
+    await built(snapshots)
+    response = await client.get("/products/", headers={"Accept-Encoding": "gzip, zstd"})
+    assert response.headers["content-encoding"] == "zstd"
+    assert response.headers["etag"].endswith('-zstd"')
+    body = zstandard.ZstdDecompressor().decompressobj().decompress(response.content)
+    assert body == snapshots.lookup("/products/", "").snapshot.body
+
+
+async def test_write_invalidates_snapshot(catalog, client, snapshots, auth_headers):
+    await client.get("/products/", headers=PLAIN)
+    await built(snapshots)
+    before = await client.get("/products/", headers=PLAIN)
+
+    await set_price(client, auth_headers, catalog, 150.0)
+    # Снимок снят сразу, не дожидаясь пересборки
+    assert snapshots.lookup("/products/", "").snapshot is None
+    await built(snapshots)
+    hits = snapshots.hits
+    response = await client.get("/products/", headers=PLAIN | {"If-None-Match": before.headers["etag"]})
+    assert snapshots.hits == hits + 1
+    assert response.status_code == 200
+    assert response.json()["items"][0]["price"] == 150.0
+    assert response.headers["etag"] != before.headers["etag"]
+
+
+async def test_snapshot_is_built_from_primary(catalog, client, snapshots, lagging_replica, auth_headers):
+    await set_price(client, auth_headers, catalog, 150.0)
+    await built(snapshots)
+    # Реплика всё ещё отдаёт старую цену, а снимок с новым ETag — новую
+    response = await client.get("/products/", headers=PLAIN)
+    assert snapshots.lookup("/products/", "").snapshot is not None
+    assert response.json()["items"][0]["price"] == 150.0